@@ -1,27 +1,138 @@
+import sys
 import time
 import ctypes
 from threading import Thread
 
+from src.capture import MemoryFrameSource, PixelSampler, bounding_box
+from src.probes import Probe, ProbeTable
+
+# 1920x1080 probe layout: playing icon, loading pixel, dialogue icon low/high
+PROBES = [(84, 46), (1200, 700), (1301, 808), (1301, 790)]
+
 def benchmark_pixel_get():
     gdi32 = ctypes.windll.gdi32
     user32 = ctypes.windll.user32
     hdc = user32.GetDC(0)
-    
+
     count = 1000
-    
+
     print(f"Benchmarking {count} GetPixel calls in Python (ctypes)...")
-    
+
     start = time.perf_counter()
     for _ in range(count):
         gdi32.GetPixel(hdc, 100, 100)
     end = time.perf_counter()
-    
+
     user32.ReleaseDC(0, hdc)
-    
+
     duration = end - start
     ops_per_sec = count / duration
     print(f"Time: {duration:.4f} seconds")
     print(f"Speed: {ops_per_sec:,.0f} ops/sec")
 
+def benchmark_probe_cycle(sampler: PixelSampler, label: str, snapshot: bool):
+    count = 1000
+
+    print(f"Benchmarking {count} probe cycles ({label}, {'snapshot' if snapshot else 'per-pixel'})...")
+
+    start = time.perf_counter()
+    for _ in range(count):
+        if snapshot:
+            sampler.snapshot(PROBES)
+        for x, y in PROBES:
+            sampler.get(x, y)
+        sampler.release()
+    end = time.perf_counter()
+
+    duration = end - start
+    print(f"Time: {duration:.4f} seconds")
+    print(f"Speed: {count / duration:,.0f} cycles/sec")
+
+def benchmark_grab_plan(make_backend, label: str):
+    from src.autoskip_dialogue import ScreenConfig
+
+    count = 1000
+    unbounded = float("inf")
+
+    for width, height in ((1920, 1080), (3840, 2160)):
+        points = ScreenConfig(width, height, use_layouts=False).probe_table().points
+        backend = make_backend(width, height)
+        for name, sampler in (("bounding box", PixelSampler(backend, unbounded, unbounded)),
+                              ("clustered", PixelSampler(backend))):
+            plan = sampler.plan(points)
+            pixels = sum(w * h for _, _, w, h in plan)
+            print(f"Benchmarking {count} probe snapshots ({label}, {width}x{height}, {name}: "
+                  f"{len(plan)} grabs, {pixels:,} px, {pixels * 4 / 1e6:.2f} MB)...")
+
+            start = time.perf_counter()
+            for _ in range(count):
+                sampler.snapshot(points)
+                sampler.release()
+            end = time.perf_counter()
+
+            duration = end - start
+            print(f"Time: {duration:.4f} seconds")
+            print(f"Speed: {count / duration:,.0f} snapshots/sec")
+
+def benchmark_probe_table():
+    white = (255, 255, 255)
+    table = ProbeTable([Probe("playing", PROBES[0], (236, 229, 216)),
+                        Probe("loading", PROBES[1], white),
+                        Probe("choice_low", PROBES[2], white),
+                        Probe("choice_high", PROBES[3], white)],
+                       {"dialogue": ("or", "playing", ("and", ("not", "loading"), ("or", "choice_low", "choice_high")))})
+    frame = MemoryFrameSource(1920, 1080).grab(*bounding_box(table.points))
+    count = 10000
+
+    print(f"Benchmarking {count} probe table evaluations...")
+
+    start = time.perf_counter()
+    for _ in range(count):
+        table.evaluate(frame, "dialogue")
+    end = time.perf_counter()
+
+    duration = end - start
+    print(f"Time: {duration:.4f} seconds")
+    print(f"Speed: {count / duration:,.0f} evals/sec")
+
+    sampler = PixelSampler(MemoryFrameSource(1920, 1080))
+    sampler.snapshot(table.points)
+
+    print(f"Benchmarking {count} unchanged-frame checks (classification skipped)...")
+
+    start = time.perf_counter()
+    for _ in range(count):
+        if not sampler.unchanged(table.points):
+            table.match_mask(sampler.frame)
+    end = time.perf_counter()
+
+    duration = end - start
+    print(f"Time: {duration:.4f} seconds (hit rate {sampler.diff_hit_rate:.1%})")
+    print(f"Speed: {count / duration:,.0f} checks/sec")
+
+def benchmark_run_loop(minutes: float = 60.0):
+    from random import Random
+    from src.simulation import Timeline, run_simulation
+
+    print(f"Simulating {minutes:.0f} minutes of play through AutoSkipper.run_loop...")
+
+    report = run_simulation(Timeline.random(Random(0), minutes * 60), seed=0)
+    print(f"Time: {report.wall_seconds:.4f} seconds ({report.speedup:,.0f}x real time)")
+    print(f"Detection latency: mean {report.detection_latency_mean * 1000:.0f} ms, "
+          f"max {report.detection_latency_max * 1000:.0f} ms")
+    print(f"Wasted presses: {report.wasted_presses}/{report.presses}")
+    print(f"Pixel reads: {report.pixel_reads_per_sec:.1f}/s, wakeups: {report.wakeups_per_sec:.1f}/s")
+
 if __name__ == "__main__":
-    benchmark_pixel_get()
+    if sys.platform == "win32":
+        benchmark_pixel_get()
+        gdi_sampler = PixelSampler()
+        benchmark_probe_cycle(gdi_sampler, "GDI", snapshot=False)
+        benchmark_probe_cycle(gdi_sampler, "GDI", snapshot=True)
+        benchmark_grab_plan(lambda w, h: gdi_sampler.backend, "GDI")
+    mem_sampler = PixelSampler(MemoryFrameSource(1920, 1080))
+    benchmark_probe_cycle(mem_sampler, "memory", snapshot=False)
+    benchmark_probe_cycle(mem_sampler, "memory", snapshot=True)
+    benchmark_grab_plan(MemoryFrameSource, "memory")
+    benchmark_probe_table()
+    benchmark_run_loop()
@@ -0,0 +1,37 @@
+"""Optional dependencies, imported on first use.
+
+numpy (the "fast" extra) vectorizes probe matching, patch scoring, timing
+draws and calibration; each of those has a pure-Python path that gives the
+same results without it. It costs tens of milliseconds to import, so nothing
+imports it at module load.
+"""
+from typing import Optional
+
+_numpy = None
+_numpy_loaded = False
+
+
+def load_numpy():
+    """The numpy module, or None if it is not installed."""
+    global _numpy, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def numpy_for(use_numpy: Optional[bool], owner: str):
+    """numpy if `owner` should use it, else None.
+
+    `use_numpy` None means "if installed"; True raises ImportError without it.
+    """
+    if use_numpy is False:
+        return None
+    np = load_numpy()
+    if np is None and use_numpy:
+        raise ImportError(f"{owner}(use_numpy=True) needs numpy")
+    return np
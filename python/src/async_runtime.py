@@ -0,0 +1,220 @@
+"""asyncio runtime: detection/pressing, hotkeys and spam bursts as tasks on one loop.
+
+Listener threads only enqueue events through `call_soon_threadsafe`, so
+skipper state (`status`, `_stop`, timers) is touched from the loop thread
+alone. Mouse5 bursts are tasks, extended by another click and cancelled on
+pause, exit or window loss.
+
+    python -m src.autoskip_dialogue --asyncio
+"""
+import asyncio
+import logging
+import selectors
+from typing import Optional
+
+from src.autoskip_dialogue import SPAM_DURATION, AutoSkipper
+from src.clock import Clock
+from src.timing import REFILL_MIN_SLEEP
+
+logger = logging.getLogger(__name__)
+
+
+class LoopClock(Clock):
+    """Skipper clock that reads the event loop's time (virtual under VirtualEventLoop)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def now(self) -> float:
+        return self._loop.time()
+
+    def wait(self, event, timeout: float) -> bool:
+        raise RuntimeError("blocking wait on the event loop thread; await the runtime's wake event instead")
+
+
+class _VirtualSelector:
+    """Real selector for fd events; a timed wait with nothing ready advances virtual time instead of blocking."""
+
+    def __init__(self, loop: "VirtualEventLoop") -> None:
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout: Optional[float] = None):
+        if timeout is None:
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if not events and timeout > 0:
+            self._loop.virtual_now += timeout
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock only moves when it would otherwise sleep.
+
+    Timers fire in order at their virtual times, so hours of loop activity run
+    as fast as the callbacks execute; cross-thread wakeups still work.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.virtual_now = start
+        super().__init__(_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self.virtual_now
+
+
+class AsyncRuntime:
+    def __init__(self, skipper: AutoSkipper, spam_duration: float = SPAM_DURATION) -> None:
+        self.skipper = skipper
+        self.remapper = skipper.input_remapper
+        self.spam_duration = spam_duration
+        self.wakeups = 0
+        self.bursts = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._burst: Optional[asyncio.Task] = None
+        # end time of the running burst, re-read after every press
+        self._burst_end = 0.0
+        self.coalesced = 0
+        skipper.focus.add_listener(self._on_focus_change)
+
+    # --- thread-safe entry points (listener / focus threads) ---
+    def post_key(self, key) -> None:
+        self._post(("key", key))
+
+    def post_click(self, _x, _y, button, pressed) -> None:
+        if pressed:
+            self._post(("click", button))
+
+    def stop(self) -> None:
+        self._post(("stop", None))
+
+    def wake(self) -> None:
+        """Cut the skip task's sleep short from any thread; installed as `skipper.wake` while running."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def _post(self, event) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+    def _on_focus_change(self, active: bool) -> None:
+        self._post(("focus", active))
+
+    # --- loop side ---
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._wake = asyncio.Event()
+        skipper = self.skipper
+        skipper.clock = LoopClock(self._loop)
+        skipper.wake = self.wake
+        skipper.start_loop()
+        inputs = asyncio.create_task(self._input_task())
+        try:
+            await self._skip_task()
+        finally:
+            inputs.cancel()
+            self._cancel_burst()
+            await asyncio.gather(inputs, *([self._burst] if self._burst else []), return_exceptions=True)
+            skipper.finish_loop()
+            skipper.wake = skipper.wake_event.set
+            self._loop = None
+
+    async def _skip_task(self) -> None:
+        loop, skipper, wake, metrics = self._loop, self.skipper, self._wake, self.skipper.metrics
+        now = loop.time()
+        while not skipper._stop:
+            t0 = metrics.start()
+            target = skipper.step(now)
+            metrics.record("step", t0)
+            if target - loop.time() > REFILL_MIN_SLEEP:
+                skipper.timing.refill()
+            timeout = target - loop.time()
+            skipper._wake_target = target
+            self.wakeups += 1
+            woken = True
+            if timeout > 0 and not skipper._stop:
+                try:
+                    # hotkeys, focus gain and reloads set `wake` (via skipper.wake) to cut the sleep short
+                    await asyncio.wait_for(wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    woken = False
+                skipper._record_wakeup(target, woken)
+            else:
+                await asyncio.sleep(0)
+            wake.clear()
+            now = loop.time()
+            if not woken:
+                # the relative timeout can round to a hair before `target`, which would then never be due
+                now = max(now, target)
+
+    async def _input_task(self) -> None:
+        while True:
+            kind, arg = await self._events.get()
+            try:
+                if kind == "key":
+                    self._handle_key(arg)
+                elif kind == "click":
+                    self._handle_click(arg)
+                elif kind == "focus":
+                    # focus gain wakes the skip task through skipper.wake
+                    if not arg:
+                        self._cancel_burst()
+                elif kind == "stop":
+                    self.skipper._stop = True
+                    self._wake.set()
+            except Exception:
+                logger.exception("Input handler error")
+
+    def _handle_key(self, key) -> None:
+        skipper = self.skipper
+        # on_key wakes the skip task through skipper.wake
+        skipper.on_key(key)
+        if skipper.status == "pause" or skipper._stop:
+            self._cancel_burst()
+
+    def _handle_click(self, button) -> None:
+        buttons = self.remapper.buttons
+        if button == buttons.x1 and self.skipper.is_genshin_active():
+            self.remapper.remap_interact()
+        elif button == buttons.x2:
+            if not self.skipper.is_genshin_active():
+                return
+            end = self._loop.time() + self.spam_duration
+            if self._burst and not self._burst.done():
+                # as BurstWorker: a click during a burst extends it
+                self._burst_end = max(self._burst_end, end)
+                self.coalesced += 1
+                logger.info("Spam-F: extended")
+                return
+            logger.info("Spam-F: %.0fs burst", self.spam_duration)
+            self.bursts += 1
+            self._burst_end = end
+            self._burst = asyncio.create_task(self._spam())
+
+    def _cancel_burst(self) -> None:
+        if self._burst and not self._burst.done():
+            self._burst.cancel()
+            logger.info("Spam-F cancelled")
+
+    async def _spam(self) -> None:
+        loop, remapper = self._loop, self.remapper
+        while loop.time() < self._burst_end:
+            try:
+                if self.skipper.is_genshin_active():
+                    remapper.press_f()
+            except Exception:
+                logger.exception("Spam-F error")
+            # sleep but don't overshoot the end time
+            remaining = self._burst_end - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remapper.burst_gap(), remaining))
+        logger.info("Spam-F finished")
@@ -1,28 +1,63 @@
 import os
 import logging
 import argparse
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from logging.handlers import RotatingFileHandler
 from random import Random
 from threading import Thread, Event
-import threading
 import time
-from time import perf_counter
-from typing import Optional, Tuple, Callable, Dict
-
-from win32api import GetSystemMetrics
-from win32gui import GetForegroundWindow, GetWindowText
-from pynput.keyboard import Key, KeyCode, Listener as KeyboardListener, Controller as KeyboardController
-from pynput.mouse import Listener as MouseListener, Button
-from dotenv import find_dotenv, load_dotenv, set_key
-import ctypes
+from typing import Optional, Tuple, Callable, Mapping
+
+from src.backends import PlatformBackend, get_backend
+from src.bursts import BurstWorker
+from src.capture import CaptureBackend, PixelSampler
+from src.clock import Clock, PreciseClock
+from src.detectors import DEFAULT_DETECTORS, Detection, DetectorCascade, build_cascade, check_names, load_references
+from src.focus import FocusSource, FocusTracker
+from src.histogram import Histogram
+from src.input_sender import InputSender
+from src.instrumentation import METRICS_FILE, METRICS_PORT, Instrumentation
+from src.layouts import Layout, lookup_layout
+from src.log_queue import LOG_QUEUE_SIZE, LogPipeline
+from src.pacing import PressPacer
+from src.polling import AdaptivePoller
+from src.probes import Probe, ProbeTable
+from src.scheduler import Scheduler
+from src.timing import DEFAULT_TIMING, REFILL_MIN_SLEEP, TimingModel, TimingParams
+from src.trace import (EV_BREAK, EV_BURST, EV_CHECK, EV_PRESS, EV_SKIP, EV_STATUS, EV_WINDOW,
+                       CHECK_DIALOGUE, CHECK_ESCALATED, CHECK_FALLBACK, CHECK_UNCHANGED, PRESS_DOUBLE, PRESS_F, PRESS_SCHEDULED,
+                       PRESS_SPACE, SKIP_HELD,
+                       STATUS_EXIT, STATUS_PAUSE, STATUS_RUN, TRACE_CAPACITY, TRACE_FILE, TraceRecorder)
+from src.windows import POLICIES, WindowRegistry
 
 # --- constants ---
 PLAYING_ICON_COLOR = (236, 229, 216)
 WHITE = (255, 255, 255)
+# focus changes wake the loop; this is only a safety net
+INACTIVE_WAIT = 1.0
+# dialogue pixel polling: while a dialogue is showing / base rate before idle backoff
+STATE_CHECK_INTERVAL = 0.15
+IDLE_CHECK_INTERVAL = 0.25
+# Mouse5 'f' spam burst length
+SPAM_DURATION = 4.0
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class ProbeGeometry:
+    """Scaling constants behind the computed probe layout (see `python -m src.calibration`)."""
+    # icon x at 1920 and at 3840 wide; widescreen positions interpolate between them
+    playing_x: Tuple[int, int] = (84, 230)
+    dialogue_x: Tuple[int, int] = (1301, 2770)
+    # extra slope of the dialogue icon above 3840 wide
+    dialogue_extra: float = 0.02
+    # per-channel color tolerance of every probe
+    tolerance: int = 10
+
+
+DEFAULT_GEOMETRY = ProbeGeometry()
+
 class LogFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
         ct = self.converter(record.created)
@@ -35,18 +70,41 @@ class ScreenConfig:
     HEIGHT: int
     BASE_W: int = 1920
     BASE_H: int = 1080
+    use_layouts: bool = field(default=True, repr=False)
+    geometry: ProbeGeometry = field(default=DEFAULT_GEOMETRY, repr=False)
     PLAYING_ICON: Tuple[int, int] = field(init=False)
     DIALOGUE_ICON: Tuple[int, int, int] = field(init=False)
     LOADING_PIXEL: Tuple[int, int] = field(init=False)
+    DETECTORS: Tuple[str, ...] = field(init=False, default=DEFAULT_DETECTORS)
     WINDOW_TITLE: str = field(init=False, default="Genshin Impact")
+    POLL_MIN_INTERVAL: float = field(init=False, default=0.1)
+    POLL_MAX_INTERVAL: float = field(init=False, default=0.5)
+    TIMING: TimingParams = field(init=False, default=DEFAULT_TIMING)
 
     def __post_init__(self):
-        self.PLAYING_ICON = self._calc_playing_icon()
-        self.DIALOGUE_ICON = self._calc_dialogue_icon()
-        self.LOADING_PIXEL = (self._wa(1200), self._ha(700))
+        # tuned/verified coordinates from the layout table win over the scaling heuristics
+        layout = lookup_layout(self.WIDTH, self.HEIGHT) if self.use_layouts else None
+        if layout is None:
+            layout = self.layout()
+        self.apply_layout(layout)
+
+    def layout(self) -> Layout:
+        """Probe coordinates derived from the 1920x1080 base positions."""
+        return Layout(self.WIDTH, self.HEIGHT, self._calc_playing_icon(), self._calc_dialogue_icon(),
+                      (self._wa(1200), self._ha(700)))
+
+    def apply_layout(self, layout: Layout) -> None:
+        self.PLAYING_ICON = layout.playing_icon
+        self.DIALOGUE_ICON = layout.dialogue_icon
+        self.LOADING_PIXEL = layout.loading_pixel
+        self.DETECTORS = layout.detectors
+        if layout.tolerance is not None:
+            self.geometry = replace(self.geometry, tolerance=layout.tolerance)
 
     @classmethod
     def load(cls, interactive: bool = True) -> "ScreenConfig":
+        from dotenv import find_dotenv, load_dotenv, set_key
+
         load_dotenv()
         w_env, h_env = os.getenv("WIDTH", ""), os.getenv("HEIGHT", "")
         window_title = os.getenv("WINDOW_TITLE", "Genshin Impact")
@@ -59,7 +117,7 @@ class ScreenConfig:
                 logger.warning("Invalid WIDTH/HEIGHT in .env, re-detecting.")
         
         if instance is None:
-            w, h = GetSystemMetrics(0), GetSystemMetrics(1)
+            w, h = get_backend().screen_size()
             if interactive:
                 print(f"Detected Resolution: {w}x{h}")
                 print("Is the resolution correct? (y/n) ", end="")
@@ -77,8 +135,73 @@ class ScreenConfig:
             instance = cls(w, h)
             
         instance.WINDOW_TITLE = window_title
+        instance._load_poll_intervals()
+        instance._load_detectors()
+        instance._load_timing()
         return instance
 
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]) -> "ScreenConfig":
+        """Strict counterpart of `load` for config reloads: raises ValueError naming every invalid entry."""
+        try:
+            w, h = int(env.get("WIDTH", "")), int(env.get("HEIGHT", ""))
+        except ValueError:
+            raise ValueError("WIDTH and HEIGHT must be set to integers") from None
+        if w <= 0 or h <= 0:
+            raise ValueError(f"Invalid resolution {w}x{h}")
+        instance = cls(w, h)
+        instance.WINDOW_TITLE = env.get("WINDOW_TITLE") or instance.WINDOW_TITLE
+        errors = []
+        for parse in (instance._parse_poll_intervals, instance._parse_detectors, instance._parse_timing):
+            try:
+                parse(env)
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            raise ValueError("; ".join(errors))
+        return instance
+
+    def _load_poll_intervals(self, env: Mapping[str, str] = os.environ) -> None:
+        try:
+            self._parse_poll_intervals(env)
+        except ValueError as e:
+            logger.warning(f"{e} in .env, using defaults.")
+
+    def _parse_poll_intervals(self, env: Mapping[str, str]) -> None:
+        lo_env, hi_env = env.get("POLL_MIN_INTERVAL", ""), env.get("POLL_MAX_INTERVAL", "")
+        try:
+            lo = float(lo_env) if lo_env else self.POLL_MIN_INTERVAL
+            hi = float(hi_env) if hi_env else self.POLL_MAX_INTERVAL
+        except ValueError:
+            raise ValueError("Invalid POLL_MIN_INTERVAL/POLL_MAX_INTERVAL") from None
+        if not 0 < lo <= hi:
+            raise ValueError("POLL_MIN_INTERVAL must be > 0 and <= POLL_MAX_INTERVAL")
+        self.POLL_MIN_INTERVAL, self.POLL_MAX_INTERVAL = lo, hi
+
+    def _load_detectors(self, env: Mapping[str, str] = os.environ) -> None:
+        try:
+            self._parse_detectors(env)
+        except ValueError as e:
+            logger.warning(f"{e}, using {','.join(self.DETECTORS)}.")
+
+    def _parse_detectors(self, env: Mapping[str, str]) -> None:
+        names = env.get("DETECTORS", "")
+        if not names:
+            return
+        try:
+            self.DETECTORS = check_names(n.strip() for n in names.split(",") if n.strip())
+        except ValueError as e:
+            raise ValueError(f"Invalid DETECTORS in .env ({e})") from None
+
+    def _load_timing(self, env: Mapping[str, str] = os.environ) -> None:
+        try:
+            self._parse_timing(env)
+        except ValueError as e:
+            logger.warning(f"Invalid timing in .env ({e}), using defaults.")
+
+    def _parse_timing(self, env: Mapping[str, str]) -> None:
+        self.TIMING = TimingParams.from_env(env)
+
     def _wa(self, x: int) -> int:
         return int(x / self.BASE_W * self.WIDTH)
 
@@ -94,44 +217,81 @@ class ScreenConfig:
 
     def _calc_playing_icon(self) -> Tuple[int, int]:
         widescreen = self.WIDTH > 1920 and (self.HEIGHT / self.WIDTH) != 0.5625
+        hd, double_hd = self.geometry.playing_x
         if widescreen:
-            x = self._scale_pos(84, 230, self.WIDTH)
-            x = min(x, 230)
+            x = self._scale_pos(hd, double_hd, self.WIDTH)
+            x = min(x, double_hd)
             y = self._ha(46)
         else:
-            x = self._wa(84)
+            x = self._wa(hd)
             y = self._ha(46)
         return x, y
 
     def _calc_dialogue_icon(self) -> Tuple[int, int, int]:
         widescreen = self.WIDTH > 1920 and (self.HEIGHT / self.WIDTH) != 0.5625
+        hd, double_hd = self.geometry.dialogue_x
         if widescreen:
-            x = self._scale_pos(1301, 2770, self.WIDTH, 0.02)
+            x = self._scale_pos(hd, double_hd, self.WIDTH, self.geometry.dialogue_extra)
             lower_y = self._ha(810)
             higher_y = self._ha(792)
         else:
-            x = self._wa(1301)
+            x = self._wa(hd)
             lower_y = self._ha(808)
             higher_y = self._ha(790)
         return x, lower_y, higher_y
 
+    def probe_table(self) -> ProbeTable:
+        x, low_y, hi_y = self.DIALOGUE_ICON
+        tol = self.geometry.tolerance
+        probes = [
+            Probe("playing", self.PLAYING_ICON, PLAYING_ICON_COLOR, tol),
+            Probe("loading", self.LOADING_PIXEL, WHITE, tol),
+            Probe("choice_low", (x, low_y), WHITE, tol),
+            Probe("choice_high", (x, hi_y), WHITE, tol),
+        ]
+        choice = ("and", ("not", "loading"), ("or", "choice_low", "choice_high"))
+        return ProbeTable(probes, {"playing": "playing", "choice": choice, "dialogue": ("or", "playing", choice)})
+
+    def detector_cascade(self, table: Optional[ProbeTable] = None) -> DetectorCascade:
+        """The configured detectors, probe stage first, with this resolution's stored references."""
+        size = (self.WIDTH, self.HEIGHT)
+        # probes alone need no references file
+        refs = load_references(*size) if self.DETECTORS != DEFAULT_DETECTORS else {}
+        return build_cascade(self.DETECTORS, table if table is not None else self.probe_table(), size, refs)
+
 
 class LoggerManager:
-    def __init__(self, verbose: bool = False) -> None:
+    def __init__(self, verbose: bool = False, stream=None, queue_size: int = LOG_QUEUE_SIZE) -> None:
         self.file_handler: Optional[logging.FileHandler] = None
         self.formatter = LogFormatter("%(asctime)s | %(levelname)-8s | %(message)s")
         
         # Setup console logging
         level = logging.DEBUG if verbose else logging.INFO
-        handler = logging.StreamHandler()
+        handler = logging.StreamHandler(stream)
         handler.setFormatter(self.formatter)
-        
-        logging.basicConfig(level=level, handlers=[handler], force=True)
+
+        # call sites only enqueue; formatting and console/file I/O run on the writer thread
+        self.pipeline = LogPipeline(handler, maxsize=queue_size)
+        logging.basicConfig(level=level, handlers=[self.pipeline.handler], force=True)
+        self.pipeline.start()
+
+    @property
+    def dropped(self) -> int:
+        return self.pipeline.dropped
+
+    def close(self) -> None:
+        """Flush queued records and stop the writer thread."""
+        if self.pipeline.dropped:
+            logger.warning(f"Log queue overflowed, {self.pipeline.dropped} records dropped in total")
+        self.pipeline.stop()
+        if self.file_handler:
+            self.file_handler.close()
 
     def toggle_file_logging(self) -> None:
         if self.file_handler:
             logger.info("File logging disabled")
-            logger.removeHandler(self.file_handler)
+            self.pipeline.flush()
+            self.pipeline.remove_handler(self.file_handler)
             self.file_handler.close()
             self.file_handler = None
             return
@@ -139,359 +299,531 @@ class LoggerManager:
         self.file_handler = RotatingFileHandler("autoskip_dialogue.log", encoding="utf-8", maxBytes=5_000_000, backupCount=3)
         self.file_handler.setLevel(logging.DEBUG)
         self.file_handler.setFormatter(self.formatter)
-        logger.addHandler(self.file_handler)
+        self.pipeline.add_handler(self.file_handler)
         logger.info("File logging enabled: autoskip_dialogue.log (Level: DEBUG)")
 
 
-class PixelSampler:
-    def __init__(self) -> None:
-        self.fail_counts: Dict[Tuple[int, int], int] = {}
-        self.total_failures = 0
-        self._last_warn = 0
-        self._gdi32 = ctypes.windll.gdi32
-        self._user32 = ctypes.windll.user32
-        self._hdc = self._user32.GetDC(0)
-
-    def __del__(self):
-        try:
-            if self._hdc:
-                self._user32.ReleaseDC(0, self._hdc)
-        except Exception:
-            pass
-
-    def get(self, x: int, y: int) -> Optional[Tuple[int, int, int]]:
-        try:
-            color_ref = self._gdi32.GetPixel(self._hdc, x, y)
-            if color_ref == 0xFFFFFFFF:  # CLR_INVALID
-                return None
-            # COLORREF is 0x00bbggrr
-            r = color_ref & 0xFF
-            g = (color_ref >> 8) & 0xFF
-            b = (color_ref >> 16) & 0xFF
-            return (r, g, b)
-        except Exception:
-            key = (x, y)
-            self.fail_counts[key] = self.fail_counts.get(key, 0) + 1
-            self.total_failures += 1
-            if self.total_failures - self._last_warn >= 25:
-                self._last_warn = self.total_failures
-                logger.warning(f"Pixel failures total={self.total_failures} unique={len(self.fail_counts)}")
-            return None
-
-    @staticmethod
-    def colors_match(c1: Tuple[int, int, int], c2: Tuple[int, int, int], tolerance: int = 10) -> bool:
-        if not c1 or not c2:
-            return False
-        return all(abs(a - b) <= tolerance for a, b in zip(c1, c2))
-
-
 class InputRemapper:
-    def __init__(self, is_active_fn: Callable[[], bool], rand: Random) -> None:
-        self.keyboard = KeyboardController()
+    def __init__(self, is_active_fn: Callable[[], bool], rand: Random,
+                 backend: Optional[PlatformBackend] = None, clock: Optional[Clock] = None) -> None:
+        backend = backend if backend is not None else get_backend()
+        self.sender = backend.input_sender()
+        self.buttons = backend.Button
         self._is_genshin_active = is_active_fn
-        self._spam_thread: Optional[Thread] = None
-        self._lock = threading.Lock()
-        # spam thread used for one-shot short bursts
         self._rand = rand
+        # one long-lived worker for Mouse5 bursts; clicks during a burst extend it
+        self.bursts = BurstWorker(self.press_f, is_active_fn, rand, clock)
 
     def on_click(self, _x, _y, button, pressed) -> None:
         if not pressed:
             return
         try:
-            if button == Button.x1 and self._is_genshin_active():
-                self.keyboard.press('t')
-                self.keyboard.release('t')
-                logger.info("Remap: Mouse4 -> T")
-            elif button == Button.x2:
-                # one-shot spam of 'f' for a short duration (2s)
+            if button == self.buttons.x1 and self._is_genshin_active():
+                self.remap_interact()
+            elif button == self.buttons.x2:
+                # one-shot spam of 'f' for a short duration
                 if not self._is_genshin_active():
                     # don't spam if Genshin isn't active
                     return
-                if self._spam_thread and self._spam_thread.is_alive():
-                    logger.info("Spam-F: already running")
+                if self.bursts.request(SPAM_DURATION):
+                    logger.info("Spam-F: %.0fs burst", SPAM_DURATION)
                 else:
-                    with self._lock:
-                        if self._spam_thread and self._spam_thread.is_alive():
-                            return
-                        logger.info("Spam-F: 4s burst")
-                        self._spam_thread = Thread(target=lambda: self._spam_for_duration(4.0), daemon=True)
-                        self._spam_thread.start()
+                    logger.info("Spam-F: extended")
         except Exception:
             logger.exception("Mouse handler error")
 
-    def _spam_for_duration(self, duration: float = 4.0) -> None:
-        """Spam the 'f' key repeatedly for `duration` seconds, then stop."""
-        logger.info(f"Spam-F for {duration:.1f}s started")
-        end = perf_counter() + duration
-        try:
-            while perf_counter() < end:
-                try:
-                    if self._is_genshin_active():
-                        self.keyboard.press('f')
-                        self.keyboard.release('f')
-                except Exception:
-                    logger.exception("Spam-F error")
-                # sleep but don't overshoot the end time
-                remaining = end - perf_counter()
-                if remaining <= 0:
-                    break
-                delay = min(self._rand.uniform(0.08, 0.18), remaining)
-                Event().wait(delay)
-        except Exception:
-            logger.exception("Spam-F loop crashed")
-        logger.info("Spam-F finished")
+    def remap_interact(self) -> None:
+        self.sender.tap('t')
+        logger.info("Remap: Mouse4 -> T")
+
+    def cancel_burst(self) -> None:
+        self.bursts.cancel()
+
+    def press_f(self) -> None:
+        self.sender.tap('f')
+
+    def burst_gap(self) -> float:
+        """Random pause between two burst presses."""
+        return self._rand.uniform(*self.bursts.interval)
+
+    def _spam_for_duration(self, duration: float = SPAM_DURATION) -> None:
+        """Spam the 'f' key repeatedly for `duration` seconds on the calling thread, then stop."""
+        self.bursts.extend(duration)
+        self.bursts.run_burst()
 
 
 class AutoSkipper:
-    def __init__(self, config: ScreenConfig, logger_mgr: LoggerManager, rand: Random) -> None:
+    def __init__(self, config: ScreenConfig, logger_mgr: LoggerManager, rand: Random,
+                 capture_backend: Optional[CaptureBackend] = None,
+                 focus_source: Optional[FocusSource] = None,
+                 sender: Optional[InputSender] = None,
+                 clock: Optional[Clock] = None,
+                 backend: Optional[PlatformBackend] = None,
+                 metrics: Optional[Instrumentation] = None,
+                 trace: Optional[TraceRecorder] = None,
+                 pacer: Optional[PressPacer] = None,
+                 windows: Optional[WindowRegistry] = None) -> None:
         self.config = config
+        self.metrics = metrics if metrics is not None else Instrumentation()
+        self.trace = trace if trace is not None else TraceRecorder()
+        # injected components win; anything missing comes from the platform backend
+        self.backend = backend if backend is not None else get_backend()
+        self._keys = self.backend.Key
+        self.clock = clock if clock is not None else Clock()
         self.logger_mgr = logger_mgr
         self.status = "pause"  # run / pause
         self._stop = False
 
         self.rand = rand
-        self.pixel_sampler = PixelSampler()
+        if capture_backend is None:
+            capture_backend = self.backend.capture_backend()
+        self.pixel_sampler = PixelSampler(capture_backend)
+        self._probe_table = config.probe_table()
+        self._probe_mask = 0
+        self._check_flags = 0
+        self.detectors = config.detector_cascade(self._probe_table)
+        # later stages only run on an unsure probe verdict; without any, skip the unsure test too
+        self._escalate = len(self.detectors.stages) > 1
+        self._probe_sure = True
+        self.trace.meta.update(probes=list(self._probe_table.names), width=config.WIDTH, height=config.HEIGHT)
+        self.poller = AdaptivePoller(config.POLL_MIN_INTERVAL, config.POLL_MAX_INTERVAL,
+                                     dialogue_interval=STATE_CHECK_INTERVAL, idle_interval=IDLE_CHECK_INTERVAL)
+
+        self.sender = sender if sender is not None else self.backend.input_sender()
+        if focus_source is None:
+            focus_source = self.backend.focus_source()
+        self.focus = FocusTracker(config.WINDOW_TITLE, focus_source)
+        self.focus.add_listener(self._on_focus_change)
+
+        # named deadlines: press, state_check, break_check, break_end, post_burst
+        self.timers = Scheduler()
+        self._last_press_time = self.clock.now()
+        # interval / break / press decisions, drawn ahead of time from streams seeded by `rand`
+        self.timing = TimingModel(rand, params=config.TIMING)
+        self._next_interval = self.timing.next_interval()
+        # feedback pacing (src/pacing.py); None presses on the timer alone
+        self.pacer = pacer
+        self._pace_mask = 0
+        # several clients side by side (src/windows.py); None checks full-screen probes
+        self.windows = windows
+        # focused window the last refresh found no game client for
+        self._unlisted_hwnd: Optional[int] = None
+        # config hot reload (src/config_watch.py): set by the watcher thread, swapped in by the loop
+        self._pending_reload = None
+        self.reload_pause = Histogram()
+        self.metrics.attach("reload_pause", self.reload_pause)
 
-        # Initialize burst pool before first interval calculation
-        self._burst_pool = 0  # internal rapid interval counter
-        
-        self.keyboard = KeyboardController()
-        self._cached_hwnd = None
-
-        self._last_press_time = perf_counter()
-        self._next_interval = self._next_key_interval()
-
-        self._last_break_check = perf_counter()
         self._break_interval = 30.0
-        self._break_until = 0.0
+        # running totals regardless of instrumentation, read by the metrics endpoint (src/metrics_server.py)
+        self.press_count = 0
+        self.break_count = 0
+        self.break_time = 0.0
+        self.flip_count = 0
 
         self._skip_next = False
         self._double_next = False
         self._burst_mode = False
         self._burst_remaining = 0
-        self._post_burst_pause_until = 0.0
         self._in_dialogue = False
         self._window_active = False
+        self._paused = False
 
         self.wake_event = Event()
-        self.input_remapper = InputRemapper(self.is_genshin_active, rand)
+        # cuts the loop's sleep short from any thread; AsyncRuntime points it at the event loop
+        self.wake: Callable[[], None] = self.wake_event.set
+        self.input_remapper = InputRemapper(self.is_genshin_active, rand, self.backend, self.clock)
+        self.metrics.attach("inject", self.sender.latency)
+        self.metrics.attach("inject_remap", self.input_remapper.sender.latency)
+        # how late presses fire relative to their scheduled time (sleep error, not intended delays)
+        self.interval_error = Histogram()
+        self._wake_target: Optional[float] = None
+        self.metrics.attach("interval_error", self.interval_error)
+        if isinstance(self.clock, PreciseClock):
+            self.metrics.attach("clock_overshoot", self.clock.overshoot)
+
+    # --- config reload ---
+    def request_reload(self, reload) -> None:
+        """Hand over a prebuilt config reload from any thread; the loop swaps it in at its next step."""
+        self._pending_reload = reload
+        self.wake()
+
+    def _apply_reload(self) -> None:
+        reload, self._pending_reload = self._pending_reload, None
+        t0 = time.perf_counter()
+        cfg = reload.config
+        if reload.table is not None:
+            self._probe_table = reload.table
+            # the stored checksum covers the old probe points
+            self.pixel_sampler.invalidate()
+            self.trace.meta.update(probes=list(reload.table.names), width=cfg.WIDTH, height=cfg.HEIGHT)
+        if reload.cascade is not None:
+            self.detectors = reload.cascade
+            self._escalate = len(reload.cascade.stages) > 1
+            self._probe_sure = True
+        if reload.timing is not None:
+            self.timing = reload.timing
+        if reload.pacer is not None:
+            self.pacer = reload.pacer
+        self.poller.min_interval, self.poller.max_interval = cfg.POLL_MIN_INTERVAL, cfg.POLL_MAX_INTERVAL
+        if cfg.WINDOW_TITLE != self.config.WINDOW_TITLE:
+            self.focus.set_title(cfg.WINDOW_TITLE)
+            if self.windows is not None:
+                self.windows.set_title(cfg.WINDOW_TITLE)
+        self.config = cfg
+        pause = time.perf_counter() - t0
+        self.reload_pause.add(pause)
+        logger.info(f"Config reloaded ({', '.join(reload.changed)}): built in {reload.build_seconds * 1000:.2f} ms, "
+                    f"swap pause {pause * 1e6:.0f} us")
 
     # --- window check ---
     def is_genshin_active(self) -> bool:
-        try:
-            hwnd = GetForegroundWindow()
-            if self._cached_hwnd and hwnd == self._cached_hwnd:
-                return True
-            
-            window_title = GetWindowText(hwnd)
-            if self.config.WINDOW_TITLE.lower() in window_title.lower():
-                self._cached_hwnd = hwnd
-                return True
-            return False
-        except Exception:
-            return False
-
-    # --- timing randomness ---
-    def _next_key_interval(self) -> float:
-        if self._burst_pool > 0:
-            self._burst_pool -= 1
-            return self.rand.uniform(0.05, 0.09)
-        if self.rand.random() < 1/50:
-            self._burst_pool = self.rand.randint(2, 5)
-            return self.rand.uniform(0.05, 0.09)
-        if self.rand.random() < 1/8:
-            return self.rand.uniform(0.09, 0.25)
-        return self.rand.uniform(0.11, 0.21)
-
-    def _maybe_break(self) -> Optional[str]:
-        r = self.rand.random()
-        if r < 1/100:
-            return "long"
-        if r < 1/100 + 1/25:
-            return "short"
-        return None
-
-    def _break_duration(self, kind: str) -> float:
-        return self.rand.uniform(4.0, 10.0) if kind == "long" else self.rand.uniform(2.0, 6.0)
+        # cached flag once run_loop has started the tracker, direct poll before that
+        if not self.focus.running:
+            return self.focus.refresh()
+        return self.focus.is_active
+
+    def _on_focus_change(self, active: bool) -> None:
+        if active:
+            self.wake()
+        else:
+            self.input_remapper.cancel_burst()
 
     # --- dialogue detection ---
-    def _dialogue_playing(self) -> bool:
-        px = self.pixel_sampler.get(*self.config.PLAYING_ICON)
-        return self.pixel_sampler.colors_match(px, PLAYING_ICON_COLOR)
-
-    def _dialogue_choice(self) -> bool:
-        if self.pixel_sampler.colors_match(self.pixel_sampler.get(*self.config.LOADING_PIXEL), WHITE):
+    def _detect_dialogue(self) -> bool:
+        # a few small grabs per check (one per probe cluster), all probes matched at once
+        table = self._probe_table
+        sampler = self.pixel_sampler
+        metrics = self.metrics
+        metrics.count("checks")
+        t0 = metrics.start()
+        grabbed = sampler.snapshot(table.points)
+        metrics.record("capture", t0)
+        t0 = metrics.start()
+        if grabbed:
+            # identical probe pixels -> identical classification, skip it
+            if sampler.unchanged(table.points):
+                metrics.count("unchanged")
+                self._check_flags = CHECK_UNCHANGED
+            else:
+                self._probe_mask = table.match_mask(sampler.frame)
+                if self._escalate:
+                    self._probe_sure = self.detectors.stages[0].check(sampler.frame, self._probe_mask).confident
+                self.trace.sample_colors(sampler.frame, table.points)
+                self._check_flags = 0
+            sampler.release()
+        else:
+            sampler.invalidate()
+            self._probe_mask = table.match_mask_from(sampler.get)
+            # no frame to retry with looser tolerances, so the probe verdict stands
+            self._probe_sure = True
+            self.trace.clear_colors()
+            self._check_flags = CHECK_FALLBACK
+        metrics.record("match", t0)
+        is_dialogue = table.test("dialogue", self._probe_mask)
+        if self._probe_sure:
+            return is_dialogue
+        metrics.count("escalations")
+        t0 = metrics.start()
+        verdict, _ = self.detectors.run(sampler, 1, Detection(is_dialogue, False, self._probe_mask))
+        metrics.record("escalate", t0)
+        self._check_flags |= CHECK_ESCALATED
+        return verdict.dialogue
+
+    def _detect_windows(self, now: float) -> bool:
+        """One check of the next window in the registry; True if the foreground window shows a dialogue."""
+        registry = self.windows
+        metrics = self.metrics
+        metrics.count("checks")
+        hwnd = self.focus.hwnd
+        if registry.refresh_due(now) or (registry.get(hwnd) is None and hwnd != self._unlisted_hwnd):
+            # the focused client may be new or moved; an unlisted one waits for the periodic refresh
+            registry.refresh(now)
+            self._unlisted_hwnd = hwnd if registry.get(hwnd) is None else None
+        t0 = metrics.start()
+        state = registry.check(self.pixel_sampler, now, hwnd)
+        metrics.record("capture", t0)
+        self._check_flags = 0
+        if state is not None and state.flipped and state.in_dialogue and state.hwnd != hwnd:
+            logger.info(f"Dialogue in background window {state.hwnd:#x}")
+        foreground = registry.get(hwnd)
+        if foreground is None:
+            self._probe_mask = 0
             return False
-        x, low_y, hi_y = self.config.DIALOGUE_ICON
-        return (self.pixel_sampler.colors_match(self.pixel_sampler.get(x, low_y), WHITE)) or \
-               (self.pixel_sampler.colors_match(self.pixel_sampler.get(x, hi_y), WHITE))
+        self._probe_mask = foreground.mask
+        return foreground.in_dialogue
 
     # --- hotkey input ---
-    def on_key(self, key: KeyCode) -> None:
+    def on_key(self, key) -> None:
+        Key = self._keys
         if key in (Key.f8,):
             self.status = "run"
             logger.info("RUN")
-            self.wake_event.set()
+            self.trace.record(self.clock.now(), EV_STATUS, STATUS_RUN)
+            self.wake()
         elif key in (Key.f9,):
             self.status = "pause"
             logger.info("PAUSE")
-            self.wake_event.set()
+            self.trace.record(self.clock.now(), EV_STATUS, STATUS_PAUSE)
+            self.input_remapper.cancel_burst()
+            self.wake()
         elif key in (Key.f12,):
             logger.info("EXIT requested")
+            self.trace.record(self.clock.now(), EV_STATUS, STATUS_EXIT)
             self._stop = True
-            self.wake_event.set()
+            self.input_remapper.cancel_burst()
+            self.wake()
         elif key in (Key.f7,):
             self.logger_mgr.toggle_file_logging()
+        elif key in (Key.f6,):
+            self.metrics.toggle()
+        elif key in (Key.f10,):
+            self.trace.dump()
 
     # --- core loop (reduced CPU) ---
     def run_loop(self) -> None:
+        self.start_loop()
+        metrics = self.metrics
+        while not self._stop:
+            t0 = metrics.start()
+            target = self.step(self.clock.now())
+            metrics.record("step", t0)
+            self._sleep_until(target)
+        self.finish_loop()
+
+    def start_loop(self) -> None:
         self._print_instructions()
-        self._last_press_time = perf_counter()
-        next_state_check = 0.0  # when to re-check dialogue presence
+        self.focus.start()
+        now = self.clock.now()
+        self._last_press_time = now
+        self._schedule_press()
+        self.timers.set("break_check", now + self._break_interval)
+        self.timers.set("state_check", now)
+
+    def finish_loop(self) -> None:
+        self.focus.stop()
+        self.input_remapper.bursts.close()
+        logger.info(f"Press latency: {self.sender.latency.summary()}")
+        logger.info(f"Press timing error: {self.interval_error.summary()}")
+        if isinstance(self.clock, PreciseClock):
+            logger.info(f"Sleep overshoot: {self.clock.overshoot.summary()} (spin {self.clock.spin_fraction:.1%} of wait time)")
+        if self.metrics.enabled:
+            self.metrics.dump()
+        logger.info("Closing")
 
-        while not self._stop:
-            now = perf_counter()
-
-            if self.status == "pause":
-                # Sleep until something wakes us or small timeout to allow exit
-                self.wake_event.wait(0.5)
-                self.wake_event.clear()
-                self._last_press_time = perf_counter()
-                continue
-
-            is_active = self.is_genshin_active()
-            if is_active != self._window_active:
-                self._window_active = is_active
-                if is_active:
-                    logger.info("Window State: ACTIVE")
-                else:
-                    logger.info("Window State: INACTIVE")
-
-            if not is_active:
-                self._sleep_until(now + 0.4)
-                continue
-
-            # handle active break
-            if now < self._break_until:
-                self._sleep_until(self._break_until)
-                continue
-
-            # periodic break check
-            if now - self._last_break_check > self._break_interval:
-                self._last_break_check = now
-                br = self._maybe_break()
-                if br:
-                    dur = self._break_duration(br)
-                    logger.info(f"Break: {br} {dur:.1f}s")
-                    self._break_until = now + dur
-                    self._next_interval = self._next_key_interval()
-                    continue
-
-            # dialogue state check (throttled)
-            if now >= next_state_check:
-                is_dialogue = self._dialogue_playing() or self._dialogue_choice()
-                
-                if is_dialogue != self._in_dialogue:
-                    self._in_dialogue = is_dialogue
-                    if is_dialogue:
-                        logger.info("Dialogue State: DETECTED")
-                    else:
-                        logger.info("Dialogue State: ENDED")
-
-                next_state_check = now + 0.15  # throttle pixel polling
-                if not is_dialogue:
-                    self._sleep_until(now + 0.25)
-                    continue
-
-            # post-burst pause
-            if now < self._post_burst_pause_until:
-                self._sleep_until(self._post_burst_pause_until)
-                continue
-
-            # decide action timing
-            action_due = (now - self._last_press_time) >= self._next_interval or self._burst_mode
-            if action_due:
-                # group random decisions (use a few shared draws)
-                r1 = self.rand.random()
-                r2 = self.rand.random()
-                r3 = self.rand.random()
-
-                if not self._skip_next and r1 < 1/40:
-                    self._skip_next = True
-                if not self._double_next and r2 < 1/35:
-                    self._double_next = True
-                if (not self._burst_mode) and r3 < 1/60:
-                    self._burst_mode = True
-                    self._burst_remaining = self.rand.randint(3, 5)
-                    logger.info(f"Burst mode: {self._burst_remaining}")
-
-                if self._skip_next:
-                    self._skip_next = False
-                    self._last_press_time = now
-                    self._next_interval = self._next_key_interval()
+    def step(self, now: float) -> float:
+        """Run one loop iteration at `now`; return the time to sleep until (early wakeups are fine)."""
+        timers = self.timers
+        if self._pending_reload is not None:
+            self._apply_reload()
+
+        if self.status == "pause":
+            # Sleep until something wakes us or small timeout to allow exit
+            self._paused = True
+            return now + 0.5
+        if self._paused:
+            # resumed: restart the press cadence from here
+            self._paused = False
+            self._last_press_time = now
+            self._schedule_press()
+
+        metrics = self.metrics
+        metrics.count("steps")
+        t0 = metrics.start()
+        is_active = self.is_genshin_active()
+        metrics.record("window", t0)
+        if is_active != self._window_active:
+            self._window_active = is_active
+            self.trace.record(now, EV_WINDOW, is_active)
+            if is_active:
+                logger.info("Window State: ACTIVE")
+                self.poller.reset()
+            else:
+                logger.info("Window State: INACTIVE")
+
+        if not is_active:
+            # woken early by the focus tracker when the window becomes active
+            return now + INACTIVE_WAIT
+
+        # handle active break
+        if timers.pending("break_end", now):
+            return timers.deadline("break_end")
+
+        # periodic break check
+        if timers.due("break_check", now):
+            timers.set("break_check", now + self._break_interval)
+            br, dur = self.timing.next_break()
+            if br:
+                logger.info("Break: %s %.1fs", br, dur)
+                self.trace.record(now, EV_BREAK, br == "long", value=dur)
+                self.break_count += 1
+                self.break_time += dur
+                timers.set("break_end", now + dur)
+                self._next_interval = self.timing.next_interval()
+                self._schedule_press()
+                return timers.deadline("break_end")
+
+        # dialogue state check (throttled)
+        if timers.due("state_check", now):
+            is_dialogue = self._detect_dialogue() if self.windows is None else self._detect_windows(now)
+            self.trace.record(now, EV_CHECK, self._check_flags | (CHECK_DIALOGUE if is_dialogue else 0),
+                              self._probe_mask)
+
+            if self.pacer is not None and (is_dialogue != self._in_dialogue or self._probe_mask != self._pace_mask):
+                # another screen (e.g. a choice): the last press's effect says nothing about this one
+                self._pace_mask = self._probe_mask
+                self.pacer.reset()
+            if is_dialogue != self._in_dialogue:
+                self._in_dialogue = is_dialogue
+                self.flip_count += 1
+                if is_dialogue:
+                    logger.info("Dialogue State: DETECTED")
                 else:
-                    self._perform_press(now)
+                    logger.info("Dialogue State: ENDED")
+
+            # adaptive throttle: fast around dialogues, backing off in open world
+            timers.set("state_check", now + self.poller.next_interval(now, self._probe_mask, is_dialogue))
+            if not is_dialogue:
+                return timers.deadline("state_check")
+
+        # post-burst pause
+        if timers.pending("post_burst", now):
+            return timers.deadline("post_burst")
+
+        # decide action timing
+        if (timers.due("press", now) or self._burst_mode) and not self._hold_press(now):
+            t0 = metrics.start()
+            press_at = timers.deadline("press")
+            if press_at == self._wake_target and press_at <= now:
+                # we slept for this press: how late did it actually come
+                self.interval_error.add(now - press_at)
+            # skip / double / burst / key flags, pregenerated
+            decision = self.timing.next_press()
+
+            if decision.skip:
+                self._skip_next = True
+            if decision.double:
+                self._double_next = True
+            if (not self._burst_mode) and decision.burst:
+                self._burst_mode = True
+                self._burst_remaining = decision.burst
+                logger.info("Burst mode: %d", self._burst_remaining)
+                self.trace.record(now, EV_BURST, value=self._burst_remaining)
+
+            if self._skip_next:
+                self._skip_next = False
+                self.trace.record(now, EV_SKIP, value=now - press_at)
+                self._last_press_time = now
+                self._next_interval = self.timing.next_interval()
+                self._schedule_press()
+                metrics.record("decide", t0)
+            else:
+                metrics.record("decide", t0)
+                self._perform_press(now, decision.space)
 
-            # compute next wake time
-            next_action_time = self._last_press_time + self._next_interval
-            wake_target = min(next_action_time,
-                              self._break_until if self._break_until > now else float("inf"),
-                              next_state_check,
-                              self._post_burst_pause_until if self._post_burst_pause_until > now else float("inf"))
-            # cap minimum sleep
-            self._sleep_until(min(wake_target, now + 0.35))
+        # sleep exactly until the earliest pending deadline
+        nxt = timers.next_deadline(now)
+        return nxt[0] if nxt else now + INACTIVE_WAIT
 
-        logger.info("Closing")
-
-    def _perform_press(self, now: float) -> None:
+    def _hold_press(self, now: float) -> bool:
+        """Feedback pacing: True if the due press waits because the text box has not reacted yet."""
+        pacer = self.pacer
+        if pacer is None or self._burst_mode:
+            return False
+        metrics = self.metrics
+        t0 = metrics.start()
+        sampler = self.pixel_sampler
+        crc = None
+        if sampler.snapshot((), (pacer.region,)):
+            crc = pacer.checksum(sampler.frame)
+            sampler.release()
+        pacer.observe(now, crc)
+        hold = not pacer.should_press(now)
+        metrics.record("pace", t0)
+        if hold:
+            metrics.count("held")
+            self.trace.record(now, EV_SKIP, SKIP_HELD, value=now - self.timers.deadline("press"))
+            self._last_press_time = now
+            self._next_interval = pacer.recheck(self.timing.next_interval())
+            self._schedule_press()
+        return hold
+
+    def _schedule_press(self) -> None:
+        self.timers.set("press", self._last_press_time + self._next_interval)
+
+    def _perform_press(self, now: float, use_space: bool = False) -> None:
         try:
-            # choose key
-            use_space = self.rand.random() < (0.1 if not self._burst_mode else 0.1)
-            key_obj = Key.space if use_space else 'f'
-            
-            self.keyboard.press(key_obj)
-            self.keyboard.release(key_obj)
-            
             key_name = "space" if use_space else "f"
-            logger.debug(f"Pressed {key_name.upper()}")
-
+            metrics = self.metrics
+            metrics.count("presses")
+            self.press_count += 1
+            t0 = metrics.start()
+
+            press_at = self.timers.deadline("press")
+            # negative in burst mode, which presses ahead of the schedule
+            late = now - press_at if press_at is not None else 0.0
+            scheduled = PRESS_SCHEDULED if press_at == self._wake_target and late >= 0 else 0
             if (not use_space) and self._double_next:
                 self._double_next = False
-                # small delay before second press
-                self.keyboard.press('f')
-                self.keyboard.release('f')
+                # both taps go out in one injection
+                self.sender.tap('f', 'f')
+                metrics.record("press", t0)
+                self.trace.record(now, EV_PRESS, PRESS_DOUBLE | scheduled, value=late)
                 logger.debug("Double F")
-                self._post_burst_pause_until = now + self.rand.uniform(0.4, 1.0)
+                self.timers.set("post_burst", now + self.timing.post_burst_pause())
+            else:
+                self.sender.tap(key_name)
+                metrics.record("press", t0)
+                self.trace.record(now, EV_PRESS, (PRESS_SPACE if use_space else PRESS_F) | scheduled, value=late)
+                logger.debug("Pressed %s", key_name.upper())
 
             if self._burst_mode:
                 self._burst_remaining -= 1
                 if self._burst_remaining <= 0:
                     self._burst_mode = False
-                    self._post_burst_pause_until = now + self.rand.uniform(0.4, 1.0)
+                    self.timers.set("post_burst", now + self.timing.post_burst_pause())
 
         except Exception:
             logger.exception("Press error")
 
         self._last_press_time = now
-        self._next_interval = self._next_key_interval()
+        self._next_interval = self.timing.next_interval()
+        if self.pacer is not None:
+            self._next_interval = self.pacer.pressed(now, self._next_interval)
+        self._schedule_press()
 
     def _sleep_until(self, target_time: float) -> None:
         if self._stop:
             return
-        timeout = max(0.0, target_time - perf_counter())
+        self._wake_target = target_time
+        if target_time - self.clock.now() > REFILL_MIN_SLEEP:
+            self.timing.refill()
+        timeout = max(0.0, target_time - self.clock.now())
         # wait can be interrupted by wake_event (e.g., hotkey)
-        self.wake_event.wait(timeout)
+        woken = self.clock.wait(self.wake_event, timeout)
         self.wake_event.clear()
+        self._record_wakeup(target_time, woken)
+
+    def _record_wakeup(self, target_time: float, woken: bool) -> None:
+        metrics = self.metrics
+        if not metrics.enabled:
+            return
+        metrics.count("wakeups")
+        if woken:
+            metrics.count("early_wakeups")
+        else:
+            metrics.observe("sleep_overshoot", max(0.0, self.clock.now() - target_time))
 
     @staticmethod
     def _print_instructions() -> None:
         print("Genshin Impact Dialogue Auto-Skip (Optimized)")
+        print("F6: Toggle instrumentation (writes a metrics snapshot when turned off)")
         print("F7: Toggle file logging")
         print("F8: Start")
         print("F9: Pause")
+        print("F10: Save the decision trace")
         print("F12: Exit")
         print("Mouse4: T key (interact remap)")
-        print("Mouse5: 2s rapid F burst\n")
+        print(f"Mouse5: {SPAM_DURATION:g}s rapid F burst\n")
 
 
 def main() -> None:
@@ -499,6 +831,29 @@ def main() -> None:
     parser.add_argument("--no-interactive", action="store_true", help="Disable interactive resolution prompt")
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose (DEBUG) logging")
     parser.add_argument("--seed", type=int, default=None, help="Deterministic RNG seed")
+    parser.add_argument("--asyncio", action="store_true", help="Run on the asyncio runtime instead of threads")
+    parser.add_argument("--instrument", action="store_true", help="Record per-stage timing histograms from the start")
+    parser.add_argument("--metrics-file", default=METRICS_FILE, help="JSON snapshot path for instrumentation")
+    parser.add_argument("--precise-timing", action="store_true",
+                        help="1 ms timer resolution plus a short spin before each deadline")
+    parser.add_argument("--spin-budget", type=float, default=0.05,
+                        help="Max fraction of waiting time spent spinning in precise timing mode")
+    parser.add_argument("--trace-file", default=TRACE_FILE, help="Where F10 saves the binary decision trace")
+    parser.add_argument("--trace-size", type=int, default=TRACE_CAPACITY,
+                        help="Decision trace ring size in records (64 bytes each)")
+    parser.add_argument("--no-trace", action="store_true", help="Do not record the decision trace")
+    parser.add_argument("--pacing", choices=("timer", "feedback"), default="timer",
+                        help="feedback: hold presses until the dialogue text reacts (src/pacing.py)")
+    parser.add_argument("--windows", choices=POLICIES, metavar="POLICY",
+                        help="Watch every game window (several clients side by side), checked "
+                             "round_robin or by priority to the foreground one (src/windows.py)")
+    parser.add_argument("--no-reload", action="store_true",
+                        help="Do not apply .env / layouts.json changes while running (src/config_watch.py)")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=METRICS_PORT, metavar="PORT",
+                        help=f"Serve live metrics in Prometheus format on 127.0.0.1 (default port {METRICS_PORT}, "
+                             "src/metrics_server.py)")
+    parser.add_argument("--record-frames", metavar="PATH",
+                        help="Record probe-region pixels to PATH for replay (python -m src.replay)")
     args, _ = parser.parse_known_args()
 
     seed = args.seed
@@ -514,9 +869,71 @@ def main() -> None:
     if seed is not None:
         logger.info(f"Deterministic seed: {seed}")
 
+    # variables set outside .env keep precedence on reloads too
+    base_env = dict(os.environ)
     config = ScreenConfig.load(interactive=not args.no_interactive)
-    skipper = AutoSkipper(config, logger_mgr, rand)
+    clock = PreciseClock(cpu_budget=args.spin_budget) if args.precise_timing else Clock()
+    if args.windows and (args.pacing == "feedback" or args.record_frames):
+        # both work on full-screen coordinates
+        parser.error("--windows cannot be combined with --pacing feedback or --record-frames")
+    pacer = PressPacer.for_screen(config.WIDTH, config.HEIGHT) if args.pacing == "feedback" else None
+    windows = None
+    if args.windows:
+        windows = WindowRegistry(config.WINDOW_TITLE, get_backend().window_provider(), args.windows)
+    capture = None
+    if args.record_frames:
+        from src.recording import RecordingCaptureBackend
+        table = config.probe_table()
+        later_stages = config.detector_cascade(table).stages[1:]
+        capture = RecordingCaptureBackend(get_backend().capture_backend(), args.record_frames,
+                                          table.points, (config.WIDTH, config.HEIGHT), clock, meta={"seed": seed},
+                                          extra_points=[p for stage in later_stages for p in stage.points])
+    skipper = AutoSkipper(config, logger_mgr, rand, capture_backend=capture, clock=clock,
+                          metrics=Instrumentation(enabled=args.instrument, path=args.metrics_file),
+                          trace=TraceRecorder(args.trace_size, args.trace_file, enabled=not args.no_trace),
+                          pacer=pacer, windows=windows)
+    if skipper.backend.name == "headless":
+        logger.warning("Headless backend: no screen capture or input hooks, hotkeys will not work.")
+    if capture is not None:
+        skipper.focus.add_listener(capture.record_focus)
+        logger.info(f"Recording probe frames to {args.record_frames}")
+
+    watcher = None
+    if not args.no_reload:
+        from dotenv import find_dotenv
+        from src.config_watch import ConfigWatcher
+        watcher = ConfigWatcher(skipper, find_dotenv() or ".env", base_env=base_env, rand=Random(seed))
+        watcher.start()
+
+    exporter = None
+    if args.metrics_port is not None:
+        from src.metrics_server import MetricsServer
+        exporter = MetricsServer(skipper, args.metrics_port)
+        try:
+            exporter.start()
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started: {e}")
+            exporter = None
 
+    high_res = args.precise_timing and skipper.backend.high_resolution_timer(True)
+    try:
+        if args.asyncio:
+            _run_async(skipper)
+        else:
+            _run_threaded(skipper)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if watcher is not None:
+            watcher.stop()
+        if high_res:
+            skipper.backend.high_resolution_timer(False)
+        if capture is not None:
+            capture.close()
+        logger_mgr.close()
+
+
+def _run_threaded(skipper: AutoSkipper) -> None:
     t = Thread(target=skipper.run_loop, daemon=True)
     t.start()
 
@@ -526,8 +943,8 @@ def main() -> None:
     def on_click(x, y, button, pressed):
         skipper.input_remapper.on_click(x, y, button, pressed)
 
-    k_listener = KeyboardListener(on_release=on_release)
-    m_listener = MouseListener(on_click=on_click)
+    k_listener = skipper.backend.keyboard_listener(on_release)
+    m_listener = skipper.backend.mouse_listener(on_click)
     k_listener.start()
     m_listener.start()
 
@@ -535,7 +952,7 @@ def main() -> None:
         t.join()
     finally:
         skipper._stop = True
-        skipper.wake_event.set()
+        skipper.wake()
         for lst in (k_listener, m_listener):
             try:
                 lst.stop()
@@ -548,5 +965,24 @@ def main() -> None:
                 pass
 
 
+def _run_async(skipper: AutoSkipper) -> None:
+    import asyncio
+    from src.async_runtime import AsyncRuntime
+
+    runtime = AsyncRuntime(skipper)
+    k_listener = skipper.backend.keyboard_listener(runtime.post_key)
+    m_listener = skipper.backend.mouse_listener(runtime.post_click)
+    k_listener.start()
+    m_listener.start()
+    try:
+        asyncio.run(runtime.run())
+    finally:
+        for lst in (k_listener, m_listener):
+            try:
+                lst.stop()
+            except Exception:
+                pass
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Platform layer: screen size, capture, focus and input hooks behind one interface.
+
+Concrete backends are imported on first use, so importing the app is cheap
+and works on any OS. `get_backend()` picks win32 when its APIs import and
+falls back to the headless backend otherwise; GDA_BACKEND forces one.
+"""
+import importlib
+import logging
+import os
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.capture import CaptureBackend
+    from src.focus import FocusSource
+    from src.input_sender import InputSender
+    from src.windows import WindowProvider
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = {
+    "win32": "src.backends.win32",
+    "headless": "src.backends.headless",
+}
+
+
+class PlatformBackend:
+    name = ""
+    # key / mouse button constants that listener callbacks are compared against
+    Key = None
+    Button = None
+
+    def screen_size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def capture_backend(self) -> "CaptureBackend":
+        raise NotImplementedError
+
+    def focus_source(self) -> "FocusSource":
+        raise NotImplementedError
+
+    def input_sender(self) -> "InputSender":
+        raise NotImplementedError
+
+    def window_provider(self) -> "WindowProvider":
+        """Enumerates top-level windows, for several game clients side by side."""
+        raise NotImplementedError
+
+    def keyboard_listener(self, on_release: Callable):
+        """Listener with start / stop / join, calling on_release(key)."""
+        raise NotImplementedError
+
+    def mouse_listener(self, on_click: Callable):
+        """Listener with start / stop / join, calling on_click(x, y, button, pressed)."""
+        raise NotImplementedError
+
+    def high_resolution_timer(self, enable: bool) -> bool:
+        """Request (or release) 1 ms OS timer resolution; False if unsupported."""
+        return False
+
+
+_backend: Optional[PlatformBackend] = None
+
+
+def load_backend(name: str) -> PlatformBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name]).Backend()
+
+
+def get_backend() -> PlatformBackend:
+    """The process-wide backend, imported and created on first call."""
+    global _backend
+    if _backend is None:
+        name = os.getenv("GDA_BACKEND", "")
+        if name:
+            _backend = load_backend(name)
+        else:
+            try:
+                _backend = load_backend("win32")
+            except (ImportError, OSError, AttributeError) as e:
+                logger.warning(f"Windows APIs unavailable ({e}), using headless backend.")
+                _backend = load_backend("headless")
+        logger.debug(f"Platform backend: {_backend.name}")
+    return _backend
+
+
+def set_backend(backend: Optional[PlatformBackend]) -> None:
+    """Replace the process-wide backend; None re-runs auto-selection on next use."""
+    global _backend
+    _backend = backend
@@ -0,0 +1,70 @@
+from enum import Enum
+
+from src.backends import PlatformBackend
+from src.capture import MemoryFrameSource
+from src.focus import FakeFocusSource
+from src.input_sender import RecordingSender
+from src.windows import FakeWindowProvider
+
+
+class Key(Enum):
+    f6 = "f6"
+    f7 = "f7"
+    f8 = "f8"
+    f9 = "f9"
+    f10 = "f10"
+    f12 = "f12"
+    space = "space"
+
+
+class Button(Enum):
+    left = "left"
+    right = "right"
+    middle = "middle"
+    x1 = "x1"
+    x2 = "x2"
+
+
+class NullListener:
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def join(self, timeout=None) -> None:
+        pass
+
+
+class Backend(PlatformBackend):
+    """No real screen, window manager or input hooks: blank in-memory screen,
+    no game window in focus, recorded key presses. Used off Windows and in tests."""
+
+    name = "headless"
+    Key = Key
+    Button = Button
+
+    def __init__(self, width: int = 1920, height: int = 1080) -> None:
+        self.width = width
+        self.height = height
+
+    def screen_size(self):
+        return self.width, self.height
+
+    def capture_backend(self):
+        return MemoryFrameSource(self.width, self.height)
+
+    def focus_source(self):
+        return FakeFocusSource(0, "")
+
+    def input_sender(self):
+        return RecordingSender()
+
+    def window_provider(self):
+        return FakeWindowProvider()
+
+    def keyboard_listener(self, on_release):
+        return NullListener()
+
+    def mouse_listener(self, on_click):
+        return NullListener()
@@ -0,0 +1,46 @@
+import ctypes
+
+from win32api import GetSystemMetrics
+from win32gui import GetForegroundWindow, GetWindowText
+from pynput.keyboard import Key, Listener as KeyboardListener
+from pynput.mouse import Listener as MouseListener, Button
+
+from src.backends import PlatformBackend
+from src.capture import GdiCaptureBackend
+from src.focus import WinEventFocusSource
+from src.input_sender import SendInputSender
+from src.windows import Win32WindowProvider
+
+
+class Backend(PlatformBackend):
+    """pywin32 + pynput listeners + GDI capture + SendInput; only imported once something needs the platform."""
+
+    name = "win32"
+    Key = Key
+    Button = Button
+
+    def screen_size(self):
+        return GetSystemMetrics(0), GetSystemMetrics(1)
+
+    def capture_backend(self):
+        return GdiCaptureBackend()
+
+    def focus_source(self):
+        return WinEventFocusSource(lambda: GetForegroundWindow(), lambda hwnd: GetWindowText(hwnd))
+
+    def input_sender(self):
+        return SendInputSender()
+
+    def window_provider(self):
+        return Win32WindowProvider()
+
+    def keyboard_listener(self, on_release):
+        return KeyboardListener(on_release=on_release)
+
+    def mouse_listener(self, on_click):
+        return MouseListener(on_click=on_click)
+
+    def high_resolution_timer(self, enable):
+        # system-wide 1 ms tick instead of ~15.6 ms; every Begin needs a matching End
+        winmm = ctypes.windll.winmm
+        return (winmm.timeBeginPeriod(1) if enable else winmm.timeEndPeriod(1)) == 0
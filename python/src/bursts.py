@@ -0,0 +1,115 @@
+import logging
+import threading
+from random import Random
+from threading import Event, Thread
+from typing import Callable, Optional, Tuple
+
+from src.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class BurstWorker:
+    """Runs key-spam bursts on one long-lived thread.
+
+    A request while a burst is running extends its end time instead of
+    starting another; `cancel()` ends it at the next wait. One Event serves
+    both as the sleep between presses and as the idle thread's wakeup, so a
+    burst allocates nothing.
+    """
+
+    def __init__(self, press: Callable[[], None], is_active: Callable[[], bool], rand: Random,
+                 clock: Optional[Clock] = None, interval: Tuple[float, float] = (0.08, 0.18),
+                 name: str = "Spam-F") -> None:
+        self._press = press
+        self._is_active = is_active
+        self._rand = rand
+        self.clock = clock if clock is not None else Clock()
+        self.interval = interval
+        self.name = name
+        self._lock = threading.Lock()
+        self._wake = Event()
+        # end time of the current burst; idle once it is in the past
+        self._end = 0.0
+        self._closed = False
+        self._thread: Optional[Thread] = None
+        self.bursts = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.presses = 0
+
+    @property
+    def running(self) -> bool:
+        return self._end > self.clock.now()
+
+    def request(self, duration: float) -> bool:
+        """Start a burst, or extend the running one; True if a new burst started."""
+        started = self.extend(duration)
+        if started:
+            self._ensure_thread()
+            self._wake.set()
+        return started
+
+    def extend(self, duration: float) -> bool:
+        """Like `request` without waking the worker thread, for `run_burst` on the calling thread."""
+        with self._lock:
+            now = self.clock.now()
+            if self._end > now:
+                # the running burst re-reads its end time after each press
+                self._end = max(self._end, now + duration)
+                self.coalesced += 1
+                return False
+            self._end = now + duration
+            self.bursts += 1
+            return True
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._end <= self.clock.now():
+                return
+            self._end = 0.0
+            self.cancelled += 1
+        self._wake.set()
+        logger.info("%s cancelled", self.name)
+
+    def close(self) -> None:
+        self._closed = True
+        self._end = 0.0
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name=f"{self.name} worker", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            if self.running:
+                self.run_burst()
+
+    def run_burst(self) -> None:
+        """Press until the burst's end time passes or it is cancelled (runs on the calling thread)."""
+        clock, wake = self.clock, self._wake
+        logger.info("%s started", self.name)
+        try:
+            while clock.now() < self._end:
+                try:
+                    if self._is_active():
+                        self._press()
+                        self.presses += 1
+                except Exception:
+                    logger.exception("%s error", self.name)
+                # sleep but don't overshoot the end time
+                remaining = self._end - clock.now()
+                if remaining <= 0:
+                    break
+                clock.wait(wake, min(self._rand.uniform(*self.interval), remaining))
+                wake.clear()
+        except Exception:
+            logger.exception("%s loop crashed", self.name)
+        logger.info("%s finished", self.name)
@@ -0,0 +1,351 @@
+"""Offline search for the probe scaling constants and color tolerance.
+
+The computed layout (ScreenConfig._calc_playing_icon / _calc_dialogue_icon)
+rests on a few hand-tuned numbers, collected in ProbeGeometry: the icon x at
+1920 and 3840 wide, the extra dialogue slope above 3840, and the probe
+tolerance. This tool scores a grid of offsets around them against labeled
+screenshots at any number of resolutions and prints the candidate with the
+best precision/recall of the dialogue rule:
+
+    python -m src.calibration --frames reference_frames/ --tolerances 8 10 12 --out calibration.json
+
+With --layouts the best candidate is also stored as a layouts.json entry
+(coordinates and tolerance) for every resolution in the corpus, marked
+verified if it classifies all of that resolution's frames correctly, so the
+skipper uses it without a code change.
+
+Screenshots are binary PPM files named like the layout reference frames
+(``<W>x<H>_<label>[_suffix].ppm``, also in subdirectories). Playing and
+choice frames are positives, idle and loading frames negatives. Frames are
+streamed: workers take batches of paths and read only the probe pixels each
+candidate needs from every file, so memory does not grow with the corpus.
+"""
+import argparse
+import json
+import logging
+import os
+from array import array
+from dataclasses import asdict, dataclass
+from itertools import product
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src._compat import load_numpy, numpy_for
+from src.autoskip_dialogue import DEFAULT_GEOMETRY, PLAYING_ICON_COLOR, WHITE, ProbeGeometry, ScreenConfig
+from src.capture import RGB, Point, read_ppm_pixels
+from src.layouts import FRAME_EXPECTATIONS, FRAME_NAME, LAYOUTS_FILE, Layout, LayoutTable
+
+logger = logging.getLogger(__name__)
+
+# pixel offsets tried around each icon x, extra slopes and tolerances
+COORD_OFFSETS = (-4, -2, 0, 2, 4)
+EXTRAS = (0.0, 0.01, 0.02, 0.03)
+TOLERANCES = (6, 8, 10, 12, 16, 20)
+BATCH_SIZE = 16
+
+# labels on which the dialogue rule must hold
+POSITIVE = frozenset(label for label, (_, expected) in FRAME_EXPECTATIONS.items() if expected)
+# probe order of ScreenConfig.probe_table
+PROBE_COLORS = (PLAYING_ICON_COLOR, WHITE, WHITE, WHITE)
+
+CorpusFrame = Tuple[int, int, str, str]
+
+
+def iter_corpus(directory: str) -> Iterator[CorpusFrame]:
+    """(width, height, label, path) of every labeled PPM under `directory`, without reading them."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            m = FRAME_NAME.match(name)
+            if m and m.group(3) in FRAME_EXPECTATIONS:
+                yield int(m.group(1)), int(m.group(2)), m.group(3), os.path.join(root, name)
+
+
+def candidates(offsets: Sequence[int] = COORD_OFFSETS, extras: Sequence[float] = EXTRAS,
+               tolerances: Sequence[int] = TOLERANCES, base: ProbeGeometry = DEFAULT_GEOMETRY) -> List[ProbeGeometry]:
+    """Every combination of offsets around `base` with the given extras and tolerances."""
+    (p1, p2), (d1, d2) = base.playing_x, base.dialogue_x
+    return [ProbeGeometry((p1 + a, p2 + b), (d1 + c, d2 + d), extra, tol)
+            for a, b, c, d, extra, tol in product(offsets, offsets, offsets, offsets, extras, tolerances)]
+
+
+def _distance(pixel: Optional[RGB], color: RGB) -> int:
+    # largest channel difference: the probe hits when it is within the tolerance
+    if pixel is None:
+        return 256
+    return max(abs(a - b) for a, b in zip(pixel, color))
+
+
+def _zeros(n: int, use_numpy: bool):
+    return load_numpy().zeros(n, dtype="int64") if use_numpy else array("l", [0] * n)
+
+
+def _add(totals, values) -> None:
+    if isinstance(totals, array):
+        for i, v in enumerate(values):
+            totals[i] += v
+    else:
+        totals += values
+
+
+class FrameScorer:
+    """Dialogue verdicts of every candidate on one frame at a time."""
+
+    def __init__(self, geometries: Sequence[ProbeGeometry], use_numpy: Optional[bool] = None) -> None:
+        # numpy only vectorizes the per-candidate scoring
+        self._np = np = numpy_for(use_numpy, "FrameScorer")
+        self.numpy = np is not None
+        self.geometries = list(geometries)
+        self._tolerances = [g.tolerance for g in self.geometries]
+        # the rules do not depend on probe positions: one truth table serves every candidate
+        table = ScreenConfig(1920, 1080, use_layouts=False).probe_table()
+        self._dialogue = bytes(table.test("dialogue", mask) for mask in range(1 << len(table.probes)))
+        if np is not None:
+            self._np_tolerances = np.array(self._tolerances, dtype=np.int16)[:, None]
+            self._np_dialogue = np.frombuffer(self._dialogue, dtype=np.uint8)
+            self._np_weights = 1 << np.arange(len(PROBE_COLORS), dtype=np.int64)
+        # per resolution: distinct (point, probe index) pairs and each candidate's four pair indices
+        self._layouts: Dict[Tuple[int, int], tuple] = {}
+
+    def zeros(self):
+        return _zeros(len(self.geometries), self.numpy)
+
+    def _layout(self, width: int, height: int) -> tuple:
+        layout = self._layouts.get((width, height))
+        if layout is None:
+            pairs: Dict[Tuple[Point, int], int] = {}
+            by_position: Dict[tuple, Tuple[int, ...]] = {}
+            index = []
+            for g in self.geometries:
+                # tolerance does not move probes
+                key = (g.playing_x, g.dialogue_x, g.dialogue_extra)
+                if key not in by_position:
+                    cfg = ScreenConfig(width, height, use_layouts=False, geometry=g)
+                    x, low_y, hi_y = cfg.DIALOGUE_ICON
+                    points = (cfg.PLAYING_ICON, cfg.LOADING_PIXEL, (x, low_y), (x, hi_y))
+                    by_position[key] = tuple(pairs.setdefault((p, i), len(pairs)) for i, p in enumerate(points))
+                index.append(by_position[key])
+            if self.numpy:
+                index = self._np.array(index, dtype=self._np.intp)
+            layout = self._layouts[width, height] = (list(pairs), index)
+        return layout
+
+    def verdicts(self, width: int, height: int, path: str):
+        """1 for each candidate whose probes see a dialogue on the frame at `path`."""
+        pairs, index = self._layout(width, height)
+        pixels = read_ppm_pixels(path, {p for p, _ in pairs})
+        dist = [_distance(pixels[p], PROBE_COLORS[i]) for p, i in pairs]
+        if self.numpy:
+            np = self._np
+            hits = np.array(dist, dtype=np.int16)[index] <= self._np_tolerances
+            return self._np_dialogue[hits @ self._np_weights]
+        table = self._dialogue
+        out = bytearray(len(index))
+        for c, ((a, b, c1, c2), tol) in enumerate(zip(index, self._tolerances)):
+            out[c] = table[(dist[a] <= tol) | (dist[b] <= tol) << 1 | (dist[c1] <= tol) << 2
+                           | (dist[c2] <= tol) << 3]
+        return out
+
+
+@dataclass
+class BatchCounts:
+    """Per-candidate hits on the positive and negative frames of a batch."""
+    positives: int
+    negatives: int
+    true_pos: Sequence[int]
+    false_pos: Sequence[int]
+    skipped: int = 0
+
+    def add(self, other: "BatchCounts") -> None:
+        self.positives += other.positives
+        self.negatives += other.negatives
+        self.skipped += other.skipped
+        _add(self.true_pos, other.true_pos)
+        _add(self.false_pos, other.false_pos)
+
+
+def score_batch(scorer: FrameScorer, batch: Sequence[CorpusFrame]) -> BatchCounts:
+    counts = BatchCounts(0, 0, scorer.zeros(), scorer.zeros())
+    for width, height, label, path in batch:
+        try:
+            verdicts = scorer.verdicts(width, height, path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping {path}: {e}")
+            counts.skipped += 1
+            continue
+        if label in POSITIVE:
+            counts.positives += 1
+            _add(counts.true_pos, verdicts)
+        else:
+            counts.negatives += 1
+            _add(counts.false_pos, verdicts)
+    return counts
+
+
+_worker_scorer: Optional[FrameScorer] = None
+
+
+def _init_worker(geometries: Sequence[ProbeGeometry], use_numpy: bool) -> None:
+    global _worker_scorer
+    _worker_scorer = FrameScorer(geometries, use_numpy)
+
+
+def _score_in_worker(batch: Sequence[CorpusFrame]) -> BatchCounts:
+    return score_batch(_worker_scorer, batch)
+
+
+def _batches(frames: Iterator[CorpusFrame], size: int) -> Iterator[List[CorpusFrame]]:
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class Score:
+    geometry: ProbeGeometry
+    precision: float
+    recall: float
+    f1: float
+
+    def line(self) -> str:
+        g = self.geometry
+        return (f"playing_x={g.playing_x[0]},{g.playing_x[1]} dialogue_x={g.dialogue_x[0]},{g.dialogue_x[1]} "
+                f"extra={g.dialogue_extra:g} tolerance={g.tolerance}: "
+                f"precision {self.precision:.3f} recall {self.recall:.3f} f1 {self.f1:.3f}")
+
+
+@dataclass
+class CalibrationResult:
+    ranked: List[Score]
+    frames: int
+    skipped: int
+    seconds: float
+    workers: int
+
+    @property
+    def best(self) -> Score:
+        return self.ranked[0]
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+
+def _change(g: ProbeGeometry, base: ProbeGeometry) -> Tuple[int, float]:
+    # ties go to the candidate closest to the current constants
+    diffs = [abs(a - b) for a, b in zip(g.playing_x + g.dialogue_x, base.playing_x + base.dialogue_x)]
+    diffs += [abs(g.dialogue_extra - base.dialogue_extra) * 100, abs(g.tolerance - base.tolerance)]
+    return sum(1 for d in diffs if d), sum(diffs)
+
+
+def calibrate(frames: Iterator[CorpusFrame], geometries: Sequence[ProbeGeometry], workers: int = 1,
+              batch_size: int = BATCH_SIZE, base: ProbeGeometry = DEFAULT_GEOMETRY,
+              use_numpy: Optional[bool] = None) -> CalibrationResult:
+    """Score every candidate on the corpus; `workers` > 1 spreads batches over a process pool."""
+    t0 = perf_counter()
+    if use_numpy is None:
+        use_numpy = load_numpy() is not None
+    total = BatchCounts(0, 0, _zeros(len(geometries), use_numpy), _zeros(len(geometries), use_numpy))
+    batches = _batches(frames, batch_size)
+    if workers > 1:
+        # imap pulls batches as workers free up: only paths are queued, never pixels
+        with Pool(workers, _init_worker, (list(geometries), use_numpy)) as pool:
+            for counts in pool.imap_unordered(_score_in_worker, batches):
+                total.add(counts)
+    else:
+        scorer = FrameScorer(geometries, use_numpy)
+        for batch in batches:
+            total.add(score_batch(scorer, batch))
+    seconds = perf_counter() - t0
+
+    scores = []
+    for g, tp, fp in zip(geometries, total.true_pos.tolist(), total.false_pos.tolist()):
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / total.positives if total.positives else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        scores.append(Score(g, precision, recall, f1))
+    scores.sort(key=lambda s: (-s.f1, -s.precision, _change(s.geometry, base)))
+    return CalibrationResult(scores, total.positives + total.negatives, total.skipped, seconds, workers)
+
+
+def write_layouts(path: str, directory: str, geometry: ProbeGeometry,
+                  use_numpy: Optional[bool] = None) -> List[Layout]:
+    """Store `geometry` as the layout of every resolution under `directory` in the table at `path`."""
+    by_size: Dict[Tuple[int, int], List[CorpusFrame]] = {}
+    for frame in iter_corpus(directory):
+        by_size.setdefault(frame[:2], []).append(frame)
+    scorer = FrameScorer([geometry], use_numpy)
+    table = LayoutTable(path)
+    written = []
+    for (w, h), frames in sorted(by_size.items()):
+        counts = score_batch(scorer, frames)
+        layout = ScreenConfig(w, h, use_layouts=False, geometry=geometry).layout()
+        layout.tolerance = geometry.tolerance
+        hits, false_hits = int(counts.true_pos[0]), int(counts.false_pos[0])
+        layout.verified = not counts.skipped and hits == counts.positives and false_hits == 0
+        old = table.get(w, h)
+        if old is not None:
+            layout.detectors = old.detectors
+        table.put(layout)
+        written.append(layout)
+    table.save()
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Search probe coordinates and tolerance on labeled screenshots")
+    parser.add_argument("--frames", required=True, help="Directory of <W>x<H>_<label>*.ppm files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--offsets", type=int, nargs="+", default=list(COORD_OFFSETS),
+                        help="Pixel offsets tried around each icon x")
+    parser.add_argument("--extras", type=float, nargs="+", default=list(EXTRAS),
+                        help="Dialogue slopes tried above 3840 wide")
+    parser.add_argument("--tolerances", type=int, nargs="+", default=list(TOLERANCES),
+                        help="Probe color tolerances tried")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Frames per worker task")
+    parser.add_argument("--top", type=int, default=5, help="Candidates to list")
+    parser.add_argument("--out", help="Write the best configuration as JSON")
+    parser.add_argument("--layouts", nargs="?", const=LAYOUTS_FILE,
+                        help="Store the best configuration for each corpus resolution in a layout table "
+                             "(default src/layouts.json), where the skipper picks it up")
+    args = parser.parse_args(argv)
+
+    geometries = candidates(args.offsets, args.extras, args.tolerances)
+    result = calibrate(iter_corpus(args.frames), geometries, max(1, args.workers), max(1, args.batch))
+    if not result.frames:
+        print(f"No labeled frames under {args.frames}")
+        return 1
+    print(f"{result.frames} frames x {len(geometries)} candidates in {result.seconds:.2f}s "
+          f"with {result.workers} workers: {result.fps:.1f} fps")
+    if result.skipped:
+        print(f"{result.skipped} unreadable frames skipped")
+    current = next((s for s in result.ranked if s.geometry == DEFAULT_GEOMETRY), None)
+    if current is not None:
+        print(f"current: {current.line()}")
+    for i, score in enumerate(result.ranked[:args.top], 1):
+        print(f"{i:>2}. {score.line()}")
+    if args.out:
+        best = result.best
+        data = dict(asdict(best.geometry), precision=best.precision, recall=best.recall, f1=best.f1,
+                    frames=result.frames)
+        tmp = args.out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        os.replace(tmp, args.out)
+        print(f"Best configuration written to {args.out}")
+    if args.layouts:
+        for layout in write_layouts(args.layouts, args.frames, result.best.geometry):
+            print(f"{layout.width}x{layout.height}: {'verified' if layout.verified else 'NOT verified'}")
+        print(f"Layouts written to {args.layouts}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,481 @@
+import ctypes
+import logging
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+RGB = Tuple[int, int, int]
+Point = Tuple[int, int]
+Rect = Tuple[int, int, int, int]
+
+# frames are stored as top-down 32bpp BGRA rows, the layout GetDIBits produces
+BYTES_PER_PIXEL = 4
+# a grab's fixed cost in pixels copied: nearby points share a grab while
+# merging copies at most this many extra pixels (see benchmark.py)
+GRAB_OVERHEAD_PX = 64 * 64
+# no merged grab is larger than this; far-apart points get a grab of their own
+MAX_GRAB_AREA = 256 * 256
+
+
+class Frame:
+    """Snapshot of a screen rectangle backed by a (reusable) BGRA buffer."""
+
+    __slots__ = ("left", "top", "width", "height", "stride", "data")
+
+    def __init__(self, left: int, top: int, width: int, height: int, data) -> None:
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.stride = width * BYTES_PER_PIXEL
+        self.data = data
+
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= x - self.left < self.width and 0 <= y - self.top < self.height
+
+    def pixel(self, x: int, y: int) -> Optional[RGB]:
+        dx, dy = x - self.left, y - self.top
+        if not (0 <= dx < self.width and 0 <= dy < self.height):
+            return None
+        i = dy * self.stride + dx * BYTES_PER_PIXEL
+        data = self.data
+        return (data[i + 2], data[i + 1], data[i])
+
+    def checksum(self, points: Iterable[Point]) -> int:
+        """CRC32 over the pixels at `points` (points outside the frame are skipped)."""
+        crc = 0
+        data, stride, left, top = self.data, self.stride, self.left, self.top
+        for x, y in points:
+            dx, dy = x - left, y - top
+            if 0 <= dx < self.width and 0 <= dy < self.height:
+                i = dy * stride + dx * BYTES_PER_PIXEL
+                crc = zlib.crc32(data[i:i + 3], crc)
+        return crc
+
+    def part(self, rect: Rect) -> Optional["Frame"]:
+        """This frame if it holds all of `rect`, else None."""
+        left, top, w, h = rect
+        return self if self.contains(left, top) and self.contains(left + w - 1, top + h - 1) else None
+
+
+class FrameSet:
+    """Several small frames answering as one, from a snapshot of far-apart points."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: Sequence[Frame]) -> None:
+        self.parts = tuple(parts)
+
+    def _find(self, x: int, y: int) -> Optional[Frame]:
+        for frame in self.parts:
+            if frame.contains(x, y):
+                return frame
+        return None
+
+    def contains(self, x: int, y: int) -> bool:
+        return self._find(x, y) is not None
+
+    def pixel(self, x: int, y: int) -> Optional[RGB]:
+        frame = self._find(x, y)
+        return frame.pixel(x, y) if frame is not None else None
+
+    def checksum(self, points: Iterable[Point]) -> int:
+        crc = 0
+        for x, y in points:
+            frame = self._find(x, y)
+            if frame is not None:
+                i = (y - frame.top) * frame.stride + (x - frame.left) * BYTES_PER_PIXEL
+                crc = zlib.crc32(frame.data[i:i + 3], crc)
+        return crc
+
+    def part(self, rect: Rect) -> Optional[Frame]:
+        """The frame holding all of `rect`, or None."""
+        for frame in self.parts:
+            if frame.part(rect) is not None:
+                return frame
+        return None
+
+
+def bounding_box(points: Iterable[Point]) -> Tuple[int, int, int, int]:
+    """Return (left, top, width, height) covering every point."""
+    xs, ys = zip(*points)
+    left, top = min(xs), min(ys)
+    return left, top, max(xs) - left + 1, max(ys) - top + 1
+
+
+def _union(a: Rect, b: Rect) -> Rect:
+    left, top = min(a[0], b[0]), min(a[1], b[1])
+    return left, top, max(a[0] + a[2], b[0] + b[2]) - left, max(a[1] + a[3], b[1] + b[3]) - top
+
+
+def grab_plan(points: Iterable[Point], rects: Iterable[Rect] = (), overhead: float = GRAB_OVERHEAD_PX,
+              max_area: float = MAX_GRAB_AREA) -> List[Rect]:
+    """Rectangles to grab so that every point is covered and every rect lies whole in one of them.
+
+    Neighbours share a grab while that copies at most `overhead` pixels more
+    than they need and stays within `max_area`. With both unbounded this is
+    the single bounding box.
+    """
+    # (rect, pixels actually needed)
+    groups = [(r, r[2] * r[3]) for r in sorted([tuple(r) for r in rects] + [(x, y, 1, 1) for x, y in points],
+                                                key=lambda r: (r[1], r[0]))]
+    while True:
+        merged: List[Tuple[Rect, int]] = []
+        for rect, used in groups:
+            for i, (other, other_used) in enumerate(merged):
+                union = _union(rect, other)
+                area = union[2] * union[3]
+                if area <= max_area and area - used - other_used <= overhead:
+                    merged[i] = (union, used + other_used)
+                    break
+            else:
+                merged.append((rect, used))
+        if len(merged) == len(groups):
+            return [r for r, _ in merged]
+        groups = merged
+
+
+class CaptureBackend:
+    """Source of screen pixels: single-pixel reads and rectangular grabs."""
+
+    def get_pixel(self, x: int, y: int) -> Optional[RGB]:
+        raise NotImplementedError
+
+    def grab(self, left: int, top: int, width: int, height: int) -> Optional[Frame]:
+        """Capture a rectangle; the returned frame is only valid until the next grab."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", ctypes.c_uint32),
+        ("biWidth", ctypes.c_int32),
+        ("biHeight", ctypes.c_int32),
+        ("biPlanes", ctypes.c_uint16),
+        ("biBitCount", ctypes.c_uint16),
+        ("biCompression", ctypes.c_uint32),
+        ("biSizeImage", ctypes.c_uint32),
+        ("biXPelsPerMeter", ctypes.c_int32),
+        ("biYPelsPerMeter", ctypes.c_int32),
+        ("biClrUsed", ctypes.c_uint32),
+        ("biClrImportant", ctypes.c_uint32),
+    ]
+
+
+class GdiCaptureBackend(CaptureBackend):
+    """Desktop DC capture: GetPixel for single reads, one BitBlt for region grabs."""
+
+    SRCCOPY = 0x00CC0020
+    DIB_RGB_COLORS = 0
+    BI_RGB = 0
+
+    def __init__(self) -> None:
+        self._gdi32 = ctypes.windll.gdi32
+        self._user32 = ctypes.windll.user32
+        self._hdc = self._user32.GetDC(0)
+        self._mem_dc = None
+        self._bitmap = None
+        self._bmp_size = (0, 0)
+        self._buffer = None
+        self._bmi = _BITMAPINFOHEADER()
+        self._bmi.biSize = ctypes.sizeof(_BITMAPINFOHEADER)
+        self._bmi.biPlanes = 1
+        self._bmi.biBitCount = 32
+        self._bmi.biCompression = self.BI_RGB
+
+    def __del__(self):
+        self.close()
+
+    def get_pixel(self, x: int, y: int) -> Optional[RGB]:
+        color_ref = self._gdi32.GetPixel(self._hdc, x, y)
+        if color_ref == 0xFFFFFFFF:  # CLR_INVALID
+            return None
+        # COLORREF is 0x00bbggrr
+        return (color_ref & 0xFF, (color_ref >> 8) & 0xFF, (color_ref >> 16) & 0xFF)
+
+    def _ensure_bitmap(self, width: int, height: int) -> None:
+        bw, bh = self._bmp_size
+        if width <= bw and height <= bh:
+            return
+        # grow only; the bitmap and buffer are reused across grabs
+        width, height = max(width, bw), max(height, bh)
+        if self._mem_dc is None:
+            self._mem_dc = self._gdi32.CreateCompatibleDC(self._hdc)
+        if self._bitmap:
+            self._gdi32.DeleteObject(self._bitmap)
+        self._bitmap = self._gdi32.CreateCompatibleBitmap(self._hdc, width, height)
+        self._gdi32.SelectObject(self._mem_dc, self._bitmap)
+        self._buffer = ctypes.create_string_buffer(width * height * BYTES_PER_PIXEL)
+        self._bmp_size = (width, height)
+
+    def grab(self, left: int, top: int, width: int, height: int) -> Optional[Frame]:
+        self._ensure_bitmap(width, height)
+        if not self._gdi32.BitBlt(self._mem_dc, 0, 0, width, height, self._hdc, left, top, self.SRCCOPY):
+            return None
+        self._bmi.biWidth = width
+        self._bmi.biHeight = -height  # negative height = top-down rows
+        lines = self._gdi32.GetDIBits(self._mem_dc, self._bitmap, 0, height, self._buffer,
+                                      ctypes.byref(self._bmi), self.DIB_RGB_COLORS)
+        if lines != height:
+            return None
+        return Frame(left, top, width, height, memoryview(self._buffer).cast("B"))
+
+    def close(self) -> None:
+        try:
+            if self._bitmap:
+                self._gdi32.DeleteObject(self._bitmap)
+                self._bitmap = None
+            if self._mem_dc:
+                self._gdi32.DeleteDC(self._mem_dc)
+                self._mem_dc = None
+            if self._hdc:
+                self._user32.ReleaseDC(0, self._hdc)
+                self._hdc = None
+        except Exception:
+            pass
+
+
+# a P6 header with a comment or two fits in this
+PPM_HEADER_MAX = 4096
+
+
+def _ppm_header(data: bytes, path: str) -> Tuple[int, int, int]:
+    """Width, height and pixel data offset of a binary 8-bit PPM (P6)."""
+    fields, pos = [], 0
+    try:
+        while len(fields) < 4:
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":
+                pos = data.index(b"\n", pos) + 1
+                continue
+            end = pos
+            while end < len(data) and not data[end:end + 1].isspace():
+                end += 1
+            if end == pos:
+                raise ValueError
+            fields.append(data[pos:end])
+            pos = end
+        magic, width, height, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    except ValueError:
+        raise ValueError(f"{path}: invalid PPM header") from None
+    if magic != b"P6" or maxval != 255:
+        raise ValueError(f"{path}: only binary 8-bit PPM (P6) is supported")
+    return width, height, pos + 1
+
+
+def read_ppm_pixels(path: str, points: Iterable[Point]) -> Dict[Point, Optional[RGB]]:
+    """Read only the given pixels of a PPM screenshot (None outside the image), seeking per pixel."""
+    with open(path, "rb") as f:
+        width, height, offset = _ppm_header(f.read(PPM_HEADER_MAX), path)
+        pixels: Dict[Point, Optional[RGB]] = {}
+        for x, y in points:
+            if not (0 <= x < width and 0 <= y < height):
+                pixels[x, y] = None
+                continue
+            f.seek(offset + (y * width + x) * 3)
+            rgb = f.read(3)
+            if len(rgb) != 3:
+                raise ValueError(f"{path}: truncated pixel data")
+            pixels[x, y] = (rgb[0], rgb[1], rgb[2])
+    return pixels
+
+
+class MemoryFrameSource(CaptureBackend):
+    """Pure-Python in-memory screen, for tests and benchmarks off Windows."""
+
+    def __init__(self, width: int, height: int, fill: RGB = (0, 0, 0)) -> None:
+        self.width = width
+        self.height = height
+        self._canvas = bytearray(bytes((fill[2], fill[1], fill[0], 0)) * (width * height))
+        self._buffer = bytearray()
+        self.pixel_reads = 0
+        self.grabs = 0
+
+    @classmethod
+    def from_ppm(cls, path: str) -> "MemoryFrameSource":
+        """Load a binary PPM (P6, maxval 255) screenshot."""
+        with open(path, "rb") as f:
+            data = f.read()
+        width, height, pos = _ppm_header(data, path)
+        rgb = data[pos:pos + width * height * 3]
+        if len(rgb) != width * height * 3:
+            raise ValueError(f"{path}: truncated pixel data")
+        src = cls(width, height)
+        canvas = src._canvas
+        canvas[0::4], canvas[1::4], canvas[2::4] = rgb[2::3], rgb[1::3], rgb[0::3]
+        return src
+
+    def to_ppm(self, path: str) -> None:
+        canvas = self._canvas
+        rgb = bytearray(self.width * self.height * 3)
+        rgb[0::3], rgb[1::3], rgb[2::3] = canvas[2::4], canvas[1::4], canvas[0::4]
+        with open(path, "wb") as f:
+            f.write(b"P6\n%d %d\n255\n" % (self.width, self.height))
+            f.write(rgb)
+
+    def set_pixel(self, x: int, y: int, color: RGB) -> None:
+        i = (y * self.width + x) * BYTES_PER_PIXEL
+        self._canvas[i:i + 3] = bytes((color[2], color[1], color[0]))
+
+    def set_pixels(self, pixels: Dict[Point, RGB]) -> None:
+        for (x, y), color in pixels.items():
+            self.set_pixel(x, y, color)
+
+    def set_region(self, left: int, top: int, width: int, height: int, bgra) -> None:
+        """Copy `height` rows of BGRA pixels (as stored in a Frame) onto the screen."""
+        row = width * BYTES_PER_PIXEL
+        dst = (top * self.width + left) * BYTES_PER_PIXEL
+        stride = self.width * BYTES_PER_PIXEL
+        for src in range(0, row * height, row):
+            self._canvas[dst:dst + row] = bgra[src:src + row]
+            dst += stride
+
+    def fill(self, color: RGB) -> None:
+        self._canvas[:] = bytes((color[2], color[1], color[0], 0)) * (self.width * self.height)
+
+    def get_pixel(self, x: int, y: int) -> Optional[RGB]:
+        self.pixel_reads += 1
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = (y * self.width + x) * BYTES_PER_PIXEL
+        c = self._canvas
+        return (c[i + 2], c[i + 1], c[i])
+
+    def grab(self, left: int, top: int, width: int, height: int) -> Optional[Frame]:
+        self.grabs += 1
+        if left < 0 or top < 0 or left + width > self.width or top + height > self.height:
+            return None
+        row = width * BYTES_PER_PIXEL
+        size = row * height
+        if len(self._buffer) < size:
+            self._buffer = bytearray(size)
+        src_stride = self.width * BYTES_PER_PIXEL
+        src = top * src_stride + left * BYTES_PER_PIXEL
+        buf, canvas = memoryview(self._buffer), memoryview(self._canvas)
+        for dst in range(0, size, row):
+            buf[dst:dst + row] = canvas[src:src + row]
+            src += src_stride
+        return Frame(left, top, width, height, buf)
+
+
+# grab plans kept per sampler (probe tables, detector stages, the pacer region)
+MAX_PLANS = 64
+
+
+class PixelSampler:
+    def __init__(self, backend: Optional[CaptureBackend] = None, overhead: float = GRAB_OVERHEAD_PX,
+                 max_area: float = MAX_GRAB_AREA) -> None:
+        self.fail_counts: Dict[Tuple[int, int], int] = {}
+        self.total_failures = 0
+        self._last_warn = 0
+        self.backend = backend if backend is not None else get_backend().capture_backend()
+        self._frame = None
+        # grab_plan limits; float("inf") for both grabs the bounding box
+        self.overhead = overhead
+        self.max_area = max_area
+        self._plans: Dict[tuple, List[Rect]] = {}
+        # frame-diff counters: snapshots compared / snapshots found unchanged
+        self.diff_checks = 0
+        self.diff_hits = 0
+        self._last_checksum: Optional[int] = None
+        # probe pixels read: points of successful snapshots plus per-pixel backend reads
+        self.points_read = 0
+
+    def plan(self, points: Iterable[Point], rects: Iterable[Rect] = ()) -> List[Rect]:
+        key = (tuple(points), tuple(rects))
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= MAX_PLANS:
+                self._plans.clear()
+            plan = self._plans[key] = grab_plan(*key, self.overhead, self.max_area)
+        return plan
+
+    def snapshot(self, points: Iterable[Point], rects: Iterable[Rect] = ()) -> bool:
+        """Grab `points`, and `rects` whole, in a few small captures (`grab_plan`); `get` then reads from them.
+
+        Fails as a whole if any capture fails.
+        """
+        self._frame = None
+        points = tuple(points)
+        plan = self.plan(points, rects)
+        if not plan:
+            return False
+        parts = []
+        for rect in plan:
+            try:
+                frame = self.backend.grab(*rect)
+            except Exception:
+                self._record_failure(rect[:2])
+                frame = None
+            if frame is None:
+                # `get` falls back to per-pixel reads
+                return False
+            if len(parts) < len(plan) - 1:
+                # the backend reuses its buffer for the next grab
+                frame = Frame(frame.left, frame.top, frame.width, frame.height,
+                              bytes(frame.data[:frame.height * frame.stride]))
+            parts.append(frame)
+        self._frame = parts[0] if len(parts) == 1 else FrameSet(parts)
+        self.points_read += len(points)
+        return True
+
+    @property
+    def frame(self):
+        """The last snapshot: a Frame, a FrameSet for several captures, or None."""
+        return self._frame
+
+    def release(self) -> None:
+        self._frame = None
+
+    def unchanged(self, points: Iterable[Point]) -> bool:
+        """True if the snapshot's pixels at `points` equal those of the previous check."""
+        frame = self._frame
+        if frame is None:
+            self._last_checksum = None
+            return False
+        crc = frame.checksum(points)
+        same = crc == self._last_checksum
+        self._last_checksum = crc
+        self.diff_checks += 1
+        if same:
+            self.diff_hits += 1
+        return same
+
+    def invalidate(self) -> None:
+        """Forget the last checksum so the next check classifies from scratch."""
+        self._last_checksum = None
+
+    @property
+    def diff_hit_rate(self) -> float:
+        return self.diff_hits / self.diff_checks if self.diff_checks else 0.0
+
+    def get(self, x: int, y: int) -> Optional[Tuple[int, int, int]]:
+        frame = self._frame
+        if frame is not None and frame.contains(x, y):
+            return frame.pixel(x, y)
+        self.points_read += 1
+        try:
+            return self.backend.get_pixel(x, y)
+        except Exception:
+            self._record_failure((x, y))
+            return None
+
+    def _record_failure(self, key: Tuple[int, int]) -> None:
+        self.fail_counts[key] = self.fail_counts.get(key, 0) + 1
+        self.total_failures += 1
+        if self.total_failures - self._last_warn >= 25:
+            self._last_warn = self.total_failures
+            logger.warning("Pixel failures total=%d unique=%d", self.total_failures, len(self.fail_counts))
+
+    @staticmethod
+    def colors_match(c1: Tuple[int, int, int], c2: Tuple[int, int, int], tolerance: int = 10) -> bool:
+        if not c1 or not c2:
+            return False
+        return all(abs(a - b) <= tolerance for a, b in zip(c1, c2))
@@ -0,0 +1,114 @@
+import heapq
+from itertools import count
+from threading import Event
+from time import perf_counter, sleep
+from typing import Callable, List, Tuple
+
+from src.histogram import Histogram
+
+
+class Clock:
+    """Monotonic time source plus interruptible waits (real time)."""
+
+    def now(self) -> float:
+        return perf_counter()
+
+    def wait(self, event: Event, timeout: float) -> bool:
+        return event.wait(timeout)
+
+
+class PreciseClock(Clock):
+    """Hybrid wait: Event.wait() until shortly before the deadline, then spin.
+
+    Timed waits can wake ~15 ms late on Windows. The spin margin follows the
+    observed coarse-wait overshoot (capped at `max_spin`), and spinning is
+    skipped once it would exceed `cpu_budget` of the time spent waiting. The
+    spin polls the event, so a hotkey still interrupts it.
+    """
+
+    def __init__(self, cpu_budget: float = 0.05, max_spin: float = 0.02, margin: float = 0.002) -> None:
+        self.cpu_budget = cpu_budget
+        self.max_spin = max_spin
+        self.margin = margin
+        self.spin_time = 0.0
+        self.wait_time = 0.0
+        # lateness of timed-out waits: after the coarse phase / after the whole wait
+        self.coarse_overshoot = Histogram()
+        self.overshoot = Histogram()
+
+    def wait(self, event: Event, timeout: float) -> bool:
+        start = perf_counter()
+        deadline = start + timeout
+        try:
+            coarse = timeout - self.margin
+            if coarse > 0:
+                if event.wait(coarse):
+                    return True
+                late = perf_counter() - (start + coarse)
+                self.coarse_overshoot.add(max(0.0, late))
+                # keep the margin a little above the typical coarse overshoot
+                self.margin = min(self.max_spin, max(0.0005, 0.8 * self.margin + 0.2 * 1.5 * late))
+            now = perf_counter()
+            if now < deadline and self.spin_time > self.cpu_budget * (self.wait_time + (now - start)):
+                # over budget: plain wait for the rest
+                if event.wait(deadline - now):
+                    return True
+            else:
+                spin_start = now
+                while now < deadline:
+                    if event.is_set():
+                        self.spin_time += perf_counter() - spin_start
+                        return True
+                    # release the GIL so listener threads can set the event
+                    sleep(0)
+                    now = perf_counter()
+                self.spin_time += now - spin_start
+            self.overshoot.add(max(0.0, perf_counter() - deadline))
+            return False
+        finally:
+            self.wait_time += perf_counter() - start
+
+    @property
+    def spin_fraction(self) -> float:
+        return self.spin_time / self.wait_time if self.wait_time else 0.0
+
+
+class VirtualClock(Clock):
+    """Simulated time: waits jump straight to the deadline or the next scheduled callback.
+
+    Callbacks registered with `call_at` run inside `wait` at their virtual time;
+    if one sets the awaited event the wait returns early, like a real wakeup.
+    Single-threaded by design.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+        self._seq = count()
+        self._pending: List[Tuple[float, int, Callable[[], None]]] = []
+        self.waits = 0
+
+    def now(self) -> float:
+        return self._now
+
+    def call_at(self, when: float, fn: Callable[[], None]) -> None:
+        heapq.heappush(self._pending, (when, next(self._seq), fn))
+
+    def advance(self, seconds: float) -> None:
+        self._run_until(self._now + seconds, None)
+
+    def wait(self, event: Event, timeout: float) -> bool:
+        self.waits += 1
+        if event.is_set():
+            return True
+        return self._run_until(self._now + max(0.0, timeout), event)
+
+    def _run_until(self, deadline: float, event) -> bool:
+        pending = self._pending
+        while pending and pending[0][0] <= deadline:
+            when, _, fn = heapq.heappop(pending)
+            self._now = max(self._now, when)
+            fn()
+            if event is not None and event.is_set():
+                return True
+        self._now = max(self._now, deadline)
+        return False
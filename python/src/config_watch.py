@@ -0,0 +1,167 @@
+"""Hot reload of .env and the layout table while the skipper runs.
+
+A watcher thread polls the files' modification stamps. On a change it reads
+.env, validates it with ScreenConfig.from_env, and rebuilds only what the
+change touches:
+
+    resolution / layout   probe table, detector cascade (and the pacer)
+    DETECTORS             detector cascade
+    timing keys           timing model (see src/timing.py)
+    poll intervals, title applied as plain values
+
+An invalid file is rejected as a whole and the running config stays. The
+prebuilt pieces are handed to the loop, which swaps them in at its next
+step with a few attribute assignments. Dialogue state, timers and counters
+carry over. Each reload logs its build time and the loop's swap pause, and
+both are kept as the reload_build and reload_pause histograms of the
+instrumentation snapshot.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from random import Random
+from threading import Event, Thread
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.detectors import DetectorCascade
+from src.histogram import Histogram
+from src.layouts import LAYOUTS_FILE, reload_layouts
+from src.pacing import PressPacer
+from src.probes import ProbeTable
+from src.timing import TimingModel
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 1.0
+
+
+@dataclass
+class Reload:
+    """A validated config plus the derived pieces that changed (None: keep the running one)."""
+    config: ScreenConfig
+    changed: Tuple[str, ...]
+    table: Optional[ProbeTable] = None
+    cascade: Optional[DetectorCascade] = None
+    timing: Optional[TimingModel] = None
+    pacer: Optional[PressPacer] = None
+    build_seconds: float = 0.0
+
+
+def _geometry(cfg: ScreenConfig) -> tuple:
+    return cfg.WIDTH, cfg.HEIGHT, cfg.PLAYING_ICON, cfg.DIALOGUE_ICON, cfg.LOADING_PIXEL, cfg.geometry.tolerance
+
+
+def plan_reload(old: ScreenConfig, new: ScreenConfig, table: ProbeTable, rand: Random,
+                pacer: bool = False) -> Reload:
+    """Build the pieces of `new` that differ from `old`; `table` is the running probe table."""
+    t0 = perf_counter()
+    reload = Reload(new, ())
+    changed = []
+    if _geometry(new) != _geometry(old):
+        reload.table = table = new.probe_table()
+        changed.append("probes")
+        if pacer:
+            reload.pacer = PressPacer.for_screen(new.WIDTH, new.HEIGHT)
+    if reload.table is not None or new.DETECTORS != old.DETECTORS:
+        reload.cascade = new.detector_cascade(table)
+        changed.append("detectors")
+    if new.TIMING != old.TIMING:
+        reload.timing = TimingModel(rand, params=new.TIMING)
+        # fill the queues here rather than on the loop's first draws
+        reload.timing.refill()
+        changed.append("timing")
+    if (new.POLL_MIN_INTERVAL, new.POLL_MAX_INTERVAL) != (old.POLL_MIN_INTERVAL, old.POLL_MAX_INTERVAL):
+        changed.append("polling")
+    if new.WINDOW_TITLE != old.WINDOW_TITLE:
+        changed.append("window title")
+    reload.changed = tuple(changed)
+    reload.build_seconds = perf_counter() - t0
+    return reload
+
+
+class ConfigWatcher:
+    """Polls .env and the layout table and hands validated reloads to a running skipper.
+
+    `base_env` is the process environment from before .env was loaded:
+    variables set there keep precedence over the file, as with `load_dotenv`.
+    """
+
+    def __init__(self, skipper: AutoSkipper, env_path: str, layouts_path: str = LAYOUTS_FILE,
+                 base_env: Optional[Dict[str, str]] = None, interval: float = WATCH_INTERVAL,
+                 rand: Optional[Random] = None) -> None:
+        self.skipper = skipper
+        self.env_path = env_path
+        self.layouts_path = layouts_path
+        self.base_env = dict(base_env if base_env is not None else os.environ)
+        self.interval = interval
+        self.rand = rand if rand is not None else Random()
+        self.reloads = 0
+        self.rejected = 0
+        self.build_time = Histogram()
+        skipper.metrics.attach("reload_build", self.build_time)
+        # compared against and updated by this thread only
+        self._config = skipper.config
+        self._table = skipper._probe_table
+        self._stamps = self._stat()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def _stat(self) -> tuple:
+        stamps = []
+        for path in (self.env_path, self.layouts_path):
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(1.0)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Config watch error")
+
+    def poll(self) -> Optional[Reload]:
+        """Check the files once; on a valid change, submit and return the reload."""
+        stamps = self._stat()
+        if stamps == self._stamps:
+            return None
+        layouts_changed = stamps[1] != self._stamps[1]
+        self._stamps = stamps
+        if layouts_changed:
+            reload_layouts()
+        from dotenv import dotenv_values
+
+        env = {k: v for k, v in dotenv_values(self.env_path).items() if v is not None}
+        env.update(self.base_env)
+        try:
+            config = ScreenConfig.from_env(env)
+        except ValueError as e:
+            self.rejected += 1
+            logger.warning(f"Config change rejected, keeping the running config: {e}")
+            return None
+        reload = plan_reload(self._config, config, self._table, self.rand, self.skipper.pacer is not None)
+        if not reload.changed:
+            return None
+        self._config = config
+        if reload.table is not None:
+            self._table = reload.table
+        self.build_time.add(reload.build_seconds)
+        self.reloads += 1
+        self.skipper.request_reload(reload)
+        return reload
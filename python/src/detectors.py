@@ -0,0 +1,544 @@
+"""Pluggable dialogue detectors and the cascade that combines them.
+
+A detector looks at a captured frame and answers "is a dialogue showing?",
+together with whether it is sure. Strategies, cheapest first:
+
+    probe      the probe pixels of src/probes.py (always the first stage)
+    template   small patches around the probe points against stored templates
+    roi        larger patches matched by shape, robust to HDR and color filters
+    histogram  color histogram of the dialogue box region
+
+The cascade only runs a later stage while every earlier one is unsure, so
+a normal check costs one probe match. Leaving "probe" out of the list
+makes the later stages decide every check, e.g. ["roi"] where HDR pushes
+the icon colors far outside the probe tolerances. The stages are chosen per resolution
+(the "detectors" key of a layouts.json entry, or DETECTORS in .env).
+Template and histogram references are fitted from labelled reference frames
+(see src/layouts.py), and the strategies can be compared on those frames or
+on a frame recording:
+
+    python -m src.detectors fit --frames reference_frames/
+    python -m src.detectors bench --frames reference_frames/
+    python -m src.detectors bench --recording autoskip_frames.rec
+"""
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.capture import CaptureBackend, Frame, MemoryFrameSource, PixelSampler, Point, Rect
+from src.probes import ProbeTable
+from src.recording import patch_rects
+from src.roi import RoiMatcher, contrast, distance, normalize, planar_patch
+
+logger = logging.getLogger(__name__)
+
+REFS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detector_refs.json")
+DEFAULT_DETECTORS = ("probe",)
+
+# the probe verdict is unsure when it flips with tolerances this many times wider
+PROBE_MARGIN = 2.5
+# template patches are 7x7; a patch matches below this mean channel difference
+TEMPLATE_RADIUS = 3
+TEMPLATE_THRESHOLD = 12
+MAX_TEMPLATES = 8
+# roi patches are 17x17 and scored after normalization (src/roi.py); a fitted
+# template needs some structure, or any flat patch would match it
+ROI_RADIUS = 8
+ROI_THRESHOLD = 24
+ROI_MIN_CONTRAST = 12
+# dialogue box region as fractions of the screen: left, top, right, bottom
+DIALOGUE_BOX = (0.25, 0.80, 0.75, 0.94)
+HISTOGRAM_GRID = (24, 6)
+# 4 bins per channel, 64 in total
+HISTOGRAM_SHIFT = 6
+# the histogram verdict is unsure below this similarity difference between the classes
+HISTOGRAM_MARGIN = 0.1
+MAX_HISTOGRAMS = 16
+
+# reference frame labels (src/layouts.py) that show a dialogue
+DIALOGUE_LABELS = ("playing", "choice")
+# probes lit on a reference frame with this label
+LABEL_PROBES = {"playing": ("playing",), "choice": ("choice_low", "choice_high"), "loading": ("loading",)}
+
+
+class Detection(NamedTuple):
+    dialogue: bool
+    confident: bool = True
+    # probe hit bits where the strategy has them, else 0
+    mask: int = 0
+
+
+class Detector:
+    """One detection strategy.
+
+    `points` are the screen pixels it reads and `rects` the patches it reads
+    whole; the caller grabs them (`PixelSampler.snapshot`) and passes the
+    frame to `detect`. Lower `cost` runs earlier.
+    """
+
+    name = ""
+    cost = 0
+    points: Tuple[Point, ...] = ()
+    rects: Tuple[Rect, ...] = ()
+
+    def detect(self, frame: Frame) -> Detection:
+        raise NotImplementedError
+
+    def fit(self, samples: Sequence[Tuple[Frame, str]]) -> None:
+        """Learn references from (frame, label) reference frames; no-op by default."""
+
+    def references(self) -> Optional[dict]:
+        """Learned references for the references file, or None if there is nothing to store."""
+        return None
+
+
+# name -> factory(probe table, (width, height), stored references or None)
+DETECTORS: Dict[str, Callable[[ProbeTable, Tuple[int, int], Optional[dict]], Detector]] = {}
+
+
+def register(name: str):
+    def decorator(factory):
+        DETECTORS[name] = factory
+        factory.name = name
+        return factory
+    return decorator
+
+
+def dialogue_box(width: int, height: int) -> Tuple[int, int, int, int]:
+    """(left, top, width, height) of the dialogue text box on a screen of this size."""
+    left, top, right, bottom = (int(f * s) for f, s in zip(DIALOGUE_BOX, (width, height, width, height)))
+    return left, top, right - left, bottom - top
+
+
+def check_names(names: Iterable[str]) -> Tuple[str, ...]:
+    names = tuple(names)
+    unknown = [n for n in names if n not in DETECTORS]
+    if unknown:
+        raise ValueError(f"Unknown detectors: {unknown} (known: {sorted(DETECTORS)})")
+    return names
+
+
+def _mean_difference(a: bytes, b: bytes) -> float:
+    return sum(abs(x - y) for x, y in zip(a, b)) / len(a)
+
+
+@register("probe")
+class ProbeDetector(Detector):
+    """The probe table, unsure when looser tolerances would change the verdict.
+
+    With `decides` False it is never sure, so later stages decide every check.
+    """
+
+    cost = 0
+
+    def __init__(self, table: ProbeTable, size: Optional[Tuple[int, int]] = None, refs: Optional[dict] = None,
+                 margin: float = PROBE_MARGIN, decides: bool = True) -> None:
+        self.table = table
+        self.loose = table.scaled(margin)
+        self.points = table.points
+        self.decides = decides
+
+    def detect(self, frame: Frame) -> Detection:
+        return self.check(frame, self.table.match_mask(frame))
+
+    def check(self, frame: Frame, mask: int) -> Detection:
+        """Verdict for a mask already matched on `frame`."""
+        dialogue = self.table.test("dialogue", mask)
+        if not self.decides:
+            return Detection(dialogue, False, mask)
+        loose = self.loose.test("dialogue", self.loose.match_mask(frame))
+        return Detection(dialogue, loose == dialogue, mask)
+
+
+@register("template")
+class TemplateDetector(Detector):
+    """Patches around the probe points scored against per-probe templates.
+
+    Without fitted references each probe's template is a patch of its solid
+    probe color, i.e. the probe test averaged over the patch.
+    """
+
+    cost = 1
+
+    def __init__(self, table: ProbeTable, size: Tuple[int, int], refs: Optional[dict] = None,
+                 radius: int = TEMPLATE_RADIUS, threshold: float = TEMPLATE_THRESHOLD) -> None:
+        self.table = table
+        self.threshold = threshold
+        self.rects = tuple(patch_rects(table.points, radius, *size))
+        self.points = tuple(p for l, t, w, h in self.rects for p in ((l, t), (l + w - 1, t + h - 1)))
+        self._probe_hits = table.scaled(PROBE_MARGIN)
+        stored = (refs or {}).get("templates", {})
+        self.learned: Dict[str, List[bytes]] = {}
+        for probe, (_, _, w, h) in zip(table.probes, self.rects):
+            patches = [bytes.fromhex(p) for p in stored.get(probe.name, ())]
+            patches = [p for p in patches if len(p) == w * h * 3]
+            if patches:
+                self.learned[probe.name] = patches
+        self.templates = [self.learned.get(p.name) or self._default(p.color, w, h)
+                          for p, (_, _, w, h) in zip(table.probes, self.rects)]
+
+    def _default(self, color, width: int, height: int) -> List[bytes]:
+        # a solid patch of the probe color
+        return [bytes(([color[0]] * width + [color[1]] * width + [color[2]] * width) * height)]
+
+    def scores(self, frame: Frame) -> List[float]:
+        """Best mean channel difference per probe (inf where the patch is not in the frame)."""
+        out = []
+        for rect, templates in zip(self.rects, self.templates):
+            patch = planar_patch(frame, rect)
+            if patch is None:
+                out.append(float("inf"))
+                continue
+            out.append(min(_mean_difference(patch, t) for t in templates))
+        return out
+
+    def detect(self, frame: Frame) -> Detection:
+        strict = loose = 0
+        for i, score in enumerate(self.scores(frame)):
+            if score <= self.threshold:
+                strict |= 1 << i
+            if score <= 2 * self.threshold:
+                loose |= 1 << i
+        dialogue = self.table.test("dialogue", strict)
+        return Detection(dialogue, self.table.test("dialogue", loose) == dialogue, strict)
+
+    def fit(self, samples: Sequence[Tuple[Frame, str]]) -> None:
+        names = self.table.names
+        for frame, label in samples:
+            hits = self._probe_hits.match_mask(frame)
+            for name in LABEL_PROBES.get(label, ()):
+                i = names.index(name)
+                width = self.rects[i][2]
+                patch = planar_patch(frame, self.rects[i])
+                if patch is None or not hits >> i & 1 or not self._usable(patch, width):
+                    continue
+                known = self.learned.setdefault(name, [])
+                if len(known) < MAX_TEMPLATES and all(
+                        self._distance(patch, t, width) > self.threshold / 2 for t in known):
+                    known.append(patch)
+        for i, name in enumerate(names):
+            if self.learned.get(name):
+                self.templates[i] = self.learned[name]
+
+    def _usable(self, patch: bytes, width: int) -> bool:
+        return True
+
+    def _distance(self, a: bytes, b: bytes, width: int) -> float:
+        return _mean_difference(a, b)
+
+    def references(self) -> Optional[dict]:
+        if not self.learned:
+            return None
+        return {"templates": {name: [p.hex() for p in patches] for name, patches in self.learned.items()}}
+
+
+@register("roi")
+class RoiDetector(TemplateDetector):
+    """Larger patches matched by shape rather than color (see src/roi.py).
+
+    Tolerates HDR, gamma and color-filter shifts. Matches nothing until
+    templates have been fitted, and skips flat patches when fitting.
+    """
+
+    cost = 2
+
+    def __init__(self, table: ProbeTable, size: Tuple[int, int], refs: Optional[dict] = None,
+                 radius: int = ROI_RADIUS, threshold: float = ROI_THRESHOLD) -> None:
+        super().__init__(table, size, refs, radius, threshold)
+        self._matcher: Optional[RoiMatcher] = None
+
+    def _default(self, color, width: int, height: int) -> List[bytes]:
+        return []
+
+    def _usable(self, patch: bytes, width: int) -> bool:
+        return contrast(patch, width) >= ROI_MIN_CONTRAST
+
+    def _distance(self, a: bytes, b: bytes, width: int) -> float:
+        return distance(normalize(a, width), normalize(b, width))
+
+    def scores(self, frame: Frame) -> List[float]:
+        if self._matcher is None:
+            self._matcher = RoiMatcher(self.rects, self.templates)
+        return self._matcher.scores(frame)
+
+    def detect(self, frame: Frame) -> Detection:
+        if not self.learned:
+            return Detection(False, False)
+        return super().detect(frame)
+
+    def fit(self, samples: Sequence[Tuple[Frame, str]]) -> None:
+        super().fit(samples)
+        self._matcher = None
+
+
+@register("histogram")
+class HistogramDetector(Detector):
+    """Coarse color histogram of the dialogue box region, nearest to fitted references.
+
+    Unsure until both dialogue and non-dialogue references have been fitted.
+    """
+
+    cost = 3
+
+    def __init__(self, table: ProbeTable, size: Tuple[int, int], refs: Optional[dict] = None) -> None:
+        left, top, w, h = dialogue_box(*size)
+        cols, rows = HISTOGRAM_GRID
+        self.points = tuple((left + w * (2 * i + 1) // (2 * cols), top + h * (2 * j + 1) // (2 * rows))
+                            for j in range(rows) for i in range(cols))
+        refs = refs or {}
+        self.refs: Dict[str, List[List[float]]] = {
+            "dialogue": list(refs.get("dialogue", [])),
+            "other": list(refs.get("other", [])),
+        }
+
+    def histogram(self, frame: Frame) -> List[float]:
+        bins = 256 >> HISTOGRAM_SHIFT
+        counts = [0] * bins ** 3
+        n = 0
+        for x, y in self.points:
+            px = frame.pixel(x, y)
+            if px is None:
+                continue
+            r, g, b = px
+            counts[((r >> HISTOGRAM_SHIFT) * bins + (g >> HISTOGRAM_SHIFT)) * bins + (b >> HISTOGRAM_SHIFT)] += 1
+            n += 1
+        return [c / n for c in counts] if n else counts
+
+    @staticmethod
+    def similarity(a: Sequence[float], b: Sequence[float]) -> float:
+        """Histogram intersection: 1.0 for identical normalized histograms."""
+        return sum(min(x, y) for x, y in zip(a, b))
+
+    def detect(self, frame: Frame) -> Detection:
+        dialogue_refs, other_refs = self.refs["dialogue"], self.refs["other"]
+        if not dialogue_refs or not other_refs:
+            return Detection(False, False)
+        hist = self.histogram(frame)
+        yes = max(self.similarity(hist, r) for r in dialogue_refs)
+        no = max(self.similarity(hist, r) for r in other_refs)
+        return Detection(yes > no, abs(yes - no) >= HISTOGRAM_MARGIN)
+
+    def fit(self, samples: Sequence[Tuple[Frame, str]]) -> None:
+        for frame, label in samples:
+            hist = self.histogram(frame)
+            known = self.refs["dialogue" if label in DIALOGUE_LABELS else "other"]
+            # near-duplicates add nothing but comparison time
+            if len(known) < MAX_HISTOGRAMS and all(self.similarity(hist, r) < 0.95 for r in known):
+                known.append([round(v, 4) for v in hist])
+
+    def references(self) -> Optional[dict]:
+        if not (self.refs["dialogue"] or self.refs["other"]):
+            return None
+        return dict(self.refs)
+
+
+class DetectorCascade:
+    """Detectors in cost order; each later stage only runs while the earlier ones are unsure."""
+
+    def __init__(self, stages: Sequence[Detector]) -> None:
+        if not stages:
+            raise ValueError("DetectorCascade needs at least one detector")
+        self.stages = sorted(stages, key=lambda d: d.cost)
+        self.names = tuple(d.name for d in self.stages)
+
+    @property
+    def points(self) -> Tuple[Point, ...]:
+        return tuple(dict.fromkeys(p for stage in self.stages for p in stage.points))
+
+    def run(self, sampler: PixelSampler, start: int = 0,
+            verdict: Detection = Detection(False, False)) -> Tuple[Detection, int]:
+        """Run stages from `start` until one is sure; return the last verdict and its stage index.
+
+        `verdict` is the answer so far, kept if no stage can grab its region.
+        """
+        decided = start - 1
+        for i in range(start, len(self.stages)):
+            stage = self.stages[i]
+            if not sampler.snapshot(stage.points, stage.rects):
+                continue
+            verdict, decided = stage.detect(sampler.frame), i
+            sampler.release()
+            if verdict.confident:
+                break
+        return verdict, decided
+
+
+def build_cascade(names: Iterable[str], table: ProbeTable, size: Tuple[int, int],
+                  refs: Optional[dict] = None) -> DetectorCascade:
+    """Cascade of the named detectors.
+
+    The probe stage always runs first, since its hits drive the poller and the
+    trace. Left out of `names`, it only never decides.
+    """
+    names = check_names(dict.fromkeys(names)) or DEFAULT_DETECTORS
+    refs = refs or {}
+    stages: List[Detector] = [ProbeDetector(table, decides="probe" in names)]
+    stages += [DETECTORS[n](table, size, refs.get(n)) for n in names if n != "probe"]
+    return DetectorCascade(stages)
+
+
+def _read_references(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_references(width: int, height: int, path: str = REFS_FILE) -> dict:
+    """Stored references for one resolution, {detector name: references}; empty if none."""
+    try:
+        return _read_references(path).get(f"{width}x{height}", {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Detector references unavailable ({e}), using defaults.")
+        return {}
+
+
+def save_references(width: int, height: int, refs: dict, path: str = REFS_FILE) -> None:
+    raw = _read_references(path)
+    raw[f"{width}x{height}"] = refs
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(raw, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# --- benchmark ---
+@dataclass
+class BenchRow:
+    name: str
+    frames: int = 0
+    # detect() seconds per frame; for the cascade row including its grabs
+    times: List[float] = field(default_factory=list)
+    unsure: int = 0
+    # frames agreeing with the label, or with the probe verdict when unlabelled
+    agree: int = 0
+    escalated: int = 0
+
+    def line(self) -> str:
+        n = self.frames or 1
+        times = sorted(self.times) or [0.0]
+        mean = sum(times) / len(times)
+        return (f"{self.name:>10} {self.frames:>7} {mean * 1e6:>9.1f} {times[-1] * 1e6:>9.1f} "
+                f"{100 * self.unsure / n:>7.1f} {100 * self.agree / n:>7.1f} {100 * self.escalated / n:>7.1f}")
+
+
+BENCH_HEADER = f"{'detector':>10} {'frames':>7} {'mean_us':>9} {'max_us':>9} {'unsure%':>7} {'agree%':>7} {'escal%':>7}"
+
+
+def bench(cascade: DetectorCascade, sources: Iterable[Tuple[Optional[str], CaptureBackend]],
+          repeat: int = 5) -> List[BenchRow]:
+    """Time and score every stage, and the cascade as a whole, on each source frame.
+
+    A labelled source is scored against its label (src/layouts.py), an
+    unlabelled one (a recording) against the probe verdict.
+    """
+    rows = [BenchRow(name) for name in cascade.names]
+    total = BenchRow("cascade")
+    for label, source in sources:
+        sampler = PixelSampler(source)
+        verdicts = []
+        for stage, row in zip(cascade.stages, rows):
+            if not sampler.snapshot(stage.points, stage.rects):
+                verdicts.append(None)
+                continue
+            frame = sampler.frame
+            t0 = perf_counter()
+            for _ in range(repeat):
+                det = stage.detect(frame)
+            row.times.append((perf_counter() - t0) / repeat)
+            sampler.release()
+            verdicts.append(det)
+        if verdicts[0] is None:
+            continue
+        expected = label in DIALOGUE_LABELS if label else verdicts[0].dialogue
+        for det, row in zip(verdicts, rows):
+            if det is not None:
+                row.frames += 1
+                row.unsure += not det.confident
+                row.agree += det.dialogue == expected
+        t0 = perf_counter()
+        det, stage = cascade.run(sampler)
+        total.times.append(perf_counter() - t0)
+        total.frames += 1
+        total.unsure += not det.confident
+        total.agree += det.dialogue == expected
+        total.escalated += stage > 0
+    return rows + [total]
+
+
+def _labelled_sources(directory: str) -> Dict[Tuple[int, int], List[Tuple[str, MemoryFrameSource]]]:
+    from src.layouts import reference_frames
+
+    return {size: [(label, MemoryFrameSource.from_ppm(path)) for label, path in frames]
+            for size, frames in reference_frames(directory).items()}
+
+
+def _recording_sources(path: str):
+    from src.clock import VirtualClock
+    from src.recording import Recording, ReplayCaptureBackend
+
+    recording = Recording(path)
+    clock = VirtualClock()
+    replay = ReplayCaptureBackend(recording, clock)
+
+    def frames():
+        for t, _ in recording.frames:
+            clock.advance(max(0.0, t - clock.now()))
+            yield None, replay
+
+    return (recording.width, recording.height), frames()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from src.autoskip_dialogue import ScreenConfig
+
+    parser = argparse.ArgumentParser(description="Fit and benchmark dialogue detectors")
+    parser.add_argument("--refs", default=REFS_FILE, help="Detector references file")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    fit = sub.add_parser("fit", help="Learn template and histogram references from labelled frames")
+    fit.add_argument("--frames", required=True, help="Directory of <W>x<H>_<label>.ppm files")
+    run = sub.add_parser("bench", help="Compare detectors on labelled frames or a frame recording")
+    source = run.add_mutually_exclusive_group(required=True)
+    source.add_argument("--frames", help="Directory of <W>x<H>_<label>.ppm files")
+    source.add_argument("--recording", help="Frame recording (--record-frames output)")
+    run.add_argument("--detectors", default=",".join(DETECTORS), help="Comma-separated detectors to compare")
+    run.add_argument("--repeat", type=int, default=5, help="detect() calls timed per frame")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "fit":
+        for (w, h), sources in _labelled_sources(args.frames).items():
+            cascade = build_cascade(DETECTORS, ScreenConfig(w, h).probe_table(), (w, h))
+            samples = [(src.grab(0, 0, w, h), label) for label, src in sources]
+            refs = {}
+            for stage in cascade.stages:
+                stage.fit(samples)
+                if stage.references() is not None:
+                    refs[stage.name] = stage.references()
+            save_references(w, h, refs, args.refs)
+            print(f"{w}x{h}: fitted {', '.join(refs) or 'nothing'} from {len(samples)} frames")
+        return 0
+
+    try:
+        names = check_names(n for n in args.detectors.split(",") if n)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.recording:
+        groups = [_recording_sources(args.recording)]
+    else:
+        groups = list(_labelled_sources(args.frames).items())
+    for (w, h), sources in groups:
+        cascade = build_cascade(names, ScreenConfig(w, h).probe_table(), (w, h), load_references(w, h, args.refs))
+        print(f"{w}x{h}")
+        print(BENCH_HEADER)
+        for row in bench(cascade, sources, args.repeat):
+            print(row.line())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,258 @@
+import ctypes
+import logging
+import threading
+from threading import Event, Thread
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# notify(hwnd, recheck_title)
+Notify = Callable[[int, bool], None]
+
+
+class FocusSource:
+    """Reports the foreground window; push sources call `notify` on changes."""
+
+    def foreground(self) -> int:
+        raise NotImplementedError
+
+    def title(self, hwnd: int) -> str:
+        raise NotImplementedError
+
+    def start(self, notify: Notify) -> bool:
+        """Begin delivering notifications; return False if unavailable."""
+        return False
+
+    def stop(self) -> None:
+        pass
+
+
+class PollingFocusSource(FocusSource):
+    """Fallback source: polls the foreground hwnd on a background thread."""
+
+    def __init__(self, get_foreground: Callable[[], int], get_title: Callable[[int], str],
+                 interval: float = 0.1) -> None:
+        self._get_foreground = get_foreground
+        self._get_title = get_title
+        self.interval = interval
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def foreground(self) -> int:
+        return self._get_foreground()
+
+    def title(self, hwnd: int) -> str:
+        return self._get_title(hwnd)
+
+    def start(self, notify: Notify) -> bool:
+        self._stop.clear()
+        self._thread = Thread(target=self._run, args=(notify,), name="focus-poll", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, notify: Notify) -> None:
+        while not self._stop.is_set():
+            try:
+                notify(self._get_foreground(), False)
+            except Exception:
+                logger.exception("Focus poll error")
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
+
+
+class WinEventFocusSource(PollingFocusSource):
+    """Receives EVENT_SYSTEM_FOREGROUND via SetWinEventHook on a message-loop thread."""
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self, get_foreground: Callable[[], int], get_title: Callable[[int], str]) -> None:
+        super().__init__(get_foreground, get_title)
+        self._thread_id = 0
+        self._ready = Event()
+        self._ok = False
+        self._proc = None  # keep the ctypes callback alive
+
+    def start(self, notify: Notify) -> bool:
+        self._ready.clear()
+        self._thread = Thread(target=self._run, args=(notify,), name="focus-hook", daemon=True)
+        self._thread.start()
+        self._ready.wait(2.0)
+        return self._ok
+
+    def _run(self, notify: Notify) -> None:
+        try:
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+            proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                           wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        except Exception:
+            self._ready.set()
+            return
+
+        def on_event(_hook, event, hwnd, id_object, _id_child, _thread, _time):
+            try:
+                if event == self.EVENT_SYSTEM_FOREGROUND:
+                    notify(hwnd or 0, False)
+                elif id_object == self.OBJID_WINDOW and hwnd and hwnd == user32.GetForegroundWindow():
+                    notify(hwnd, True)
+            except Exception:
+                logger.exception("Focus hook error")
+
+        self._proc = proc_type(on_event)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        hooks = [user32.SetWinEventHook(ev, ev, 0, self._proc, 0, 0, flags)
+                 for ev in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE)]
+        self._ok = bool(hooks[0])
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        if not self._ok:
+            return
+        try:
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+
+    def stop(self) -> None:
+        if self._ok and self._thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
+        self._ok = False
+
+
+class FakeFocusSource(FocusSource):
+    """Scriptable source for tests: `switch()` changes the foreground window."""
+
+    def __init__(self, hwnd: int = 0, title: str = "") -> None:
+        self.hwnd = hwnd
+        self.titles = {hwnd: title}
+        self.title_calls = 0
+        self._notify: Optional[Notify] = None
+
+    def foreground(self) -> int:
+        return self.hwnd
+
+    def title(self, hwnd: int) -> str:
+        self.title_calls += 1
+        return self.titles.get(hwnd, "")
+
+    def start(self, notify: Notify) -> bool:
+        self._notify = notify
+        return True
+
+    def stop(self) -> None:
+        self._notify = None
+
+    def switch(self, hwnd: int, title: Optional[str] = None) -> None:
+        self.hwnd = hwnd
+        if title is not None:
+            self.titles[hwnd] = title
+        if self._notify:
+            self._notify(hwnd, title is not None)
+
+
+class FocusTracker:
+    """Cached "is the game focused" flag, updated from a FocusSource.
+
+    `is_active` and `generation` are plain attributes, so readers never take
+    a lock; `generation` increments on every active/inactive transition.
+    They are written from several threads: the source thread, `refresh` (the
+    loop thread) and `set_title` (the config watcher). Those writes, and the
+    listener calls they make, are serialized by `_lock`.
+    """
+
+    def __init__(self, window_title: str, source: FocusSource) -> None:
+        self._needle = window_title.lower()
+        self.source = source
+        self.is_active = False
+        self.generation = 0
+        self.running = False
+        self._hwnd: Optional[int] = None
+        self._active_event = Event()
+        self._listeners: List[Callable[[bool], None]] = []
+        # reentrant: a listener may call back into the tracker
+        self._lock = threading.RLock()
+
+    @property
+    def hwnd(self) -> Optional[int]:
+        """The last foreground window reported by the source."""
+        return self._hwnd
+
+    def set_title(self, window_title: str) -> None:
+        """Match windows by a new title and re-test the current foreground window."""
+        self._needle = window_title.lower()
+        try:
+            self._notify(self.source.foreground(), True)
+        except Exception:
+            self._set_active(False)
+
+    def add_listener(self, fn: Callable[[bool], None]) -> None:
+        """Call `fn(is_active)` on every transition (from the source thread)."""
+        self._listeners.append(fn)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.refresh()
+        if not self.source.start(self._notify):
+            logger.warning("Focus events unavailable, falling back to polling")
+            self.source = PollingFocusSource(self.source.foreground, self.source.title)
+            self.source.start(self._notify)
+        self.running = True
+
+    def stop(self) -> None:
+        if self.running:
+            self.running = False
+            self.source.stop()
+
+    def refresh(self) -> bool:
+        """Synchronously poll the source (used when no notifications are running)."""
+        try:
+            self._notify(self.source.foreground(), False)
+        except Exception:
+            self._set_active(False)
+        return self.is_active
+
+    def wait_active(self, timeout: Optional[float] = None) -> bool:
+        return self._active_event.wait(timeout)
+
+    def _notify(self, hwnd: int, recheck_title: bool) -> None:
+        with self._lock:
+            if hwnd == self._hwnd and not recheck_title:
+                return
+            active = bool(hwnd) and self._needle in self.source.title(hwnd).lower()
+            self._hwnd = hwnd
+            self._set_active(active)
+
+    def _set_active(self, active: bool) -> None:
+        with self._lock:
+            if active == self.is_active:
+                return
+            self.is_active = active
+            self.generation += 1
+            if active:
+                self._active_event.set()
+            else:
+                self._active_event.clear()
+            for fn in self._listeners:
+                try:
+                    fn(active)
+                except Exception:
+                    logger.exception("Focus listener error")
@@ -0,0 +1,110 @@
+from typing import Dict, List, Sequence
+
+# buckets below this many microseconds are exact; above it each power of two
+# is split into 4 sub-buckets (<= 25% relative error)
+_LINEAR = 8
+
+
+def _bucket(us: int) -> int:
+    if us < _LINEAR:
+        return us
+    b = us.bit_length()
+    return _LINEAR + (b - 4) * 4 + ((us >> (b - 3)) & 3)
+
+
+# values from ~19 hours up share the last bucket
+_BUCKETS = _bucket((1 << 36) - 1) + 1
+
+
+def _bounds(idx: int) -> tuple:
+    """[lower, upper) in microseconds for bucket `idx`."""
+    if idx < _LINEAR:
+        return idx, idx + 1
+    octave, sub = divmod(idx - _LINEAR, 4)
+    shift = octave + 1
+    return (4 + sub) << shift, (5 + sub) << shift
+
+
+class Histogram:
+    """Fixed-size, log-bucketed (HDR-style) latency histogram; `add` takes seconds.
+
+    Recording is an int conversion and a list increment, cheap enough to sit
+    on the press path. Percentiles report bucket upper bounds (capped at max).
+    """
+
+    def __init__(self) -> None:
+        self._counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        idx = _bucket(max(0, int(seconds * 1e6)))
+        self._counts[min(idx, _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (seconds) of the bucket holding the q-th quantile, 0 <= q <= 1."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for idx, n in enumerate(self._counts):
+            seen += n
+            if seen >= rank:
+                return min(_bounds(idx)[1] / 1e6, self.max)
+        return self.max
+
+    def buckets(self) -> Dict[float, int]:
+        """Non-empty buckets as {upper bound in seconds: count}."""
+        return {_bounds(idx)[1] / 1e6: n for idx, n in enumerate(self._counts) if n}
+
+    def cumulative(self, bounds: Sequence[float]) -> List[int]:
+        """Values known to be <= each of the ascending `bounds` (seconds), at bucket resolution."""
+        out, seen, idx = [], 0, 0
+        counts = self._counts
+        for bound in bounds:
+            while idx < _BUCKETS and _bounds(idx)[1] <= bound * 1e6:
+                seen += counts[idx]
+                idx += 1
+            out.append(seen)
+        return out
+
+    def copy(self) -> "Histogram":
+        """Snapshot without locking: the bucket list is copied in one step, so `count` matches it."""
+        h = Histogram.__new__(Histogram)
+        h._counts = list(self._counts)
+        h.total, h.min, h.max = self.total, self.min, self.max
+        h.count = sum(h._counts)
+        return h
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": self.buckets(),
+        }
+
+    def summary(self) -> str:
+        if not self.count:
+            return "n=0"
+        return (f"n={self.count} mean={self.mean * 1000:.3f}ms p50={self.percentile(0.5) * 1000:.3f}ms "
+                f"p99={self.percentile(0.99) * 1000:.3f}ms max={self.max * 1000:.3f}ms")
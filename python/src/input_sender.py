@@ -0,0 +1,130 @@
+import ctypes
+import logging
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+from src.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+# keys are named by their character ("f", "t") or by one of these names
+VK_CODES = {"space": 0x20, "enter": 0x0D, "esc": 0x1B}
+
+
+def vk_code(key: str) -> int:
+    if key in VK_CODES:
+        return VK_CODES[key]
+    if len(key) == 1 and key.isalnum():
+        return ord(key.upper())
+    raise ValueError(f"No virtual-key code for {key!r}")
+
+
+class InputSender:
+    """Injects key taps. Each `tap()` call (e.g. press+release, or a double F)
+    is submitted as one batch, and its latency lands in `latency`."""
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.injections = 0
+        self.taps = 0
+
+    def tap(self, *keys: str) -> None:
+        start = perf_counter()
+        self._send(keys)
+        self.latency.add(perf_counter() - start)
+        self.injections += 1
+        self.taps += len(keys)
+
+    def _send(self, keys: Tuple[str, ...]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", ctypes.c_uint16),
+        ("wScan", ctypes.c_uint16),
+        ("dwFlags", ctypes.c_uint32),
+        ("time", ctypes.c_uint32),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", ctypes.c_int32),
+        ("dy", ctypes.c_int32),
+        ("mouseData", ctypes.c_uint32),
+        ("dwFlags", ctypes.c_uint32),
+        ("time", ctypes.c_uint32),
+        ("dwExtraInfo", ctypes.c_size_t),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    # MOUSEINPUT is the largest member, it sets sizeof(INPUT)
+    _fields_ = [("mi", _MOUSEINPUT), ("ki", _KEYBDINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_uint32), ("u", _INPUTUNION)]
+
+
+class SendInputSender(InputSender):
+    """user32 SendInput: all downs/ups of a tap() in a single call.
+
+    INPUT arrays are pooled per batch size, so steady-state taps allocate nothing.
+    """
+
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._send_input = ctypes.windll.user32.SendInput
+        self._pool: Dict[int, ctypes.Array] = {}
+        self._lock = threading.Lock()
+        self.failures = 0
+
+    def _batch(self, n: int) -> ctypes.Array:
+        arr = self._pool.get(n)
+        if arr is None:
+            arr = (_INPUT * n)()
+            for i in range(n):
+                arr[i].type = self.INPUT_KEYBOARD
+                arr[i].u.ki.dwFlags = self.KEYEVENTF_KEYUP if i % 2 else 0
+            self._pool[n] = arr
+        return arr
+
+    def _send(self, keys: Tuple[str, ...]) -> None:
+        n = len(keys) * 2
+        with self._lock:
+            arr = self._batch(n)
+            for i, key in enumerate(keys):
+                vk = vk_code(key)
+                arr[2 * i].u.ki.wVk = vk
+                arr[2 * i + 1].u.ki.wVk = vk
+            sent = self._send_input(n, arr, ctypes.sizeof(_INPUT))
+        if sent != n:
+            # blocked by UIPI (game running elevated) or another input desktop
+            self.failures += 1
+            logger.warning("SendInput injected %d/%d events", sent, n)
+
+
+class RecordingSender(InputSender):
+    """Fake sender for tests and headless runs: records batches with a timestamp."""
+
+    def __init__(self, now: Callable[[], float] = perf_counter) -> None:
+        super().__init__()
+        self._now = now
+        self.batches: List[Tuple[float, Tuple[str, ...]]] = []
+
+    def _send(self, keys: Tuple[str, ...]) -> None:
+        self.batches.append((self._now(), keys))
+
+    @property
+    def presses(self) -> List[Tuple[float, str]]:
+        return [(t, key) for t, keys in self.batches for key in keys]
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import time
+from time import perf_counter
+from typing import Dict, Optional
+
+from src.histogram import Histogram
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILE = "autoskip_metrics.json"
+# default port of the live endpoint, see src/metrics_server.py
+METRICS_PORT = 9464
+
+# loop stages with a timing histogram each
+STAGES = ("step", "window", "capture", "match", "escalate", "decide", "pace", "press", "sleep_overshoot")
+COUNTERS = ("steps", "checks", "unchanged", "escalations", "presses", "held", "wakeups", "early_wakeups")
+
+
+class Instrumentation:
+    """Per-stage timing histograms and counters for the skipper loop.
+
+    Call sites bracket a stage with `t0 = m.start()` ... `m.record(stage, t0)`.
+    While disabled `start()` returns 0.0 without reading the clock and
+    `record()` returns straight away, so the hooks stay in the hot path.
+    With `path` None snapshots are only kept in memory (`snapshot()`).
+    """
+
+    def __init__(self, enabled: bool = False, path: Optional[str] = METRICS_FILE) -> None:
+        self.path = path
+        self.histograms: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        # histograms owned elsewhere (e.g. input senders) included in snapshots
+        self.attached: Dict[str, Histogram] = {}
+        self.enabled = False
+        self._since: Optional[float] = None
+        if enabled:
+            self.enable()
+
+    def start(self) -> float:
+        return perf_counter() if self.enabled else 0.0
+
+    def record(self, stage: str, t0: float) -> None:
+        if t0:
+            self.histograms[stage].add(perf_counter() - t0)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histograms[stage].add(seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += n
+
+    def attach(self, name: str, histogram: Histogram) -> None:
+        self.attached[name] = histogram
+
+    def enable(self) -> None:
+        if not self.enabled:
+            self.enabled = True
+            self._since = time.time()
+            logger.info(f"Instrumentation enabled (snapshot: {self.path or 'in memory'})")
+
+    def disable(self) -> None:
+        if self.enabled:
+            self.enabled = False
+            logger.info("Instrumentation disabled")
+
+    def toggle(self) -> None:
+        """Hotkey action: enabling starts recording, disabling also writes a snapshot."""
+        if self.enabled:
+            self.disable()
+            self.dump()
+        else:
+            self.enable()
+
+    def reset(self) -> None:
+        for h in self.histograms.values():
+            h.reset()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._since = time.time() if self.enabled else None
+
+    def snapshot(self) -> dict:
+        histograms = dict(self.histograms, **self.attached)
+        return {
+            "enabled": self.enabled,
+            "since": self._since,
+            "taken": time.time(),
+            "counters": dict(self.counters),
+            "stages": {name: h.to_dict() for name, h in histograms.items() if h.count},
+        }
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """Write a JSON snapshot; returns the path, or None if nothing was recorded."""
+        path = path or self.path
+        if self._since is None or path is None:
+            return None
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot {path}: {e}")
+            return None
+        logger.info(f"Metrics snapshot written: {path}")
+        return path
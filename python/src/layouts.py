@@ -0,0 +1,243 @@
+"""Persisted probe-coordinate layouts keyed by (width, height, aspect).
+
+The shipped table holds only entries checked against recorded reference
+screenshots (binary PPM files named ``<W>x<H>_<label>[_suffix].ppm`` with
+label playing / choice / idle / loading); resolutions without one use the
+ScreenConfig heuristics. `precompute` writes the heuristic coordinates as a
+starting point to tune and verify:
+
+    python -m src.layouts precompute 1920x1080 2560x1440 3440x1440
+    python -m src.layouts verify --frames reference_frames/
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from math import gcd
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.capture import MemoryFrameSource, PixelSampler
+from src.detectors import DEFAULT_DETECTORS, check_names
+from src.probes import ProbeTable
+
+logger = logging.getLogger(__name__)
+
+LAYOUTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layouts.json")
+
+# rule that must hold (or not) on a reference frame with this label
+FRAME_EXPECTATIONS = {
+    "playing": ("playing", True),
+    "choice": ("choice", True),
+    "idle": ("dialogue", False),
+    "loading": ("dialogue", False),
+}
+FRAME_NAME = re.compile(r"^(\d+)x(\d+)_([a-z]+)(?:_.*)?\.ppm$")
+
+
+def aspect_ratio(width: int, height: int) -> str:
+    g = gcd(width, height)
+    return f"{width // g}:{height // g}"
+
+
+@dataclass
+class Layout:
+    width: int
+    height: int
+    playing_icon: Tuple[int, int]
+    dialogue_icon: Tuple[int, int, int]
+    loading_pixel: Tuple[int, int]
+    verified: bool = False
+    # detector cascade for this resolution, see src/detectors.py
+    detectors: Tuple[str, ...] = DEFAULT_DETECTORS
+    # probe color tolerance (e.g. from src.calibration); None keeps ProbeGeometry's
+    tolerance: Optional[int] = None
+
+    @property
+    def aspect(self) -> str:
+        return aspect_ratio(self.width, self.height)
+
+    @property
+    def key(self) -> Tuple[int, int, str]:
+        return self.width, self.height, self.aspect
+
+    def to_dict(self) -> dict:
+        d = {
+            "width": self.width,
+            "height": self.height,
+            "aspect": self.aspect,
+            "playing_icon": list(self.playing_icon),
+            "dialogue_icon": list(self.dialogue_icon),
+            "loading_pixel": list(self.loading_pixel),
+            "verified": self.verified,
+        }
+        if self.detectors != DEFAULT_DETECTORS:
+            d["detectors"] = list(self.detectors)
+        if self.tolerance is not None:
+            d["tolerance"] = self.tolerance
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Layout":
+        layout = cls(int(d["width"]), int(d["height"]), tuple(d["playing_icon"]), tuple(d["dialogue_icon"]),
+                     tuple(d["loading_pixel"]), bool(d.get("verified", False)),
+                     check_names(d.get("detectors", DEFAULT_DETECTORS)),
+                     int(d["tolerance"]) if d.get("tolerance") is not None else None)
+        if d.get("aspect", layout.aspect) != layout.aspect:
+            raise ValueError(f"aspect {d['aspect']} does not match {layout.width}x{layout.height}")
+        x, low_y, hi_y = layout.dialogue_icon
+        for px, py in (layout.playing_icon, layout.loading_pixel, (x, low_y), (x, hi_y)):
+            if not (0 <= px < layout.width and 0 <= py < layout.height):
+                raise ValueError(f"probe ({px}, {py}) outside {layout.width}x{layout.height}")
+        if layout.tolerance is not None and not 0 <= layout.tolerance <= 255:
+            raise ValueError(f"tolerance {layout.tolerance} outside 0..255")
+        return layout
+
+
+class LayoutTable:
+    """JSON-backed layout store; the file is read on first access."""
+
+    def __init__(self, path: str = LAYOUTS_FILE) -> None:
+        self.path = path
+        self._entries: Optional[Dict[Tuple[int, int, str], Layout]] = None
+
+    def _load(self) -> Dict[Tuple[int, int, str], Layout]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    raw = json.load(f)
+            except FileNotFoundError:
+                raw = []
+            for d in raw:
+                try:
+                    layout = Layout.from_dict(d)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"Skipping invalid layout entry {d!r}: {e}")
+                    continue
+                self._entries[layout.key] = layout
+        return self._entries
+
+    def get(self, width: int, height: int) -> Optional[Layout]:
+        return self._load().get((width, height, aspect_ratio(width, height)))
+
+    def put(self, layout: Layout) -> None:
+        self._load()[layout.key] = layout
+
+    def save(self) -> None:
+        entries = sorted(self._load().values(), key=lambda l: (l.width, l.height))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            # one entry per line keeps diffs of retuned coordinates readable
+            f.write("[\n" + ",\n".join("  " + json.dumps(l.to_dict()) for l in entries) + "\n]\n")
+        os.replace(tmp, self.path)
+
+    def __iter__(self) -> Iterator[Layout]:
+        return iter(list(self._load().values()))
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+_default_table: Optional[LayoutTable] = None
+
+
+def lookup_layout(width: int, height: int) -> Optional[Layout]:
+    """Layout for a resolution from the shipped table, or None if it has no entry."""
+    global _default_table
+    if _default_table is None:
+        _default_table = LayoutTable()
+    try:
+        return _default_table.get(width, height)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Layout table unavailable ({e}), using computed coordinates.")
+        return None
+
+
+def reload_layouts() -> None:
+    """Re-read the shipped table on the next lookup, e.g. after layouts.json was edited."""
+    global _default_table
+    _default_table = None
+
+
+def reference_frames(directory: str) -> Dict[Tuple[int, int], List[Tuple[str, str]]]:
+    """Group `<W>x<H>_<label>*.ppm` files by resolution -> [(label, path)]."""
+    frames: Dict[Tuple[int, int], List[Tuple[str, str]]] = {}
+    for name in sorted(os.listdir(directory)):
+        m = FRAME_NAME.match(name)
+        if not m or m.group(3) not in FRAME_EXPECTATIONS:
+            continue
+        key = (int(m.group(1)), int(m.group(2)))
+        frames.setdefault(key, []).append((m.group(3), os.path.join(directory, name)))
+    return frames
+
+
+def verify_layout(table: ProbeTable, frames: List[Tuple[str, str]]) -> List[str]:
+    """Check a layout's probe table against labeled frames; return failure messages."""
+    errors = []
+    for label, path in frames:
+        src = MemoryFrameSource.from_ppm(path)
+        sampler = PixelSampler(src)
+        if not sampler.snapshot(table.points):
+            errors.append(f"{os.path.basename(path)}: probes outside the frame")
+            continue
+        rule, expected = FRAME_EXPECTATIONS[label]
+        if table.evaluate(sampler.frame, rule) != expected:
+            errors.append(f"{os.path.basename(path)}: expected {rule}={expected}")
+    return errors
+
+
+def _parse_resolution(text: str) -> Tuple[int, int]:
+    m = re.fullmatch(r"(\d+)x(\d+)", text)
+    if not m:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    return int(m.group(1)), int(m.group(2))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from src.autoskip_dialogue import ScreenConfig
+
+    parser = argparse.ArgumentParser(description="Precompute and verify probe layouts")
+    parser.add_argument("--file", default=LAYOUTS_FILE, help="Layout table path")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    pre = sub.add_parser("precompute", help="Compute layouts for resolutions from the scaling heuristics")
+    pre.add_argument("resolutions", nargs="+", type=_parse_resolution)
+    pre.add_argument("--force", action="store_true", help="Overwrite existing entries")
+    ver = sub.add_parser("verify", help="Check layouts against recorded reference frames")
+    ver.add_argument("--frames", required=True, help="Directory of <W>x<H>_<label>.ppm files")
+    args = parser.parse_args(argv)
+
+    table = LayoutTable(args.file)
+    if args.cmd == "precompute":
+        for w, h in args.resolutions:
+            if table.get(w, h) and not args.force:
+                print(f"{w}x{h}: exists, skipped")
+                continue
+            table.put(ScreenConfig(w, h, use_layouts=False).layout())
+            print(f"{w}x{h}: computed")
+        table.save()
+        return 0
+
+    failed = 0
+    for (w, h), frames in reference_frames(args.frames).items():
+        layout = table.get(w, h) or ScreenConfig(w, h, use_layouts=False).layout()
+        cfg = ScreenConfig(w, h, use_layouts=False)
+        cfg.apply_layout(layout)
+        errors = verify_layout(cfg.probe_table(), frames)
+        if errors:
+            failed += 1
+            print(f"{w}x{h}: FAILED")
+            for err in errors:
+                print(f"  {err}")
+            layout.verified = False
+        else:
+            print(f"{w}x{h}: ok ({len(frames)} frames)")
+            layout.verified = True
+        table.put(layout)
+    table.save()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
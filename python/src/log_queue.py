@@ -0,0 +1,84 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# records waiting for the writer thread; beyond this they are dropped, not blocked on
+LOG_QUEUE_SIZE = 10_000
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Non-blocking QueueHandler: the caller only enqueues the record.
+
+    Message formatting (%-args, asctime, tracebacks) happens on the listener
+    thread. When the queue is full the record is dropped and counted, and the
+    next record that fits is preceded by a warning with the drop count.
+    """
+
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the listener lives in this process, so the record can go as-is
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            dropped = self.dropped
+            if dropped != self._reported:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "Log queue full, dropped %d records", "args": (dropped - self._reported,),
+                }))
+                self._reported = dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # a full bounded queue must not make stop() raise; wait for room instead
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Bounded queue between logging call sites and one background writer thread."""
+
+    def __init__(self, *handlers: logging.Handler, maxsize: int = LOG_QUEUE_SIZE) -> None:
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self._running = False
+
+    @property
+    def handlers(self) -> tuple:
+        return self.listener.handlers
+
+    def add_handler(self, handler: logging.Handler) -> None:
+        # the writer reads the tuple per record, swapping it is thread-safe
+        self.listener.handlers = self.listener.handlers + (handler,)
+
+    def remove_handler(self, handler: logging.Handler) -> None:
+        self.listener.handlers = tuple(h for h in self.listener.handlers if h is not handler)
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def start(self) -> None:
+        if not self._running:
+            self.listener.start()
+            self._running = True
+
+    def stop(self) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+
+    def flush(self) -> None:
+        """Block until the writer has handled every record queued so far."""
+        if self._running:
+            self.queue.join()
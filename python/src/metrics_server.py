@@ -0,0 +1,188 @@
+"""Opt-in local HTTP endpoint with live loop metrics in Prometheus text format.
+
+    python -m src.autoskip_dialogue --metrics-port 9464
+    curl http://127.0.0.1:9464/metrics
+
+The server only binds to 127.0.0.1 and runs on its own daemon thread. A
+scrape never takes a lock the loop could be waiting on. It copies what it
+reports: the loop's running totals are plain ints, and dicts and histogram
+bucket lists are copied in a single step under the GIL. A scrape may
+therefore see one update more in a histogram's sum than in its buckets, but
+the loop is never blocked. Rendering a scrape should stay within
+SCRAPE_CPU_BUDGET of CPU (measured in `scrape_time` and checked by the
+tests), which at a 1 Hz poll is at most 0.5% of one core.
+
+Exported:
+
+    autoskip_presses_total, autoskip_breaks_total, autoskip_break_seconds_total
+    autoskip_dialogue_flips_total           dialogue detected / ended transitions
+    autoskip_pixel_failures_total           PixelSampler.total_failures
+    autoskip_pixel_failures_by_point_total  PixelSampler.fail_counts (largest first)
+    autoskip_loop_events_total{event}       instrumentation counters (F6 / --instrument)
+    autoskip_stage_seconds{stage}           instrumentation and attached latency histograms
+"""
+import logging
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+from time import thread_time
+from typing import List, Optional
+
+from src.histogram import Histogram
+from src.instrumentation import METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# histogram bucket bounds in seconds (the HDR buckets underneath are finer)
+LE_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# per-point pixel failure series kept, largest counts first
+MAX_FAILURE_POINTS = 20
+# render CPU per scrape the tests hold `scrape_time` to
+SCRAPE_CPU_BUDGET = 0.005
+
+
+class _Exposition:
+    """Prometheus text format writer."""
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels) -> None:
+        if labels:
+            inner = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            name = f"{name}{{{inner}}}"
+        self.lines.append(f"{name} {float(value)!r}" if isinstance(value, float) else f"{name} {value}")
+
+    def histogram(self, name: str, h: Histogram, **labels) -> None:
+        for bound, n in zip(LE_BOUNDS, h.cumulative(LE_BOUNDS)):
+            self.sample(f"{name}_bucket", n, **labels, le=repr(bound))
+        self.sample(f"{name}_bucket", h.count, **labels, le="+Inf")
+        self.sample(f"{name}_sum", h.total, **labels)
+        self.sample(f"{name}_count", h.count, **labels)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render(skipper) -> str:
+    """The skipper's current metrics in Prometheus text format; safe to call from any thread."""
+    out = _Exposition()
+    gauges = (
+        ("autoskip_running", skipper.status == "run", "1 while skipping is switched on (F8)."),
+        ("autoskip_window_active", skipper._window_active, "1 while the game window is in front."),
+        ("autoskip_in_dialogue", skipper._in_dialogue, "1 while a dialogue is detected."),
+    )
+    for name, value, help_text in gauges:
+        out.metric(name, "gauge", help_text)
+        out.sample(name, int(value))
+    counters = (
+        ("autoskip_presses_total", skipper.press_count, "Dialogue key presses sent."),
+        ("autoskip_breaks_total", skipper.break_count, "Breaks taken."),
+        ("autoskip_break_seconds_total", skipper.break_time, "Seconds scheduled for breaks."),
+        ("autoskip_dialogue_flips_total", skipper.flip_count, "Changes of the detected dialogue state."),
+    )
+    for name, value, help_text in counters:
+        out.metric(name, "counter", help_text)
+        out.sample(name, value)
+
+    sampler = skipper.pixel_sampler
+    fails = dict(sampler.fail_counts)
+    out.metric("autoskip_pixel_failures_total", "counter", "Failed screen grabs and pixel reads.")
+    out.sample("autoskip_pixel_failures_total", sampler.total_failures)
+    out.metric("autoskip_pixel_failure_points", "gauge", "Distinct points with failed reads.")
+    out.sample("autoskip_pixel_failure_points", len(fails))
+    if fails:
+        out.metric("autoskip_pixel_failures_by_point_total", "counter", "Failed reads per point (grab origin or pixel).")
+        for (x, y), n in sorted(fails.items(), key=lambda kv: -kv[1])[:MAX_FAILURE_POINTS]:
+            out.sample("autoskip_pixel_failures_by_point_total", n, x=x, y=y)
+
+    windows = skipper.windows
+    if windows is not None:
+        states = dict(windows.states)
+        out.metric("autoskip_window_dialogue_flips_total", "counter", "Dialogue state changes per game window.")
+        for hwnd, state in states.items():
+            out.sample("autoskip_window_dialogue_flips_total", state.flips, hwnd=f"{hwnd:#x}")
+
+    metrics = skipper.metrics
+    out.metric("autoskip_instrumentation_enabled", "gauge", "1 while per-stage instrumentation records (F6).")
+    out.sample("autoskip_instrumentation_enabled", int(metrics.enabled))
+    out.metric("autoskip_loop_events_total", "counter", "Instrumentation counters.")
+    for event, n in dict(metrics.counters).items():
+        out.sample("autoskip_loop_events_total", n, event=event)
+    histograms = dict(metrics.histograms)
+    histograms.update(dict(metrics.attached))
+    out.metric("autoskip_stage_seconds", "histogram", "Loop stage and latency histograms.")
+    for stage, h in histograms.items():
+        h = h.copy()
+        if h.count:
+            out.histogram("autoskip_stage_seconds", h, stage=stage)
+    return out.text()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.exporter.scrape().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        logger.debug("Metrics %s - " + format, self.address_string(), *args)
+
+
+class _Server(HTTPServer):
+    exporter: "MetricsServer"
+
+
+class MetricsServer:
+    """Serves `render(skipper)` on http://127.0.0.1:<port>/metrics from a background thread.
+
+    `port` 0 picks a free port; the bound one is in `port` after `start`.
+    """
+
+    def __init__(self, skipper, port: int = METRICS_PORT) -> None:
+        self.skipper = skipper
+        self.port = port
+        self.scrapes = 0
+        # CPU time spent rendering each scrape, on the server thread
+        self.scrape_time = Histogram()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[Thread] = None
+
+    def scrape(self) -> str:
+        t0 = thread_time()
+        text = render(self.skipper)
+        self.scrape_time.add(thread_time() - t0)
+        self.scrapes += 1
+        return text
+
+    def start(self) -> None:
+        self._server = _Server((METRICS_HOST, self.port), _Handler)
+        self._server.exporter = self
+        self.port = self._server.server_address[1]
+        self._thread = Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.5},
+                              name="metrics-http", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint: http://{METRICS_HOST}:{self.port}/metrics")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(1.0)
+        self._server = self._thread = None
+        if self.scrapes:
+            logger.info(f"Metrics scrapes: {self.scrapes}, render CPU {self.scrape_time.summary()}")
@@ -0,0 +1,129 @@
+"""Closed-loop press pacing: hold presses until the dialogue text has reacted.
+
+Timer pacing presses every 0.05-0.25 s whatever the screen shows, so some
+presses land in the fade between two lines, where the game ignores them.
+In feedback mode (--pacing feedback) the skipper checksums the dialogue
+text box before each due press, and the pacer tracks what the previous
+press did:
+
+- pressed while the text was typing: the line completes, and the next
+  press (which advances it) follows at the usual interval;
+- pressed on a finished line: the line advances. Further presses are held
+  until the text box has changed twice (old line cleared, new one typing),
+  or until FEEDBACK_TIMEOUT passes without that. After a timeout the box is
+  taken to show nothing useful (a cutscene, another layout) and presses
+  follow the timer until it changes again.
+
+The interval after an advance moves toward the observed fade time between
+lines, within the timing model's interval range.
+"""
+import zlib
+from typing import Optional, Tuple
+
+from src.capture import BYTES_PER_PIXEL, Frame
+from src.detectors import dialogue_box
+from src.timing import RAPID_INTERVAL, WIDE_INTERVAL
+
+# give up holding and fall back to the timer after this long without a new line
+FEEDBACK_TIMEOUT = 1.5
+# checksum every third row of the text box: glyphs are taller than that
+ROW_STEP = 3
+# while holding, look at the text box again this often (no key is sent, so no need to look human)
+HOLD_RECHECK = 0.05
+# weight of the newest fade sample in the running average
+FADE_ALPHA = 0.3
+INTERVAL_BOUNDS = (RAPID_INTERVAL[0], WIDE_INTERVAL[1])
+
+# what the last press is expected to have done
+EXPECT_COMPLETE = 1
+EXPECT_ADVANCE = 2
+
+Rect = Tuple[int, int, int, int]
+
+
+class PressPacer:
+    """Press gate fed with text-box checksums; one instance per skipper."""
+
+    def __init__(self, region: Rect, timeout: float = FEEDBACK_TIMEOUT) -> None:
+        # the skipper grabs this whole
+        self.region = region
+        self.timeout = timeout
+        # presses held back, line advances seen, running fade estimate (seconds)
+        self.held = 0
+        self.advances = 0
+        self.fade: Optional[float] = None
+        self.reset()
+
+    @classmethod
+    def for_screen(cls, width: int, height: int, timeout: float = FEEDBACK_TIMEOUT) -> "PressPacer":
+        return cls(dialogue_box(width, height), timeout)
+
+    def reset(self) -> None:
+        """Forget the current line, e.g. when a dialogue starts or ends."""
+        self._crc: Optional[int] = None
+        self._changed = False
+        # text box changes seen since the last press
+        self._changes = 0
+        self._expect: Optional[int] = None
+        self._pressed_at = 0.0
+        # the text box stopped reacting: pace by the timer alone
+        self._blind = False
+
+    def checksum(self, frame: Frame) -> int:
+        left, top, w, h = self.region
+        frame = frame.part(self.region)
+        data, stride = frame.data, frame.stride
+        start, row = (left - frame.left) * BYTES_PER_PIXEL, w * BYTES_PER_PIXEL
+        crc = 0
+        for y in range(top - frame.top, top - frame.top + h, ROW_STEP):
+            i = y * stride + start
+            crc = zlib.crc32(data[i:i + row], crc)
+        return crc
+
+    def observe(self, now: float, crc: Optional[int]) -> None:
+        """Feed the text box checksum taken at `now` (None if the grab failed)."""
+        if crc is None:
+            # nothing to go on: stop holding
+            self._expect = None
+            return
+        changed = self._crc is not None and crc != self._crc
+        self._crc = crc
+        self._changed = changed
+        if not changed:
+            return
+        self._blind = False
+        self._changes += 1
+        if self._expect != EXPECT_ADVANCE:
+            return
+        if self._changes == 1:
+            # the old line cleared
+            self.advances += 1
+        elif self._changes == 2:
+            # the new line started typing
+            sample = now - self._pressed_at
+            self.fade = sample if self.fade is None else self.fade + FADE_ALPHA * (sample - self.fade)
+
+    def should_press(self, now: float) -> bool:
+        if self._expect != EXPECT_ADVANCE or self._changes >= 2:
+            return True
+        if now - self._pressed_at >= self.timeout:
+            self._blind = True
+            return True
+        self.held += 1
+        return False
+
+    def recheck(self, interval: float) -> float:
+        """Delay before a held press is reconsidered, given the drawn `interval`."""
+        return min(interval, HOLD_RECHECK)
+
+    def pressed(self, now: float, interval: float) -> float:
+        """Record a press; return the interval until the next one given the drawn `interval`."""
+        # without history assume typing: at worst one press lands in a fade
+        typing = self._blind or self._expect is None or self._changes >= 2
+        self._expect = EXPECT_COMPLETE if typing else EXPECT_ADVANCE
+        self._pressed_at = now
+        self._changes = 0
+        if self._expect == EXPECT_ADVANCE and self.fade is not None:
+            lo, hi = INTERVAL_BOUNDS
+            return min(hi, max(lo, (interval + self.fade) / 2))
+        return interval
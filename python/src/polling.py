@@ -0,0 +1,56 @@
+from typing import Optional
+
+
+class AdaptivePoller:
+    """Chooses the delay until the next dialogue pixel check.
+
+    Polls at `min_interval` for `hot_window` seconds after a dialogue was last
+    seen or the probe pixels changed (icon flicker, loading screen), then
+    backs off geometrically from `idle_interval` toward `max_interval` while
+    the screen stays quiet. Inside a dialogue it keeps `dialogue_interval`.
+    """
+
+    def __init__(self, min_interval: float = 0.1, max_interval: float = 0.5,
+                 dialogue_interval: float = 0.15, idle_interval: float = 0.25,
+                 backoff: float = 1.25, hot_window: float = 3.0) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.dialogue_interval = dialogue_interval
+        self.idle_interval = idle_interval
+        self.backoff = backoff
+        self.hot_window = hot_window
+        self.flickers = 0
+        self._hot_until = 0.0
+        self._quiet_polls = 0
+        self._last_mask: Optional[int] = None
+        self._was_dialogue = False
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def next_interval(self, now: float, mask: int, is_dialogue: bool) -> float:
+        # a dialogue ending is not a flicker; the hot window already covers it
+        changed = self._last_mask is not None and mask != self._last_mask and not self._was_dialogue
+        self._last_mask = mask
+        self._was_dialogue = is_dialogue
+        if is_dialogue:
+            self._hot_until = now + self.hot_window
+            self._quiet_polls = 0
+            return self._clamp(self.dialogue_interval)
+        if changed:
+            self.flickers += 1
+            self._hot_until = now + self.hot_window
+        if now < self._hot_until:
+            self._quiet_polls = 0
+            return self.min_interval
+        interval = self.idle_interval * self.backoff ** self._quiet_polls
+        if interval < self.max_interval:
+            self._quiet_polls += 1
+        return self._clamp(interval)
+
+    def reset(self) -> None:
+        """Forget history, e.g. after the window regained focus."""
+        self._hot_until = 0.0
+        self._quiet_polls = 0
+        self._last_mask = None
+        self._was_dialogue = False
@@ -0,0 +1,152 @@
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from src._compat import load_numpy
+from src.capture import BYTES_PER_PIXEL, RGB, Frame, FrameSet, Point
+
+# a rule is a probe name or a nested ("not" | "and" | "or", *operands) tuple
+Rule = Union[str, Tuple]
+
+# truth tables are precomputed over every probe outcome, so keep the table small
+MAX_TABLE_PROBES = 16
+
+
+@dataclass(frozen=True)
+class Probe:
+    name: str
+    pos: Point
+    color: RGB
+    tolerance: int = 10
+
+
+def _eval_rule(rule: Rule, outcome: Dict[str, bool]) -> bool:
+    if isinstance(rule, str):
+        return outcome[rule]
+    op, *args = rule
+    if op == "not":
+        (arg,) = args
+        return not _eval_rule(arg, outcome)
+    if op == "and":
+        return all(_eval_rule(a, outcome) for a in args)
+    if op == "or":
+        return any(_eval_rule(a, outcome) for a in args)
+    raise ValueError(f"Unknown rule operator: {op!r}")
+
+
+def _rule_names(rule: Rule) -> List[str]:
+    if isinstance(rule, str):
+        return [rule]
+    return [n for arg in rule[1:] for n in _rule_names(arg)]
+
+
+class ProbeTable:
+    """Probe points plus boolean rules, compiled once into a bitmask truth table.
+
+    Matching a frame yields one bit per probe; each rule is then a single lookup.
+    """
+
+    def __init__(self, probes: Sequence[Probe], rules: Dict[str, Rule]) -> None:
+        if not probes:
+            raise ValueError("ProbeTable needs at least one probe")
+        if len(probes) > MAX_TABLE_PROBES:
+            raise ValueError(f"ProbeTable supports at most {MAX_TABLE_PROBES} probes")
+        self.probes = tuple(probes)
+        self.names = tuple(p.name for p in self.probes)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Duplicate probe names")
+        for rule_name, rule in rules.items():
+            unknown = set(_rule_names(rule)) - set(self.names)
+            if unknown:
+                raise ValueError(f"Rule {rule_name!r} references unknown probes: {sorted(unknown)}")
+        self.points: Tuple[Point, ...] = tuple(p.pos for p in self.probes)
+        self.rules = dict(rules)
+        self._tables = {name: self._compile(rule) for name, rule in rules.items()}
+        self._colors = [p.color for p in self.probes]
+        self._tolerances = [p.tolerance for p in self.probes]
+        self._geometry: Optional[Tuple[Tuple[int, int, int, int], ...]] = None
+        # per grabbed frame: (position in the frame's parts, probe rows, byte index array)
+        self._gathers: List[Tuple[int, object, object]] = []
+        # numpy is optional: pure-Python matching is used without it
+        self._np = np = load_numpy()
+        if np is not None:
+            self._np_colors = np.array(self._colors, dtype=np.int16)
+            self._np_tolerances = np.array(self._tolerances, dtype=np.int16)[:, None]
+            self._np_weights = 1 << np.arange(len(self.probes), dtype=np.int64)
+            self._np_pixels = np.empty((len(self.probes), 3), dtype=np.int16)
+
+    def _compile(self, rule: Rule) -> bytes:
+        # bit i of the mask is the match result of probe i
+        table = bytearray(1 << len(self.names))
+        for mask in range(len(table)):
+            outcome = {name: bool(mask >> i & 1) for i, name in enumerate(self.names)}
+            table[mask] = _eval_rule(rule, outcome)
+        return bytes(table)
+
+    def scaled(self, factor: float) -> "ProbeTable":
+        """Same probes and rules with every tolerance multiplied by `factor`."""
+        probes = [replace(p, tolerance=int(p.tolerance * factor)) for p in self.probes]
+        return ProbeTable(probes, self.rules)
+
+    def translated(self, dx: int, dy: int) -> "ProbeTable":
+        """Same probes and rules moved by (dx, dy), e.g. into a window's client area."""
+        probes = [replace(p, pos=(p.pos[0] + dx, p.pos[1] + dy)) for p in self.probes]
+        return ProbeTable(probes, self.rules)
+
+    def bit(self, name: str) -> int:
+        return 1 << self.names.index(name)
+
+    def test(self, rule: str, mask: int) -> bool:
+        return bool(self._tables[rule][mask])
+
+    def match_mask(self, frame: Union[Frame, FrameSet]) -> int:
+        """Match every probe against `frame` and return the bitmask of hits."""
+        np = self._np
+        if np is None:
+            return self.match_mask_from(frame.pixel)
+        parts = frame.parts if isinstance(frame, FrameSet) else (frame,)
+        geometry = tuple((f.left, f.top, f.width, f.height) for f in parts)
+        if geometry != self._geometry:
+            gathers = self._plan_gathers(parts)
+            if gathers is None:
+                return self.match_mask_from(frame.pixel)
+            self._gathers, self._geometry = gathers, geometry
+        pixels = self._np_pixels
+        # one gather per grabbed frame, as RoiMatcher does per part
+        for i, rows, index in self._gathers:
+            part = parts[i]
+            buf = np.frombuffer(part.data, dtype=np.uint8, count=part.height * part.stride)
+            pixels[rows] = buf[index]
+        hits = (np.abs(pixels - self._np_colors) <= self._np_tolerances).all(axis=1)
+        return int(hits @ self._np_weights)
+
+    def _plan_gathers(self, parts: Sequence[Frame]) -> Optional[List[Tuple[int, object, object]]]:
+        """Index arrays reading each probe from the first part holding it; None if one is off every part."""
+        np = self._np
+        owners = []
+        for x, y in self.points:
+            owner = next((i for i, f in enumerate(parts) if f.contains(x, y)), None)
+            if owner is None:
+                return None
+            owners.append(owner)
+        gathers = []
+        for i, part in enumerate(parts):
+            rows = [r for r, owner in enumerate(owners) if owner == i]
+            if not rows:
+                continue
+            offsets = np.array([(self.points[r][1] - part.top) * part.stride
+                                + (self.points[r][0] - part.left) * BYTES_PER_PIXEL for r in rows], dtype=np.intp)
+            # BGRA in memory -> gather as RGB
+            gathers.append((i, np.array(rows, dtype=np.intp), offsets[:, None] + np.array([2, 1, 0], dtype=np.intp)))
+        return gathers
+
+    def match_mask_from(self, get: Callable[[int, int], Optional[RGB]]) -> int:
+        """Per-pixel fallback: match probes using a pixel getter."""
+        mask = 0
+        for i, ((x, y), color, tol) in enumerate(zip(self.points, self._colors, self._tolerances)):
+            px = get(x, y)
+            if px and all(abs(a - b) <= tol for a, b in zip(px, color)):
+                mask |= 1 << i
+        return mask
+
+    def evaluate(self, frame: Frame, rule: str) -> bool:
+        return self.test(rule, self.match_mask(frame))
@@ -0,0 +1,222 @@
+"""Record probe-region pixels from a live session and replay them offline.
+
+`RecordingCaptureBackend` wraps the real capture backend. On every grab it
+stores a square patch of pixels around each probe, plus focus changes, in a
+zlib-compressed stream. Frames identical to the previous one are not
+written. `ReplayCaptureBackend` paints those patches back onto an
+in-memory screen at their recorded times, so AutoSkipper (see src/replay.py)
+sees the same pixels on any OS.
+"""
+import json
+import logging
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+from src.capture import BYTES_PER_PIXEL, CaptureBackend, Frame, MemoryFrameSource, Point
+from src.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FILE = "autoskip_frames.rec"
+# patch half-width around each probe: 17x17 pixels
+PATCH_RADIUS = 8
+
+MAGIC = b"GDAFRAME"
+VERSION = 1
+# magic, version, metadata length
+_HEADER = struct.Struct("<8sHI")
+# time since recording start, entry kind
+_ENTRY = struct.Struct("<dB")
+
+FRAME = 1   # followed by every probe patch, BGRA rows
+FOCUS = 2   # followed by one byte: 1 = game window active
+
+
+Rect = Tuple[int, int, int, int]
+
+
+def patch_rects(points: Sequence[Point], radius: int, width: int, height: int) -> List[Rect]:
+    """(left, top, width, height) of each probe patch, clipped to the screen."""
+    rects = []
+    for x, y in points:
+        left, top = max(0, x - radius), max(0, y - radius)
+        right, bottom = min(width, x + radius + 1), min(height, y + radius + 1)
+        rects.append((left, top, right - left, bottom - top))
+    return rects
+
+
+def _union(rects: Sequence[Rect]) -> Rect:
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    return left, top, right - left, bottom - top
+
+
+class RecordingCaptureBackend(CaptureBackend):
+    """Pass-through capture backend that also writes probe patches to `path`.
+
+    Grabs are widened by the patch radius so edge probes get whole patches.
+    `extra_points` are recorded as single pixels.
+    """
+
+    def __init__(self, inner: CaptureBackend, path: str, points: Sequence[Point], screen: Tuple[int, int],
+                 clock: Optional[Clock] = None, radius: int = PATCH_RADIUS, meta: Optional[dict] = None,
+                 extra_points: Sequence[Point] = ()) -> None:
+        self.inner = inner
+        self.path = path
+        self.clock = clock if clock is not None else Clock()
+        # extra points (e.g. detector samples outside the probe patches) are stored as single pixels
+        self.rects = patch_rects(points, radius, *screen) + patch_rects(extra_points, 0, *screen)
+        self.frames = 0
+        self.skipped = 0
+        self._screen = screen
+        self._start = self.clock.now()
+        self._last: Optional[bytes] = None
+        self._focused = False
+        self._lock = threading.Lock()
+        self._zip = zlib.compressobj(6)
+        meta = dict(meta or {}, width=screen[0], height=screen[1], radius=radius,
+                    points=[list(p) for p in points], rects=[list(r) for r in self.rects])
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(meta_bytes)))
+        self._file.write(meta_bytes)
+
+    def get_pixel(self, x: int, y: int):
+        return self.inner.get_pixel(x, y)
+
+    def grab(self, left: int, top: int, width: int, height: int) -> Optional[Frame]:
+        want = _union(self.rects + [(left, top, width, height)])
+        frame = self.inner.grab(*want)
+        if frame is None:
+            return None
+        self._record_frame(frame)
+        return frame
+
+    def _patches(self, frame: Frame) -> bytes:
+        out = bytearray()
+        data, stride = frame.data, frame.stride
+        for left, top, w, h in self.rects:
+            row = w * BYTES_PER_PIXEL
+            start = (top - frame.top) * stride + (left - frame.left) * BYTES_PER_PIXEL
+            for i in range(start, start + h * stride, stride):
+                out += data[i:i + row]
+        return bytes(out)
+
+    def _record_frame(self, frame: Frame) -> None:
+        patches = self._patches(frame)
+        with self._lock:
+            if self._file is None:
+                return
+            # frames are only grabbed while the game is in front
+            if not self._focused:
+                self._write(FOCUS, b"\x01")
+                self._focused = True
+            if patches == self._last:
+                self.skipped += 1
+                return
+            self._last = patches
+            self._write(FRAME, patches)
+            self.frames += 1
+
+    def record_focus(self, active: bool) -> None:
+        """FocusTracker listener."""
+        with self._lock:
+            if self._file is None or active == self._focused:
+                return
+            self._focused = active
+            self._write(FOCUS, b"\x01" if active else b"\x00")
+
+    def _write(self, kind: int, payload: bytes) -> None:
+        entry = _ENTRY.pack(self.clock.now() - self._start, kind) + payload
+        self._file.write(self._zip.compress(entry))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(self._zip.flush())
+            self._file.close()
+            self._file = None
+        logger.info(f"Frame recording written: {self.path} ({self.frames} frames, {self.skipped} repeats)")
+        self.inner.close()
+
+
+class Recording:
+    """A recorded session loaded into memory: focus changes and probe patches with times."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size or head[:8] != MAGIC:
+                raise ValueError(f"{path}: not a frame recording")
+            _, version, meta_len = _HEADER.unpack(head)
+            if version != VERSION:
+                raise ValueError(f"{path}: unsupported recording version {version}")
+            self.meta = json.loads(f.read(meta_len).decode("utf-8"))
+            zipped = f.read()
+        # a recording cut short (crash, kill) still yields its complete entries
+        data = zlib.decompressobj().decompress(zipped)
+        self.width: int = self.meta["width"]
+        self.height: int = self.meta["height"]
+        self.rects: List[Rect] = [tuple(r) for r in self.meta["rects"]]
+        frame_size = sum(w * h for _, _, w, h in self.rects) * BYTES_PER_PIXEL
+        self.frames: List[Tuple[float, bytes]] = []
+        self.focus: List[Tuple[float, bool]] = []
+        pos, end = 0, len(data)
+        while pos + _ENTRY.size <= end:
+            t, kind = _ENTRY.unpack_from(data, pos)
+            pos += _ENTRY.size
+            if kind == FRAME:
+                if pos + frame_size > end:
+                    break
+                self.frames.append((t, data[pos:pos + frame_size]))
+                pos += frame_size
+            elif kind == FOCUS:
+                if pos >= end:
+                    break
+                self.focus.append((t, data[pos] == 1))
+                pos += 1
+            else:
+                raise ValueError(f"{path}: corrupt entry at offset {pos - _ENTRY.size}")
+
+    @property
+    def duration(self) -> float:
+        last = [lst[-1][0] for lst in (self.frames, self.focus) if lst]
+        return max(last, default=0.0)
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """Serves a Recording: every read shows the last frame recorded at or before `clock.now()`."""
+
+    def __init__(self, recording: Recording, clock: Clock, fill: Tuple[int, int, int] = (0, 0, 0)) -> None:
+        self.recording = recording
+        self.clock = clock
+        self.screen = MemoryFrameSource(recording.width, recording.height, fill)
+        self._times = [t for t, _ in recording.frames]
+        self._shown = -1
+
+    def _sync(self) -> None:
+        idx = bisect_right(self._times, self.clock.now()) - 1
+        if idx == self._shown or idx < 0:
+            return
+        self._shown = idx
+        patches = memoryview(self.recording.frames[idx][1])
+        pos = 0
+        for left, top, w, h in self.recording.rects:
+            size = w * h * BYTES_PER_PIXEL
+            self.screen.set_region(left, top, w, h, patches[pos:pos + size])
+            pos += size
+
+    def get_pixel(self, x: int, y: int):
+        self._sync()
+        return self.screen.get_pixel(x, y)
+
+    def grab(self, left: int, top: int, width: int, height: int) -> Optional[Frame]:
+        self._sync()
+        return self.screen.grab(left, top, width, height)
@@ -0,0 +1,163 @@
+"""Replay a frame recording (see src/recording.py) through AutoSkipper.
+
+Clock, focus and key injection are fakes as in src/simulation.py, so a
+replay is deterministic for a given seed and runs much faster than real
+time. Save one run as a baseline and compare later detector versions
+against it:
+
+    python -m src.replay autoskip_frames.rec --save-baseline base.json
+    python -m src.replay autoskip_frames.rec --compare base.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from random import Random
+from typing import List, Optional
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.clock import VirtualClock
+from src.focus import FakeFocusSource
+from src.input_sender import RecordingSender
+from src.recording import Recording, ReplayCaptureBackend
+from src.trace import TRACE_CAPACITY, TraceRecorder
+from src.trace_analyzer import analyze
+
+logger = logging.getLogger(__name__)
+
+GAME_HWND = 1
+OTHER_HWND = 2
+# detection or first-press times further apart than this count as a regression
+TOLERANCE = 0.25
+
+
+@dataclass
+class ReplayReport:
+    seed: int
+    duration: float
+    wall_seconds: float
+    frames: int
+    presses: int
+    # dialogue sessions as [start, end] and the delay to their first press (None: never pressed)
+    sessions: List[List[float]] = field(default_factory=list)
+    first_press: List[Optional[float]] = field(default_factory=list)
+
+    @property
+    def speedup(self) -> float:
+        return self.duration / self.wall_seconds if self.wall_seconds else float("inf")
+
+    def to_dict(self) -> dict:
+        return dict(asdict(self), speedup=self.speedup)
+
+
+class Replay:
+    def __init__(self, recording: Recording, seed: Optional[int] = None) -> None:
+        self.recording = recording
+        self.seed = seed if seed is not None else recording.meta.get("seed") or 0
+        self.clock = VirtualClock()
+        self.config = ScreenConfig(recording.width, recording.height)
+        self.capture = ReplayCaptureBackend(recording, self.clock)
+        self.focus = FakeFocusSource(OTHER_HWND, "Desktop")
+        self.focus.titles[GAME_HWND] = self.config.WINDOW_TITLE
+        self.sender = RecordingSender(lambda: self.clock.now())
+        self.skipper = AutoSkipper(self.config, None, Random(self.seed), capture_backend=self.capture,
+                                   focus_source=self.focus, sender=self.sender, clock=self.clock,
+                                   backend=HeadlessBackend(recording.width, recording.height),
+                                   trace=TraceRecorder(TRACE_CAPACITY, enabled=True))
+        if not self._covers_probes():
+            logger.warning("Probe positions differ from the recording; detection will see blank pixels")
+
+    def _covers_probes(self) -> bool:
+        return all(any(l <= x < l + w and t <= y < t + h for l, t, w, h in self.recording.rects)
+                   for x, y in self.skipper._probe_table.points)
+
+    def _stop(self) -> None:
+        self.skipper._stop = True
+        self.skipper.wake()
+
+    def run(self) -> ReplayReport:
+        for t, active in self.recording.focus:
+            hwnd = GAME_HWND if active else OTHER_HWND
+            self.clock.call_at(t, lambda hwnd=hwnd: self.focus.switch(hwnd))
+        # one more second so the last frame is acted on
+        duration = self.recording.duration + 1.0
+        self.clock.call_at(duration, self._stop)
+        self.skipper.status = "run"
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.skipper.run_loop()
+        wall = time.perf_counter() - start
+        trace = analyze(self.skipper.trace.records(), list(self.skipper._probe_table.names))
+        presses = [t for t, _ in self.sender.presses]
+        first_press = []
+        for s in trace.sessions:
+            after = [t for t in presses if s.start <= t <= s.end]
+            first_press.append(after[0] - s.start if after else None)
+        return ReplayReport(
+            seed=self.seed,
+            duration=duration,
+            wall_seconds=wall,
+            frames=len(self.recording.frames),
+            presses=len(presses),
+            sessions=[[s.start, s.end] for s in trace.sessions],
+            first_press=first_press,
+        )
+
+
+def compare(report: dict, baseline: dict, tolerance: float = TOLERANCE) -> List[str]:
+    """Differences of a replay report against a saved baseline; empty if none."""
+    problems = []
+    ours, theirs = report["sessions"], baseline["sessions"]
+    if len(ours) != len(theirs):
+        problems.append(f"dialogue sessions: {len(ours)} (baseline {len(theirs)})")
+    for i, ((start, end), (b_start, b_end)) in enumerate(zip(ours, theirs)):
+        if abs(start - b_start) > tolerance:
+            problems.append(f"session {i}: detected at {start:.2f}s (baseline {b_start:.2f}s)")
+        if abs(end - b_end) > tolerance:
+            problems.append(f"session {i}: ended at {end:.2f}s (baseline {b_end:.2f}s)")
+    for i, (delay, b_delay) in enumerate(zip(report["first_press"], baseline["first_press"])):
+        if (delay is None) != (b_delay is None):
+            problems.append(f"session {i}: {'no press' if delay is None else 'pressed'} (baseline differs)")
+        elif delay is not None and delay - b_delay > tolerance:
+            problems.append(f"session {i}: first press after {delay:.2f}s (baseline {b_delay:.2f}s)")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded session through AutoSkipper")
+    parser.add_argument("path", help="Frame recording (--record-frames output)")
+    parser.add_argument("--seed", type=int, default=None, help="Skipper RNG seed (default: the recorded one)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the report as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed timing drift in seconds")
+    args = parser.parse_args(argv)
+
+    report = Replay(Recording(args.path), args.seed).run().to_dict()
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key in ("seed", "duration", "wall_seconds", "speedup", "frames", "presses"):
+            value = report[key]
+            print(f"{key:>14}: {value:.3f}" if isinstance(value, float) else f"{key:>14}: {value}")
+        print(f"{'sessions':>14}: {len(report['sessions'])}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Contrast-normalized patch matching for the "roi" detector (src/detectors.py).
+
+Each color channel of a patch is normalized on its own: the channel mean is
+subtracted and the rest scaled by the channel's mean absolute deviation.
+HDR, gamma and brightness changes and color filters act on an icon mostly as
+a gain and an offset per channel, and normalization removes both, so what is
+compared is the icon's shape. A patch is scored against each template by the
+mean absolute difference of the normalized values. Everything is integer
+math: the NumPy path and the pure-Python path give identical scores.
+
+Raw patches (`planar_patch`, also the stored template format) hold per row
+the R, G and B values of that row as three runs.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from src._compat import numpy_for
+from src.capture import BYTES_PER_PIXEL, Frame
+
+# normalized values are channel deviations in 1/SCALE units of the mean absolute deviation
+SCALE = 64
+# channels with a smaller mean absolute deviation (0-255 units) carry no shape
+MIN_CONTRAST = 4
+
+Rect = Tuple[int, int, int, int]
+
+
+def _channels(patch: bytes, width: int) -> List[List[int]]:
+    row = 3 * width
+    return [[v for r in range(0, len(patch), row) for v in patch[r + c * width:r + (c + 1) * width]]
+            for c in range(3)]
+
+
+def planar_patch(frame: Frame, rect: Rect) -> Optional[bytes]:
+    """Raw patch at `rect` in the storage layout, or None if it is not in the frame."""
+    left, top, w, h = rect
+    frame = frame.part(rect)
+    if frame is None:
+        return None
+    data, stride = frame.data, frame.stride
+    row = w * BYTES_PER_PIXEL
+    start = (top - frame.top) * stride + (left - frame.left) * BYTES_PER_PIXEL
+    out = bytearray()
+    for i in range(start, start + h * stride, stride):
+        px = bytes(data[i:i + row])
+        out += px[2::4] + px[1::4] + px[0::4]
+    return bytes(out)
+
+
+def contrast(patch: bytes, width: int) -> int:
+    """Largest per-channel mean absolute deviation of a patch."""
+    best = 0
+    for values in _channels(patch, width):
+        n = len(values)
+        mean = sum(values) // n
+        best = max(best, sum(abs(v - mean) for v in values) // n)
+    return best
+
+
+def normalize(patch: bytes, width: int) -> Optional[List[int]]:
+    """Channel-major normalized values, or None if every channel is flat."""
+    out = []
+    flat = True
+    for values in _channels(patch, width):
+        n = len(values)
+        mean = sum(values) // n
+        dev = sum(abs(v - mean) for v in values) // n
+        if dev < MIN_CONTRAST:
+            out.extend([0] * n)
+        else:
+            flat = False
+            out.extend((v - mean) * SCALE // dev for v in values)
+    return None if flat else out
+
+
+def distance(a: Sequence[int], b: Sequence[int]) -> int:
+    return sum(abs(x - y) for x, y in zip(a, b)) // len(a)
+
+
+class RoiMatcher:
+    """Scores the patches at `rects` of a frame against per-rect templates.
+
+    `templates[i]` are the raw patches for `rects[i]`; templates of the
+    wrong size or without contrast are dropped.
+    """
+
+    def __init__(self, rects: Sequence[Rect], templates: Sequence[Sequence[bytes]],
+                 use_numpy: Optional[bool] = None) -> None:
+        self._np = np = numpy_for(use_numpy, "RoiMatcher")
+        self.numpy = np is not None
+        self.rects = list(rects)
+        self.templates: List[List[List[int]]] = []
+        for (_, _, w, h), raw in zip(self.rects, templates):
+            norm = [normalize(t, w) for t in raw if len(t) == w * h * 3]
+            self.templates.append([t for t in norm if t is not None])
+        if np is not None:
+            # one (templates, values) matrix per rect
+            self._np_templates = [np.array(t, dtype=np.int32) if t else None for t in self.templates]
+
+    def scores(self, frame: Frame) -> List[float]:
+        """Best template distance per rect; inf if it has no templates, is off-frame or flat."""
+        if self.numpy:
+            return self._scores_numpy(frame)
+        out = []
+        for rect, templates in zip(self.rects, self.templates):
+            patch = planar_patch(frame, rect) if templates else None
+            norm = normalize(patch, rect[2]) if patch is not None else None
+            out.append(min(distance(norm, t) for t in templates) if norm is not None else float("inf"))
+        return out
+
+    def _scores_numpy(self, frame) -> List[float]:
+        np = self._np
+        # pixel arrays per grabbed frame (a FrameSet has several)
+        views = {}
+        out = []
+        for rect, templates in zip(self.rects, self._np_templates):
+            part = frame.part(rect) if templates is not None else None
+            if part is None:
+                out.append(float("inf"))
+                continue
+            pixels = views.get(id(part))
+            if pixels is None:
+                buf = np.frombuffer(part.data, dtype=np.uint8, count=part.height * part.stride)
+                pixels = views[id(part)] = buf.reshape(part.height, part.width, BYTES_PER_PIXEL)
+            left, top, w, h = rect
+            x, y = left - part.left, top - part.top
+            # BGRA rows -> channel-major RGB
+            patch = pixels[y:y + h, x:x + w, 2::-1].transpose(2, 0, 1).reshape(3, -1).astype(np.int32)
+            n = patch.shape[1]
+            centered = patch - patch.sum(axis=1, keepdims=True) // n
+            dev = np.abs(centered).sum(axis=1, keepdims=True) // n
+            if (dev < MIN_CONTRAST).all():
+                out.append(float("inf"))
+                continue
+            norm = np.where(dev >= MIN_CONTRAST, centered * SCALE // np.maximum(dev, 1), 0).reshape(-1)
+            out.append(int((np.abs(templates - norm).sum(axis=1) // norm.size).min()))
+        return out
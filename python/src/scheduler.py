@@ -0,0 +1,56 @@
+import heapq
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
+
+class Scheduler:
+    """Named one-shot deadlines on a min-heap.
+
+    Re-setting a name supersedes its previous deadline (stale heap entries are
+    skipped lazily), so the loop can ask for the next wakeup in O(log n)
+    without recomputing a min() over every timer. Time is whatever the caller
+    passes in, which keeps it usable with a virtual clock.
+    """
+
+    def __init__(self) -> None:
+        self._deadlines: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = count()
+
+    def set(self, name: str, when: float) -> None:
+        self._deadlines[name] = when
+        heapq.heappush(self._heap, (when, next(self._seq), name))
+
+    def cancel(self, name: str) -> None:
+        self._deadlines.pop(name, None)
+
+    def deadline(self, name: str) -> Optional[float]:
+        return self._deadlines.get(name)
+
+    def due(self, name: str, now: float) -> bool:
+        """True once the deadline for `name` has been reached."""
+        when = self._deadlines.get(name)
+        return when is not None and when <= now
+
+    def pending(self, name: str, now: float) -> bool:
+        """True while the deadline for `name` is still in the future."""
+        when = self._deadlines.get(name)
+        return when is not None and when > now
+
+    def next_deadline(self, now: float) -> Optional[Tuple[float, str]]:
+        """Earliest deadline after `now`; deadlines at or before `now` count as fired and are dropped."""
+        heap, deadlines = self._heap, self._deadlines
+        while heap:
+            when, _, name = heap[0]
+            if deadlines.get(name) != when:
+                heapq.heappop(heap)  # superseded or cancelled
+                continue
+            if when <= now:
+                heapq.heappop(heap)
+                del deadlines[name]
+                continue
+            return when, name
+        return None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
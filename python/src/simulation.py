@@ -0,0 +1,409 @@
+"""Deterministic replay of a scripted dialogue timeline through AutoSkipper.
+
+Screen, foreground window, key injection and clock are all fakes, so hours of
+play run in seconds on any OS:
+
+    python -m src.simulation --seed 1 --minutes 60
+
+With --lines, dialogues show text lines that react to presses like the game
+does (see Conversation), which is what --pacing feedback needs to be measured.
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+from random import Random
+from typing import Callable, List, Optional
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.capture import MemoryFrameSource
+from src.clock import VirtualClock
+from src.detectors import dialogue_box
+from src.focus import FakeFocusSource
+from src.input_sender import RecordingSender
+from src.instrumentation import Instrumentation
+from src.pacing import PressPacer
+from src.recording import RecordingCaptureBackend
+from src.trace import TRACE_CAPACITY, TraceRecorder
+
+GAME_HWND = 1
+OTHER_HWND = 2
+# neutral color that matches none of the probes
+BACKGROUND = (40, 40, 40)
+
+# which probes are lit for each screen state
+SCREEN_STATES = {
+    "idle": (),
+    "playing": ("playing",),
+    "choice": ("choice_low",),
+    "loading": ("loading", "choice_low"),
+}
+DIALOGUE_STATES = ("playing", "choice")
+
+# line model: text box fade between lines (presses ignored), typing speed, text color
+LINE_FADE = 0.35
+CHARS_PER_SECOND = 30.0
+TYPE_TICK = 0.1
+LINE_CHARS = (20, 80)
+TEXT = (235, 235, 235)
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    screen: str
+    focused: bool = True
+    # press-driven text lines (Conversation) while the segment shows
+    lines: bool = False
+
+    @property
+    def is_dialogue(self) -> bool:
+        return self.focused and self.screen in DIALOGUE_STATES
+
+
+class Timeline:
+    """Ordered screen/focus segments, built with the chainable helpers below."""
+
+    def __init__(self) -> None:
+        self.segments: List[Segment] = []
+
+    @property
+    def duration(self) -> float:
+        return self.segments[-1].end if self.segments else 0.0
+
+    def add(self, screen: str, seconds: float, focused: bool = True, lines: bool = False) -> "Timeline":
+        if screen not in SCREEN_STATES:
+            raise ValueError(f"Unknown screen state: {screen!r}")
+        start = self.duration
+        self.segments.append(Segment(start, start + seconds, screen, focused, lines))
+        return self
+
+    def idle(self, seconds: float) -> "Timeline":
+        return self.add("idle", seconds)
+
+    def dialogue(self, seconds: float, lines: bool = False) -> "Timeline":
+        return self.add("playing", seconds, lines=lines)
+
+    def choice(self, seconds: float) -> "Timeline":
+        return self.add("choice", seconds)
+
+    def loading(self, seconds: float) -> "Timeline":
+        return self.add("loading", seconds)
+
+    def unfocused(self, seconds: float, screen: str = "idle") -> "Timeline":
+        return self.add(screen, seconds, focused=False)
+
+    @classmethod
+    def random(cls, rand: Random, seconds: float, lines: bool = False) -> "Timeline":
+        """Open-world play interleaved with dialogues, choices, loads and alt-tabs."""
+        tl = cls()
+        while tl.duration < seconds:
+            tl.idle(rand.uniform(5.0, 60.0))
+            r = rand.random()
+            if r < 0.6:
+                tl.dialogue(rand.uniform(3.0, 30.0), lines)
+                if rand.random() < 0.4:
+                    tl.choice(rand.uniform(1.0, 5.0)).dialogue(rand.uniform(2.0, 15.0), lines)
+                # follow-up line after a short cut, as in cutscene conversations
+                while rand.random() < 0.3:
+                    tl.idle(rand.uniform(0.5, 3.0)).dialogue(rand.uniform(2.0, 10.0), lines)
+            elif r < 0.8:
+                tl.loading(rand.uniform(2.0, 10.0))
+            else:
+                tl.unfocused(rand.uniform(5.0, 120.0), screen=rand.choice(("idle", "playing")))
+        return tl
+
+
+class Conversation:
+    """Text box that reacts to presses the way the game's dialogue box does.
+
+    A line fades in for LINE_FADE seconds, during which presses are ignored,
+    then types at CHARS_PER_SECOND. A press while typing shows the whole line;
+    a press on a finished line clears the box and starts the next one.
+    """
+
+    GLYPH = (12, 20)
+    PITCH = (22, 36)
+
+    def __init__(self, screen: MemoryFrameSource, rand: Random, call_at: Callable[[float, Callable], object]) -> None:
+        self.screen = screen
+        self.rand = rand
+        self.call_at = call_at
+        self.box = dialogue_box(screen.width, screen.height)
+        gw, gh = self.GLYPH
+        self._glyph = bytes((TEXT[2], TEXT[1], TEXT[0], 0)) * (gw * gh)
+        self._blank = bytes((BACKGROUND[2], BACKGROUND[1], BACKGROUND[0], 0)) * (self.box[2] * self.box[3])
+        self.per_row = max(1, (self.box[2] - gw) // self.PITCH[0])
+        self.active = False
+        # lines advanced by a press, presses that fell into a fade
+        self.advanced = 0
+        self.ignored = 0
+        self._shown = 0
+        self._length = 0
+        self._typing_from: Optional[float] = None
+        # bumped on every line change so stale ticks do nothing
+        self._gen = 0
+
+    def start(self, now: float) -> None:
+        self.active = True
+        self._next_line(now)
+
+    def stop(self) -> None:
+        self.active = False
+        self._gen += 1
+        self._clear()
+
+    def press(self, now: float) -> None:
+        if not self.active:
+            return
+        if self._typing_from is None:
+            self.ignored += 1
+        elif self._shown < self._length:
+            self._draw(self._length)
+        else:
+            self.advanced += 1
+            self._next_line(now)
+
+    def _next_line(self, now: float) -> None:
+        self._gen += 1
+        self._clear()
+        self._typing_from = None
+        self._length = self.rand.randint(*LINE_CHARS)
+        gen = self._gen
+        self.call_at(now + LINE_FADE, lambda: self._tick(gen, now + LINE_FADE))
+
+    def _tick(self, gen: int, when: float) -> None:
+        if gen != self._gen:
+            return
+        if self._typing_from is None:
+            self._typing_from = when
+        self._draw(min(self._length, int((when - self._typing_from) * CHARS_PER_SECOND) + 1))
+        if self._shown < self._length:
+            self.call_at(when + TYPE_TICK, lambda: self._tick(gen, when + TYPE_TICK))
+
+    def _draw(self, chars: int) -> None:
+        left, top = self.box[0] + self.PITCH[0] // 2, self.box[1] + self.PITCH[1] // 4
+        gw, gh = self.GLYPH
+        for i in range(self._shown, chars):
+            row, col = divmod(i, self.per_row)
+            y = top + row * self.PITCH[1]
+            if y + gh > self.box[1] + self.box[3]:
+                break
+            self.screen.set_region(left + col * self.PITCH[0], y, gw, gh, self._glyph)
+        self._shown = max(self._shown, chars)
+
+    def _clear(self) -> None:
+        self._shown = 0
+        self.screen.set_region(*self.box, self._blank)
+
+
+class LineSender(RecordingSender):
+    """RecordingSender that also delivers each press to the conversation on screen."""
+
+    def __init__(self, now: Callable[[], float], conversation: Conversation) -> None:
+        super().__init__(now)
+        self.conversation = conversation
+
+    def _send(self, keys) -> None:
+        super()._send(keys)
+        now = self._now()
+        for _ in keys:
+            self.conversation.press(now)
+
+
+@dataclass
+class SimReport:
+    sim_seconds: float
+    wall_seconds: float
+    dialogues: int
+    missed_dialogues: int
+    presses: int
+    wasted_presses: int
+    detection_latency_mean: float
+    detection_latency_max: float
+    pixel_reads_per_sec: float
+    captures_per_sec: float
+    wakeups_per_sec: float
+    diff_hit_rate: float
+    # line model only (Timeline segments with lines=True)
+    lines_advanced: int = 0
+    ignored_presses: int = 0
+    held_presses: int = 0
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def speedup(self) -> float:
+        return self.sim_seconds / self.wall_seconds if self.wall_seconds else float("inf")
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d.pop("latencies")
+        d["speedup"] = self.speedup
+        return d
+
+
+class Simulation:
+    def __init__(self, timeline: Timeline, seed: int = 0, width: int = 1920, height: int = 1080,
+                 instrument: bool = False, trace_capacity: int = 0, record_frames: Optional[str] = None,
+                 pacing: str = "timer", metrics_path: Optional[str] = None) -> None:
+        self.timeline = timeline
+        self.clock = VirtualClock()
+        self.config = ScreenConfig(width, height)
+        self.screen = MemoryFrameSource(width, height, fill=BACKGROUND)
+        self.focus = FakeFocusSource(OTHER_HWND, "Desktop")
+        self.focus.titles[GAME_HWND] = self.config.WINDOW_TITLE
+        self.conversation = Conversation(self.screen, Random(seed + 1), self.clock.call_at)
+        self.sender = LineSender(lambda: self.skipper.clock.now(), self.conversation)
+        self.pacer = PressPacer.for_screen(width, height) if pacing == "feedback" else None
+        self.recorder: Optional[RecordingCaptureBackend] = None
+        capture = self.screen
+        if record_frames:
+            capture = self.recorder = RecordingCaptureBackend(
+                self.screen, record_frames, self.config.probe_table().points, (width, height), self.clock,
+                meta={"seed": seed})
+        self.skipper = AutoSkipper(self.config, None, Random(seed), capture_backend=capture,
+                                   focus_source=self.focus, sender=self.sender, clock=self.clock,
+                                   backend=HeadlessBackend(width, height),
+                                   # snapshots stay in memory unless a path is given
+                                   metrics=Instrumentation(enabled=instrument, path=metrics_path),
+                                   trace=TraceRecorder(trace_capacity or 1, enabled=bool(trace_capacity)),
+                                   pacer=self.pacer)
+        self._probes = self.config.probe_table().probes
+        if self.recorder:
+            self.skipper.focus.add_listener(self.recorder.record_focus)
+
+    def _apply(self, seg: Segment) -> None:
+        lit = SCREEN_STATES[seg.screen]
+        for probe in self._probes:
+            self.screen.set_pixel(*probe.pos, probe.color if probe.name in lit else BACKGROUND)
+        hwnd = GAME_HWND if seg.focused else OTHER_HWND
+        if hwnd != self.focus.hwnd:
+            self.focus.switch(hwnd)
+        if seg.lines:
+            self.conversation.start(seg.start)
+        elif self.conversation.active:
+            self.conversation.stop()
+
+    def _stop(self) -> None:
+        self.skipper._stop = True
+        self.skipper.wake()
+
+    def run(self) -> SimReport:
+        for seg in self.timeline.segments:
+            self.clock.call_at(seg.start, lambda seg=seg: self._apply(seg))
+        self.clock.call_at(self.timeline.duration, self._stop)
+        self.skipper.status = "run"
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.skipper.run_loop()
+        if self.recorder:
+            self.recorder.close()
+        return self._report(time.perf_counter() - start, self.clock.waits)
+
+    def run_async(self) -> SimReport:
+        """Same replay on the asyncio runtime, with a virtual event loop clock."""
+        from src.async_runtime import AsyncRuntime, VirtualEventLoop
+
+        loop = VirtualEventLoop()
+        runtime = AsyncRuntime(self.skipper)
+        self.conversation.call_at = loop.call_at
+        for seg in self.timeline.segments:
+            loop.call_at(seg.start, lambda seg=seg: self._apply(seg))
+        loop.call_at(self.timeline.duration, runtime.stop)
+        self.skipper.status = "run"
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                loop.run_until_complete(runtime.run())
+        finally:
+            loop.close()
+        return self._report(time.perf_counter() - start, runtime.wakeups)
+
+    def _report(self, wall: float, wakeups: int) -> SimReport:
+        duration = self.timeline.duration or 1.0
+        dialogues = [s for s in self.timeline.segments if s.is_dialogue]
+        press_times = [t for t, _ in self.sender.presses]
+        latencies = []
+        in_dialogue = 0
+        for seg in dialogues:
+            lo, hi = bisect_left(press_times, seg.start), bisect_left(press_times, seg.end)
+            if hi > lo:
+                latencies.append(press_times[lo] - seg.start)
+            in_dialogue += hi - lo
+        wasted = len(press_times) - in_dialogue
+        return SimReport(
+            sim_seconds=duration,
+            wall_seconds=wall,
+            dialogues=len(dialogues),
+            missed_dialogues=len(dialogues) - len(latencies),
+            presses=len(press_times),
+            wasted_presses=wasted,
+            detection_latency_mean=sum(latencies) / len(latencies) if latencies else 0.0,
+            detection_latency_max=max(latencies, default=0.0),
+            pixel_reads_per_sec=self.skipper.pixel_sampler.points_read / duration,
+            captures_per_sec=(self.screen.grabs + self.screen.pixel_reads) / duration,
+            wakeups_per_sec=wakeups / duration,
+            diff_hit_rate=self.skipper.pixel_sampler.diff_hit_rate,
+            lines_advanced=self.conversation.advanced,
+            ignored_presses=self.conversation.ignored,
+            held_presses=self.pacer.held if self.pacer else 0,
+            latencies=latencies,
+        )
+
+
+def run_simulation(timeline: Timeline, seed: int = 0, width: int = 1920, height: int = 1080,
+                   use_asyncio: bool = False, pacing: str = "timer") -> SimReport:
+    sim = Simulation(timeline, seed, width, height, pacing=pacing)
+    return sim.run_async() if use_asyncio else sim.run()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a random dialogue timeline through AutoSkipper")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for both the timeline and the skipper RNG")
+    parser.add_argument("--minutes", type=float, default=60.0, help="Simulated play time")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--asyncio", action="store_true", help="Drive the asyncio runtime instead of run_loop")
+    parser.add_argument("--instrument", action="store_true", help="Also report per-stage timing histograms")
+    parser.add_argument("--trace", metavar="PATH", help="Write the decision trace to PATH (see src.trace_analyzer)")
+    parser.add_argument("--trace-size", type=int, default=TRACE_CAPACITY, help="Trace ring size in records")
+    parser.add_argument("--record-frames", metavar="PATH", help="Record the probe frames to PATH (see src.replay)")
+    parser.add_argument("--lines", action="store_true", help="Dialogues show text lines that react to presses")
+    parser.add_argument("--pacing", choices=("timer", "feedback"), default="timer",
+                        help="feedback: hold presses until the text box reacts (src/pacing.py)")
+    args = parser.parse_args(argv)
+    if args.record_frames and args.asyncio:
+        # frames are stamped with the VirtualClock, which the asyncio runtime does not advance
+        parser.error("--record-frames needs the threaded loop")
+
+    timeline = Timeline.random(Random(args.seed), args.minutes * 60, lines=args.lines)
+    sim = Simulation(timeline, args.seed, args.width, args.height, instrument=args.instrument,
+                     trace_capacity=args.trace_size if args.trace else 0, record_frames=args.record_frames,
+                     pacing=args.pacing)
+    report = sim.run_async() if args.asyncio else sim.run()
+    if args.trace:
+        sim.skipper.trace.dump(args.trace)
+    metrics = sim.skipper.metrics
+    if args.json:
+        out = report.to_dict()
+        if args.instrument:
+            out["metrics"] = metrics.snapshot()
+        print(json.dumps(out, indent=2))
+        return
+    for key, value in report.to_dict().items():
+        print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    if args.instrument:
+        for name, h in dict(metrics.histograms, **metrics.attached).items():
+            print(f"{name:>24}: {h.summary()}")
+        for name, n in metrics.counters.items():
+            print(f"{name:>24}: {n}")
+
+
+if __name__ == "__main__":
+    main()
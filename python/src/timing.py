@@ -0,0 +1,259 @@
+"""Pregenerated random decisions for the skipper's timing model.
+
+Each kind of decision (press interval, break, per-press flags, post-burst
+pause) has its own seeded stream. Values are generated in batches into a
+deque and consumed one at a time, so a press costs one `popleft()`
+instead of several `Random` calls. `refill()` tops the queues up and is
+called before the loop goes to sleep. A queue that runs dry in the middle
+of a step is filled on the spot.
+
+The streams' seeds come from the skipper's `Random`, so a `--seed` run
+is reproducible. The same seed gives different (equally distributed)
+values with and without NumPy.
+
+The probabilities and ranges below are the defaults of TimingParams; each
+can be overridden in .env under the constant's name with the ENV_PREFIX,
+e.g. AUTOSKIP_NORMAL_INTERVAL=0.12,0.2 or AUTOSKIP_SKIP_P=0.05. Unprefixed
+keys are ignored.
+"""
+from collections import deque
+from dataclasses import dataclass, fields
+from random import Random
+from typing import Callable, Deque, List, Mapping, NamedTuple, Optional, Tuple
+
+from src._compat import load_numpy, numpy_for
+
+BATCH = 512
+# only refill before sleeps at least this long, so it never delays a due press
+REFILL_MIN_SLEEP = 0.02
+
+# press interval model: rapid runs, occasional wide intervals, normal otherwise
+RAPID_START_P = 1 / 50
+RAPID_RUN = (2, 5)
+RAPID_INTERVAL = (0.05, 0.09)
+WIDE_P = 1 / 8
+WIDE_INTERVAL = (0.09, 0.25)
+NORMAL_INTERVAL = (0.11, 0.21)
+# break check every 30 s
+LONG_BREAK_P = 1 / 100
+SHORT_BREAK_P = 1 / 25
+LONG_BREAK = (4.0, 10.0)
+SHORT_BREAK = (2.0, 6.0)
+# per press decision
+SKIP_P = 1 / 40
+DOUBLE_P = 1 / 35
+BURST_P = 1 / 60
+BURST_LENGTH = (3, 5)
+SPACE_P = 0.1
+POST_BURST = (0.4, 1.0)
+# .env keys are the constant names with this prefix, e.g. AUTOSKIP_SKIP_P,
+# so a generic variable in the shell (SKIP_P) cannot change the timing
+ENV_PREFIX = "AUTOSKIP_"
+
+
+@dataclass(frozen=True)
+class TimingParams:
+    rapid_start_p: float = RAPID_START_P
+    rapid_run: Tuple[int, int] = RAPID_RUN
+    rapid_interval: Tuple[float, float] = RAPID_INTERVAL
+    wide_p: float = WIDE_P
+    wide_interval: Tuple[float, float] = WIDE_INTERVAL
+    normal_interval: Tuple[float, float] = NORMAL_INTERVAL
+    long_break_p: float = LONG_BREAK_P
+    short_break_p: float = SHORT_BREAK_P
+    long_break: Tuple[float, float] = LONG_BREAK
+    short_break: Tuple[float, float] = SHORT_BREAK
+    skip_p: float = SKIP_P
+    double_p: float = DOUBLE_P
+    burst_p: float = BURST_P
+    burst_length: Tuple[int, int] = BURST_LENGTH
+    space_p: float = SPACE_P
+    post_burst: Tuple[float, float] = POST_BURST
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]) -> "TimingParams":
+        """Defaults overridden by the ENV_PREFIX keys that are set; raises ValueError naming every invalid one."""
+        values, errors = {}, []
+        for f in fields(cls):
+            key = ENV_PREFIX + f.name.upper()
+            raw = env.get(key, "").strip()
+            if not raw:
+                continue
+            default = f.default
+            try:
+                if isinstance(default, tuple):
+                    lo, hi = (type(d)(v) for d, v in zip(default, raw.split(",", 1)))
+                    if raw.count(",") != 1 or not 0 < lo <= hi:
+                        raise ValueError
+                    values[f.name] = (lo, hi)
+                else:
+                    p = float(raw)
+                    if not 0 <= p <= 1:
+                        raise ValueError
+                    values[f.name] = p
+            except ValueError:
+                expected = "a range 'lo,hi' with 0 < lo <= hi" if isinstance(default, tuple) else "a probability"
+                errors.append(f"{key}={raw!r} is not {expected}")
+        if values.get("long_break_p", LONG_BREAK_P) + values.get("short_break_p", SHORT_BREAK_P) > 1:
+            errors.append(f"{ENV_PREFIX}LONG_BREAK_P + {ENV_PREFIX}SHORT_BREAK_P exceeds 1")
+        if errors:
+            raise ValueError("; ".join(errors))
+        return cls(**values)
+
+
+DEFAULT_TIMING = TimingParams()
+
+
+class PressDecision(NamedTuple):
+    skip: bool
+    double: bool
+    # presses in a new burst, 0 if none starts
+    burst: int
+    space: bool
+
+
+class _Source:
+    """Batch draws for one stream: NumPy Generator if available, else `random.Random`."""
+
+    def __init__(self, seed: int, use_numpy: bool) -> None:
+        self.numpy = use_numpy
+        if use_numpy:
+            np = load_numpy()
+            self._gen = np.random.Generator(np.random.PCG64(seed))
+        else:
+            self._rand = Random(seed)
+
+    def random(self, n: int) -> List[float]:
+        if self.numpy:
+            return self._gen.random(n).tolist()
+        r = self._rand.random
+        return [r() for _ in range(n)]
+
+    def uniform(self, lo: float, hi: float, n: int) -> List[float]:
+        if self.numpy:
+            return self._gen.uniform(lo, hi, n).tolist()
+        u = self._rand.uniform
+        return [u(lo, hi) for _ in range(n)]
+
+    def randint(self, lo: int, hi: int, n: int) -> List[int]:
+        """Inclusive bounds, like `Random.randint`."""
+        if self.numpy:
+            return self._gen.integers(lo, hi + 1, n).tolist()
+        r = self._rand.randint
+        return [r(lo, hi) for _ in range(n)]
+
+
+class _Stream:
+    def __init__(self, generate: Callable[[int], list], batch: int) -> None:
+        self._generate = generate
+        self._batch = batch
+        # refill once down to a quarter batch
+        self._low_water = batch // 4
+        self.queue: Deque = deque()
+
+    def take(self):
+        try:
+            return self.queue.popleft()
+        except IndexError:
+            self.queue.extend(self._generate(self._batch))
+            return self.queue.popleft()
+
+    def refill(self) -> bool:
+        if len(self.queue) > self._low_water:
+            return False
+        self.queue.extend(self._generate(self._batch))
+        return True
+
+
+class TimingModel:
+    """Random timing decisions for AutoSkipper, drawn from pregenerated batches."""
+
+    def __init__(self, rand: Random, batch: int = BATCH, use_numpy: Optional[bool] = None,
+                 params: TimingParams = DEFAULT_TIMING) -> None:
+        use_numpy = numpy_for(use_numpy, "TimingModel") is not None
+        self.numpy = use_numpy
+        self.params = params
+        # one independent stream per decision kind; a float keeps Random mocks usable
+        seeds = [int(rand.random() * (1 << 53)) for _ in range(4)]
+        self._interval_src, self._break_src, self._press_src, self._pause_src = (
+            _Source(s, use_numpy) for s in seeds)
+        self._rapid_left = 0
+        self._intervals = _Stream(self._gen_intervals, batch)
+        self._breaks = _Stream(self._gen_breaks, max(1, batch // 8))
+        self._presses = _Stream(self._gen_presses, batch)
+        self._pauses = _Stream(self._gen_pauses, max(1, batch // 8))
+        self._streams = (self._intervals, self._breaks, self._presses, self._pauses)
+        self.refills = 0
+
+    # --- hot path ---
+    def next_interval(self) -> float:
+        return self._intervals.take()
+
+    def next_break(self) -> Tuple[Optional[str], float]:
+        """("long" | "short" | None, duration) for one periodic break check."""
+        return self._breaks.take()
+
+    def next_press(self) -> PressDecision:
+        return self._presses.take()
+
+    def post_burst_pause(self) -> float:
+        return self._pauses.take()
+
+    # --- off the hot path ---
+    def refill(self) -> int:
+        """Top up every queue that is below a quarter batch; returns how many were filled."""
+        filled = sum(s.refill() for s in self._streams)
+        self.refills += filled
+        return filled
+
+    def _gen_intervals(self, n: int) -> List[float]:
+        src, p = self._interval_src, self.params
+        start_u, wide_u = src.random(n), src.random(n)
+        rapid = src.uniform(*p.rapid_interval, n)
+        wide = src.uniform(*p.wide_interval, n)
+        normal = src.uniform(*p.normal_interval, n)
+        runs = src.randint(*p.rapid_run, n)
+        start_p, wide_p = p.rapid_start_p, p.wide_p
+        out = []
+        left = self._rapid_left
+        # a rapid run spans batches, so this part stays a sequential loop
+        for i in range(n):
+            if left > 0:
+                left -= 1
+                out.append(rapid[i])
+            elif start_u[i] < start_p:
+                left = runs[i]
+                out.append(rapid[i])
+            elif wide_u[i] < wide_p:
+                out.append(wide[i])
+            else:
+                out.append(normal[i])
+        self._rapid_left = left
+        return out
+
+    def _gen_breaks(self, n: int) -> List[Tuple[Optional[str], float]]:
+        src, p = self._break_src, self.params
+        kind_u = src.random(n)
+        long_d = src.uniform(*p.long_break, n)
+        short_d = src.uniform(*p.short_break, n)
+        long_p, any_p = p.long_break_p, p.long_break_p + p.short_break_p
+        out = []
+        for u, ld, sd in zip(kind_u, long_d, short_d):
+            if u < long_p:
+                out.append(("long", ld))
+            elif u < any_p:
+                out.append(("short", sd))
+            else:
+                out.append((None, 0.0))
+        return out
+
+    def _gen_presses(self, n: int) -> List[PressDecision]:
+        src, p = self._press_src, self.params
+        skip_u, double_u, burst_u, space_u = src.random(n), src.random(n), src.random(n), src.random(n)
+        lengths = src.randint(*p.burst_length, n)
+        skip_p, double_p, burst_p, space_p = p.skip_p, p.double_p, p.burst_p, p.space_p
+        return [PressDecision(s < skip_p, d < double_p, length if b < burst_p else 0, sp < space_p)
+                for s, d, b, sp, length in zip(skip_u, double_u, burst_u, space_u, lengths)]
+
+    def _gen_pauses(self, n: int) -> List[float]:
+        return self._pause_src.uniform(*self.params.post_burst, n)
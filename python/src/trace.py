@@ -0,0 +1,229 @@
+"""Binary ring-buffer trace of skipper decisions.
+
+Every record is 64 bytes: timestamp, event type, flags, probe match mask, one
+float argument and the RGB color of up to 16 probes. Records go into a
+preallocated ring with `struct.pack_into`, so tracing costs about a
+microsecond per event and never allocates. `dump()` writes the ring
+oldest-first, after a small header, and `TraceFile` memory-maps that file
+for the analyzer (`python -m src.trace_analyzer`).
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from src.capture import RGB, Frame, Point
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = "autoskip_trace.bin"
+# 64 KiB records (4 MiB): around two hours of active play
+TRACE_CAPACITY = 1 << 16
+
+MAGIC = b"GDATRACE"
+VERSION = 1
+# magic, version, record size, metadata length, record count
+_HEADER = struct.Struct("<8sHHIQ")
+# time, event, flags, probe mask, value; followed by the probe colors
+_FIXED = struct.Struct("<dBBHf")
+MAX_PROBES = 16
+COLOR_BYTES = MAX_PROBES * 3
+_RECORD = struct.Struct(f"<dBBHf{COLOR_BYTES}s")
+RECORD_SIZE = _RECORD.size
+
+# event types
+EV_CHECK = 1    # dialogue check: flags CHECK_*, mask = probe hits, colors
+EV_PRESS = 2    # key press: flags PRESS_*, value = seconds late vs the scheduled time
+EV_SKIP = 3     # scheduled press deliberately skipped; flags SKIP_HELD if held by the pacer
+EV_WINDOW = 4   # flags 1 = game window active, 0 = inactive
+EV_STATUS = 5   # flags STATUS_*
+EV_BREAK = 6    # flags 1 = long break, 0 = short; value = duration
+EV_BURST = 7    # burst mode started; value = presses in the burst
+
+EVENT_NAMES = {EV_CHECK: "check", EV_PRESS: "press", EV_SKIP: "skip", EV_WINDOW: "window",
+               EV_STATUS: "status", EV_BREAK: "break", EV_BURST: "burst"}
+
+CHECK_DIALOGUE = 1
+CHECK_UNCHANGED = 2   # probe pixels identical to the previous check, classification reused
+CHECK_FALLBACK = 4    # region grab failed, probes read per pixel (no colors recorded)
+CHECK_ESCALATED = 8   # probe verdict unsure, decided by a later detector stage (src/detectors.py)
+
+SKIP_HELD = 1   # feedback pacing: the text box has not reacted to the last press yet
+
+PRESS_F = 0
+PRESS_SPACE = 1
+PRESS_DOUBLE = 2
+PRESS_KEYS = {PRESS_F: "f", PRESS_SPACE: "space", PRESS_DOUBLE: "f+f"}
+PRESS_KEY_MASK = 3
+# the loop slept until this press was due, so `value` is pure timer lateness
+PRESS_SCHEDULED = 4
+
+STATUS_RUN = 0
+STATUS_PAUSE = 1
+STATUS_EXIT = 2
+STATUS_NAMES = {STATUS_RUN: "run", STATUS_PAUSE: "pause", STATUS_EXIT: "exit"}
+
+
+class TraceRecord(NamedTuple):
+    time: float
+    event: int
+    flags: int
+    mask: int
+    value: float
+    colors: bytes
+
+    def probe_colors(self, n: int) -> List[RGB]:
+        c = self.colors
+        return [(c[i], c[i + 1], c[i + 2]) for i in range(0, 3 * min(n, MAX_PROBES), 3)]
+
+
+class TraceRecorder:
+    """Fixed-size ring of trace records; the oldest are overwritten when full.
+
+    Like Instrumentation, the hooks stay in the hot path and return at once
+    while disabled.
+    """
+
+    def __init__(self, capacity: int = TRACE_CAPACITY, path: str = TRACE_FILE, enabled: bool = False) -> None:
+        if capacity <= 0:
+            raise ValueError("Trace capacity must be positive")
+        self.capacity = capacity
+        self.path = path
+        self.enabled = False
+        # written into the file header (probe names, resolution, ...)
+        self.meta: Dict[str, object] = {}
+        # allocated on first enable
+        self._ring = bytearray()
+        self._written = 0
+        # probe colors of the last classified frame, copied into every check record
+        self._colors = bytearray(COLOR_BYTES)
+        if enabled:
+            self.enable()
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    def enable(self) -> None:
+        if not self._ring:
+            self._ring = bytearray(self.capacity * RECORD_SIZE)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def record(self, t: float, event: int, flags: int = 0, mask: int = 0, value: float = 0.0) -> None:
+        if not self.enabled:
+            return
+        off = (self._written % self.capacity) * RECORD_SIZE
+        _FIXED.pack_into(self._ring, off, t, event, flags, mask, value)
+        if event == EV_CHECK:
+            self._ring[off + _FIXED.size:off + RECORD_SIZE] = self._colors
+        self._written += 1
+
+    def sample_colors(self, frame: Frame, points: Sequence[Point]) -> None:
+        """Remember the probe colors of `frame` for the following check records."""
+        if not self.enabled:
+            return
+        colors = self._colors
+        for i, (x, y) in enumerate(points[:MAX_PROBES]):
+            px = frame.pixel(x, y)
+            if px is not None:
+                colors[3 * i:3 * i + 3] = bytes(px)
+
+    def clear_colors(self) -> None:
+        if self.enabled:
+            self._colors[:] = bytes(COLOR_BYTES)
+
+    def clear(self) -> None:
+        self._written = 0
+
+    def records(self) -> Iterator[TraceRecord]:
+        """Records in the ring, oldest first."""
+        n = len(self)
+        first = self._written - n
+        for k in range(first, first + n):
+            yield TraceRecord._make(_RECORD.unpack_from(self._ring, (k % self.capacity) * RECORD_SIZE))
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the ring to a trace file; returns the path, or None if it is empty."""
+        n = len(self)
+        if not n:
+            return None
+        path = path or self.path
+        meta = dict(self.meta, wall_time=time.time(), dropped=self._written - n)
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        start = (self._written % self.capacity) * RECORD_SIZE if self._written > self.capacity else 0
+        view = memoryview(self._ring)
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE, len(meta_bytes), n))
+                f.write(meta_bytes)
+                # unroll the ring: oldest records sit right after the write position
+                f.write(view[start:n * RECORD_SIZE])
+                f.write(view[:start])
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write trace {path}: {e}")
+            return None
+        finally:
+            view.release()
+        logger.info(f"Trace written: {path} ({n} records)")
+        return path
+
+
+class TraceFile:
+    """Read-only, memory-mapped view of a dumped trace."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                raise ValueError(f"{path}: not a trace file")
+            magic, version, record_size, meta_len, count = _HEADER.unpack(head)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a trace file")
+            if version != VERSION or record_size != RECORD_SIZE:
+                raise ValueError(f"{path}: unsupported trace version {version}")
+            self.meta = json.loads(f.read(meta_len).decode("utf-8"))
+            self._offset = _HEADER.size + meta_len
+            size = os.fstat(f.fileno()).st_size
+            # a truncated file still yields its complete records
+            self.count = min(count, (size - self._offset) // RECORD_SIZE)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> TraceRecord:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return TraceRecord._make(_RECORD.unpack_from(self._mm, self._offset + i * RECORD_SIZE))
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        mm, unpack, make = self._mm, _RECORD.unpack_from, TraceRecord._make
+        for off in range(self._offset, self._offset + self.count * RECORD_SIZE, RECORD_SIZE):
+            yield make(unpack(mm, off))
+
+    @property
+    def probes(self) -> List[str]:
+        return list(self.meta.get("probes", []))
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self) -> "TraceFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
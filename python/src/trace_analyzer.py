@@ -0,0 +1,218 @@
+"""Offline analysis of a binary decision trace (see src/trace.py).
+
+Reconstructs dialogue sessions, press timing distributions and detection
+flips, without re-running anything:
+
+    python -m src.trace_analyzer autoskip_trace.bin --flips
+"""
+import argparse
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from src.histogram import Histogram
+from src.trace import (CHECK_DIALOGUE, CHECK_FALLBACK, EV_CHECK, EV_PRESS, EV_SKIP, EVENT_NAMES, MAX_PROBES,
+                       PRESS_KEY_MASK, PRESS_KEYS, PRESS_SCHEDULED, TraceFile, TraceRecord)
+
+# dialogue sessions shorter than this are reported as detection flicker
+FLICKER_SECONDS = 0.5
+
+
+@dataclass
+class Session:
+    start: float
+    end: float
+    checks: int = 0
+    presses: int = 0
+    # still in dialogue when the trace ends
+    open: bool = False
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class Flip:
+    time: float
+    dialogue: bool
+    mask: int
+    prev_mask: int
+    # probes whose match result changed, and the colors they were read with
+    changed: Dict[str, Optional[tuple]] = field(default_factory=dict)
+
+
+@dataclass
+class TraceReport:
+    records: int
+    span: float
+    events: Dict[str, int]
+    sessions: List[Session]
+    flips: List[Flip]
+    probe_flips: Dict[str, int]
+    press_keys: Dict[str, int]
+    # between consecutive presses of one dialogue session
+    press_interval: Histogram
+    # timer lateness of presses the loop slept for
+    press_lateness: Histogram
+    first_press_delay: Histogram
+    fallback_checks: int
+    flicker: float = FLICKER_SECONDS
+
+    @property
+    def flickers(self) -> List[Session]:
+        return [s for s in self.sessions if not s.open and s.duration < self.flicker]
+
+    def to_dict(self) -> dict:
+        return {
+            "records": self.records,
+            "span": self.span,
+            "events": self.events,
+            "sessions": [dict(asdict(s), duration=s.duration) for s in self.sessions],
+            "flickers": len(self.flickers),
+            "flips": [asdict(f) for f in self.flips],
+            "probe_flips": self.probe_flips,
+            "press_keys": self.press_keys,
+            "press_interval": self.press_interval.to_dict(),
+            "press_lateness": self.press_lateness.to_dict(),
+            "first_press_delay": self.first_press_delay.to_dict(),
+            "fallback_checks": self.fallback_checks,
+        }
+
+
+def analyze(records, probes: Optional[List[str]] = None, flicker: float = FLICKER_SECONDS) -> TraceReport:
+    """One pass over trace records (a TraceFile or any iterable of TraceRecord)."""
+    probes = list(probes or [])
+    names = probes + [f"probe{i}" for i in range(len(probes), MAX_PROBES)]
+    events: Dict[str, int] = {}
+    sessions: List[Session] = []
+    flips: List[Flip] = []
+    probe_flips = dict.fromkeys(probes, 0)
+    press_keys: Dict[str, int] = {}
+    interval, lateness, first_press = Histogram(), Histogram(), Histogram()
+    fallback = 0
+    session: Optional[Session] = None
+    prev_mask: Optional[int] = None
+    last_press = 0.0
+    first = last = None
+    n = 0
+
+    rec: TraceRecord
+    for rec in records:
+        n += 1
+        t = rec.time
+        if first is None:
+            first = t
+        last = t
+        kind = EVENT_NAMES.get(rec.event, str(rec.event))
+        events[kind] = events.get(kind, 0) + 1
+
+        if rec.event == EV_CHECK:
+            if rec.flags & CHECK_FALLBACK:
+                fallback += 1
+            dialogue = bool(rec.flags & CHECK_DIALOGUE)
+            if prev_mask is not None and rec.mask != prev_mask:
+                changed = rec.mask ^ prev_mask
+                for i in range(MAX_PROBES):
+                    if changed >> i & 1:
+                        probe_flips[names[i]] = probe_flips.get(names[i], 0) + 1
+            if dialogue != (session is not None):
+                colors = None if rec.flags & CHECK_FALLBACK else rec.probe_colors(MAX_PROBES)
+                changed = rec.mask ^ (prev_mask or 0)
+                flips.append(Flip(t, dialogue, rec.mask, prev_mask or 0, {
+                    names[i]: colors[i] if colors else None for i in range(MAX_PROBES) if changed >> i & 1}))
+                if dialogue:
+                    session = Session(t, t)
+                    sessions.append(session)
+                else:
+                    session.end = t
+                    session = None
+            prev_mask = rec.mask
+            if session is not None:
+                session.checks += 1
+                session.end = t
+        elif rec.event == EV_PRESS:
+            key = PRESS_KEYS.get(rec.flags & PRESS_KEY_MASK, str(rec.flags))
+            press_keys[key] = press_keys.get(key, 0) + 1
+            if rec.flags & PRESS_SCHEDULED:
+                lateness.add(rec.value)
+            if session is not None:
+                if session.presses:
+                    interval.add(t - last_press)
+                else:
+                    first_press.add(t - session.start)
+                session.presses += 1
+                session.end = t
+            last_press = t
+        elif rec.event == EV_SKIP:
+            last_press = t
+
+    if session is not None:
+        session.open = True
+    return TraceReport(
+        records=n,
+        span=(last - first) if n else 0.0,
+        events=events,
+        sessions=sessions,
+        flips=flips,
+        probe_flips=probe_flips,
+        press_keys=press_keys,
+        press_interval=interval,
+        press_lateness=lateness,
+        first_press_delay=first_press,
+        fallback_checks=fallback,
+        flicker=flicker,
+    )
+
+
+def analyze_file(path: str, flicker: float = FLICKER_SECONDS) -> TraceReport:
+    with TraceFile(path) as trace:
+        return analyze(trace, trace.probes, flicker)
+
+
+def _print_report(report: TraceReport, show_flips: bool, show_sessions: bool) -> None:
+    durations = [s.duration for s in report.sessions]
+    print(f"{'records':>20}: {report.records} over {report.span:.1f}s")
+    for kind, count in sorted(report.events.items()):
+        print(f"{kind + ' events':>20}: {count}")
+    print(f"{'dialogue sessions':>20}: {len(durations)}"
+          + (f" (mean {sum(durations) / len(durations):.1f}s, max {max(durations):.1f}s)" if durations else ""))
+    print(f"{'without presses':>20}: {sum(1 for s in report.sessions if not s.presses)}")
+    print(f"{'flicker (<%.1fs)' % report.flicker:>20}: {len(report.flickers)}")
+    print(f"{'fallback checks':>20}: {report.fallback_checks}")
+    print(f"{'first press delay':>20}: {report.first_press_delay.summary()}")
+    print(f"{'press interval':>20}: {report.press_interval.summary()}")
+    print(f"{'press lateness':>20}: {report.press_lateness.summary()}")
+    print(f"{'press keys':>20}: " + ", ".join(f"{k}={v}" for k, v in sorted(report.press_keys.items())))
+    print(f"{'probe flips':>20}: " + ", ".join(f"{k}={v}" for k, v in report.probe_flips.items() if v))
+    start = report.sessions[0].start if report.sessions else 0.0
+    if show_sessions:
+        for s in report.sessions:
+            print(f"  session +{s.start - start:9.2f}s {s.duration:7.2f}s checks={s.checks} presses={s.presses}"
+                  + (" (open)" if s.open else ""))
+    if show_flips:
+        for f in report.flips:
+            changed = ", ".join(f"{name}{'' if rgb is None else rgb}" for name, rgb in f.changed.items())
+            print(f"  flip +{f.time - start:9.2f}s {'DETECTED' if f.dialogue else 'ENDED':8} "
+                  f"mask {f.prev_mask:#06x} -> {f.mask:#06x} {changed}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Analyze a binary decision trace written with F10")
+    parser.add_argument("path", help="Trace file (autoskip_trace.bin)")
+    parser.add_argument("--flicker", type=float, default=FLICKER_SECONDS,
+                        help="Report dialogue sessions shorter than this many seconds as flicker")
+    parser.add_argument("--flips", action="store_true", help="List every detection flip with probe colors")
+    parser.add_argument("--sessions", action="store_true", help="List every dialogue session")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = analyze_file(args.path, args.flicker)
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        _print_report(report, args.flips, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
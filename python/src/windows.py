@@ -0,0 +1,323 @@
+"""Registry of game windows for running several clients side by side.
+
+Probe coordinates normally cover the whole screen of one client. With a
+WindowRegistry every window whose title matches is enumerated. Each one gets
+the probe table for its client size, moved to where its client area sits
+on the screen. All windows share one capture backend: each state check grabs
+the probes of a single window, picked by the policy:
+
+    round_robin  windows take turns
+    priority     the foreground window (the only one that receives key
+                 presses) every other check, background windows share the rest
+
+Background windows are still watched so that switching to a client that is
+already in a dialogue starts skipping without waiting for a new check.
+How detection latency grows with the number of windows:
+
+    python -m src.windows bench --windows 1 2 4 8
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+from random import Random
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.capture import MemoryFrameSource, PixelSampler
+from src.probes import ProbeTable
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("round_robin", "priority")
+# re-enumerate windows this often (seconds); focusing an unknown window also triggers it
+REFRESH_INTERVAL = 2.0
+
+Rect = Tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class GameWindow:
+    hwnd: int
+    title: str
+    # client area in screen coordinates: left, top, width, height
+    rect: Rect
+
+
+class WindowProvider:
+    """Lists the top-level windows with their client areas."""
+
+    def windows(self) -> List[GameWindow]:
+        raise NotImplementedError
+
+
+class Win32WindowProvider(WindowProvider):
+    """Visible top-level windows via EnumWindows; only imported once something needs the platform."""
+
+    def __init__(self) -> None:
+        import win32gui
+        self._gui = win32gui
+
+    def windows(self) -> List[GameWindow]:
+        gui = self._gui
+        found: List[GameWindow] = []
+
+        def on_window(hwnd, _):
+            if not gui.IsWindowVisible(hwnd) or gui.IsIconic(hwnd):
+                return True
+            title = gui.GetWindowText(hwnd)
+            if title:
+                _, _, w, h = gui.GetClientRect(hwnd)
+                left, top = gui.ClientToScreen(hwnd, (0, 0))
+                found.append(GameWindow(hwnd, title, (left, top, w, h)))
+            return True
+
+        gui.EnumWindows(on_window, None)
+        return found
+
+
+class FakeWindowProvider(WindowProvider):
+    """Scriptable windows for tests and the benchmark."""
+
+    def __init__(self) -> None:
+        self.open: Dict[int, GameWindow] = {}
+        self.enumerations = 0
+
+    def add(self, hwnd: int, title: str, rect: Rect) -> None:
+        self.open[hwnd] = GameWindow(hwnd, title, rect)
+
+    def move(self, hwnd: int, rect: Rect) -> None:
+        self.open[hwnd] = GameWindow(hwnd, self.open[hwnd].title, rect)
+
+    def remove(self, hwnd: int) -> None:
+        self.open.pop(hwnd, None)
+
+    def windows(self) -> List[GameWindow]:
+        self.enumerations += 1
+        return list(self.open.values())
+
+
+def default_table(width: int, height: int) -> ProbeTable:
+    """Probe table for a client area of this size, at the client's own coordinates."""
+    from src.autoskip_dialogue import ScreenConfig
+
+    return ScreenConfig(width, height).probe_table()
+
+
+class WindowState:
+    """Detection state of one registered window."""
+
+    def __init__(self, window: GameWindow, table: ProbeTable) -> None:
+        self.window = window
+        self.table = table
+        self.mask = 0
+        self.in_dialogue = False
+        self.checks = 0
+        self.last_check: Optional[float] = None
+        # times the dialogue verdict changed, and whether the last check changed it
+        self.flips = 0
+        self.flipped = False
+
+    @property
+    def hwnd(self) -> int:
+        return self.window.hwnd
+
+
+class WindowRegistry:
+    """Matching game windows and the order in which their probes are checked."""
+
+    def __init__(self, window_title: str, provider: WindowProvider, policy: str = "round_robin",
+                 table_for: Callable[[int, int], ProbeTable] = default_table,
+                 refresh_interval: float = REFRESH_INTERVAL) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown window policy {policy!r}, expected one of {POLICIES}")
+        self._needle = window_title.lower()
+        self.provider = provider
+        self.policy = policy
+        self.refresh_interval = refresh_interval
+        self._table_for = table_for
+        # client-size tables are shared by same-sized windows
+        self._tables: Dict[Tuple[int, int], ProbeTable] = {}
+        self.states: Dict[int, WindowState] = {}
+        self._order: List[int] = []
+        self._turn = 0
+        self._slot = 0
+        self._refreshed: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def get(self, hwnd: int) -> Optional[WindowState]:
+        return self.states.get(hwnd)
+
+    def refresh(self, now: float) -> None:
+        """Re-enumerate the windows; keep the state of those still open at the same place."""
+        self._refreshed = now
+        seen = set()
+        for window in self.provider.windows():
+            left, top, w, h = window.rect
+            if self._needle not in window.title.lower() or w <= 0 or h <= 0:
+                continue
+            seen.add(window.hwnd)
+            state = self.states.get(window.hwnd)
+            if state is not None and state.window.rect == window.rect:
+                continue
+            base = self._tables.get((w, h))
+            if base is None:
+                base = self._tables[w, h] = self._table_for(w, h)
+            table = base.translated(left, top)
+            if state is None:
+                self.states[window.hwnd] = WindowState(window, table)
+                logger.info(f"Game window {window.hwnd:#x}: {w}x{h} at ({left}, {top})")
+            else:
+                state.window, state.table = window, table
+                state.in_dialogue = False
+        for hwnd in [h for h in self.states if h not in seen]:
+            del self.states[hwnd]
+            logger.info(f"Game window {hwnd:#x} closed")
+        self._order = list(self.states)
+
+    def set_title(self, window_title: str) -> None:
+        """Match windows by a new title from the next check on."""
+        self._needle = window_title.lower()
+        self._refreshed = None
+
+    def refresh_due(self, now: float) -> bool:
+        return self._refreshed is None or now - self._refreshed >= self.refresh_interval
+
+    def next_window(self, foreground: Optional[int] = None) -> Optional[WindowState]:
+        """The window whose probes the next check should grab."""
+        order = self._order
+        if not order:
+            return None
+        self._slot += 1
+        if self.policy == "priority" and foreground in self.states:
+            if len(order) == 1 or self._slot % 2:
+                return self.states[foreground]
+            order = [h for h in order if h != foreground]
+        self._turn = (self._turn + 1) % len(order)
+        return self.states[order[self._turn]]
+
+    def check(self, sampler: PixelSampler, now: float, foreground: Optional[int] = None) -> Optional[WindowState]:
+        """Grab and classify the next window's probes; returns its state (None without windows)."""
+        state = self.next_window(foreground)
+        if state is None:
+            return None
+        table = state.table
+        if sampler.snapshot(table.points):
+            mask = table.match_mask(sampler.frame)
+            sampler.release()
+        else:
+            mask = table.match_mask_from(sampler.get)
+        dialogue = table.test("dialogue", mask)
+        state.flipped = dialogue != state.in_dialogue
+        state.flips += state.flipped
+        state.mask, state.in_dialogue = mask, dialogue
+        state.checks += 1
+        state.last_check = now
+        return state
+
+
+# --- benchmark: simulated desktop with tiled clients ---
+
+BENCH_CLIENT = (640, 360)
+BENCH_BACKGROUND = (40, 40, 40)
+
+
+@dataclass
+class WindowBench:
+    windows: int
+    policy: str
+    foreground_mean: float
+    foreground_p95: float
+    background_mean: float
+    background_p95: float
+    check_us: float
+
+    def line(self) -> str:
+        return (f"{self.windows:>7} {self.policy:>12} {self.foreground_mean * 1000:>9.0f} "
+                f"{self.foreground_p95 * 1000:>8.0f} {self.background_mean * 1000:>9.0f} "
+                f"{self.background_p95 * 1000:>8.0f} {self.check_us:>9.1f}")
+
+
+BENCH_HEADER = f"{'windows':>7} {'policy':>12} {'fg ms':>9} {'fg p95':>8} {'bg ms':>9} {'bg p95':>8} {'check us':>9}"
+
+
+def _p95(values: List[float]) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+def bench(count: int, policy: str, seconds: float = 600.0, check_interval: float = 0.15,
+          seed: int = 0) -> WindowBench:
+    """Detection latency per window when `count` tiled clients share one check every `check_interval`.
+
+    Each client enters a dialogue every 20 s on average and stays in it for
+    a few seconds; latency is from the dialogue appearing to its first check.
+    Window 1 is in the foreground.
+    """
+    rand = Random(seed)
+    cw, ch = BENCH_CLIENT
+    cols = min(count, 4)
+    rows = (count + cols - 1) // cols
+    screen = MemoryFrameSource(cols * cw, rows * ch, BENCH_BACKGROUND)
+    provider = FakeWindowProvider()
+    for i in range(count):
+        provider.add(i + 1, "Genshin Impact", (i % cols * cw, i // cols * ch, cw, ch))
+    registry = WindowRegistry("Genshin Impact", provider, policy)
+    registry.refresh(0.0)
+    sampler = PixelSampler(screen)
+    probe = {hwnd: next(p for p in state.table.probes if p.name == "playing")
+             for hwnd, state in registry.states.items()}
+    # per window: next dialogue start, current dialogue end (None while idle)
+    starts = {hwnd: rand.expovariate(1 / 20.0) for hwnd in probe}
+    ends: Dict[int, Optional[float]] = dict.fromkeys(probe)
+    latency: Dict[int, List[float]] = {hwnd: [] for hwnd in probe}
+    pending: Dict[int, Optional[float]] = dict.fromkeys(probe)
+    spent, checks = 0.0, 0
+    now = 0.0
+    while now < seconds:
+        for hwnd, p in probe.items():
+            if ends[hwnd] is None and now >= starts[hwnd]:
+                ends[hwnd] = now + rand.uniform(2.0, 8.0)
+                pending[hwnd] = starts[hwnd]
+                screen.set_pixel(*p.pos, p.color)
+            elif ends[hwnd] is not None and now >= ends[hwnd]:
+                starts[hwnd] = now + rand.expovariate(1 / 20.0)
+                ends[hwnd] = pending[hwnd] = None
+                screen.set_pixel(*p.pos, BENCH_BACKGROUND)
+        t0 = perf_counter()
+        state = registry.check(sampler, now, foreground=1)
+        spent += perf_counter() - t0
+        checks += 1
+        if state.in_dialogue and pending[state.hwnd] is not None:
+            latency[state.hwnd].append(now - pending[state.hwnd])
+            pending[state.hwnd] = None
+        now += check_interval
+    fg = latency[1]
+    bg = [v for hwnd, values in latency.items() if hwnd != 1 for v in values]
+    return WindowBench(count, policy, sum(fg) / len(fg) if fg else 0.0, _p95(fg),
+                       sum(bg) / len(bg) if bg else 0.0, _p95(bg), spent / checks * 1e6)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Multi-window detection tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    run = sub.add_parser("bench", help="Detection latency per window against the number of windows")
+    run.add_argument("--windows", type=int, nargs="+", default=[1, 2, 4, 8], help="Window counts to simulate")
+    run.add_argument("--policy", choices=POLICIES, nargs="+", default=list(POLICIES))
+    run.add_argument("--seconds", type=float, default=600.0, help="Simulated time per run")
+    run.add_argument("--check-interval", type=float, default=0.15, help="Seconds between state checks")
+    run.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(BENCH_HEADER)
+    for policy in args.policy:
+        for count in args.windows:
+            print(bench(count, policy, args.seconds, args.check_interval, args.seed).line())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
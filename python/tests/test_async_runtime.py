@@ -0,0 +1,150 @@
+import asyncio
+import contextlib
+import io
+import threading
+import unittest
+from random import Random
+
+from src.async_runtime import AsyncRuntime, VirtualEventLoop
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend, Button, Key
+from src.config_watch import plan_reload
+from src.focus import FakeFocusSource
+from src.simulation import Simulation, Timeline
+
+
+def f_presses(runtime):
+    return sum(1 for _, key in runtime.remapper.sender.presses if key == "f")
+
+
+class TestVirtualEventLoop(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualEventLoop()
+        self.addCleanup(self.loop.close)
+
+    def test_sleep_advances_virtual_time(self):
+        self.loop.run_until_complete(asyncio.sleep(3600))
+        self.assertAlmostEqual(self.loop.time(), 3600)
+
+    def test_threadsafe_wakeup(self):
+        ev = asyncio.Event()
+
+        async def waiter():
+            threading.Thread(target=self.loop.call_soon_threadsafe, args=(ev.set,)).start()
+            await ev.wait()
+
+        self.loop.run_until_complete(waiter())
+        self.assertEqual(self.loop.time(), 0)
+
+
+class TestAsyncRuntime(unittest.TestCase):
+    def setUp(self):
+        self.focus = FakeFocusSource(1, "Genshin Impact")
+        self.focus.titles[2] = "Desktop"
+        skipper = AutoSkipper(ScreenConfig(1920, 1080), None, Random(0), focus_source=self.focus,
+                              backend=HeadlessBackend())
+        self.runtime = AsyncRuntime(skipper)
+
+    def _drive(self, events, until=10.0):
+        loop = VirtualEventLoop()
+        for when, fn in events:
+            loop.call_at(when, fn)
+        loop.call_at(until, self.runtime.stop)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                loop.run_until_complete(self.runtime.run())
+        finally:
+            loop.close()
+
+    def _click(self, button):
+        return lambda: self.runtime.post_click(0, 0, button, True)
+
+    def test_burst_runs_for_its_duration(self):
+        self._drive([(1.0, self._click(Button.x2))])
+        self.assertEqual(self.runtime.bursts, 1)
+        self.assertTrue(4.0 / 0.18 <= f_presses(self.runtime) <= 4.0 / 0.08 + 1)
+
+    def test_overlapping_clicks_do_not_stack(self):
+        self._drive([(1.0, self._click(Button.x2)), (2.0, self._click(Button.x2))])
+        self.assertEqual((self.runtime.bursts, self.runtime.coalesced), (1, 1))
+
+    def test_click_during_burst_extends_it(self):
+        times = []
+        self.runtime.remapper.press_f = lambda: times.append(self.runtime._loop.time())
+        self._drive([(1.0, self._click(Button.x2)), (4.0, self._click(Button.x2))])
+        # pressing from 1.0 until 4.0 + 4.0
+        self.assertEqual(times[0], 1.0)
+        self.assertGreater(times[-1], 7.8)
+        self.assertLess(times[-1], 8.0)
+        self.assertTrue(all(0.08 <= b - a <= 0.18 for a, b in zip(times, times[1:])))
+
+    def test_pause_cancels_burst(self):
+        self._drive([(0.5, lambda: self.runtime.post_key(Key.f8)), (1.0, self._click(Button.x2)),
+                     (1.5, lambda: self.runtime.post_key(Key.f9))])
+        self.assertEqual(self.runtime.skipper.status, "pause")
+        self.assertLessEqual(f_presses(self.runtime), 0.5 / 0.08 + 1)
+
+    def test_focus_loss_cancels_burst(self):
+        self._drive([(1.0, self._click(Button.x2)), (2.0, lambda: self.focus.switch(2))])
+        self.assertLessEqual(f_presses(self.runtime), 1.0 / 0.08 + 1)
+
+    def test_interact_remap(self):
+        self._drive([(1.0, self._click(Button.x1))], until=2.0)
+        self.assertEqual([key for _, key in self.runtime.remapper.sender.presses], ["t"])
+
+    def test_exit_hotkey(self):
+        self._drive([(1.0, lambda: self.runtime.post_key(Key.f12))], until=3600.0)
+        self.assertTrue(self.runtime.skipper._stop)
+        self.assertLess(self.runtime.wakeups, 10)
+
+    def _step_times(self):
+        times = []
+        step = self.runtime.skipper.step
+        self.runtime.skipper.step = lambda now: (times.append(self.runtime._loop.time()), step(now))[1]
+        return times
+
+    def test_hotkey_wakes_the_loop(self):
+        times = self._step_times()
+        self._drive([(1.2, lambda: self.runtime.post_key(Key.f8))], until=2.0)
+        # at once, not at the paused loop's next 0.5 s poll
+        self.assertIn(1.2, times)
+
+    def test_focus_gain_wakes_the_loop(self):
+        times = self._step_times()
+        self._drive([(0.0, lambda: self.focus.switch(2)), (1.2, lambda: self.focus.switch(1))], until=2.0)
+        self.assertIn(1.2, times)
+
+    def test_reload_wakes_the_loop(self):
+        skipper = self.runtime.skipper
+        new = ScreenConfig.from_env({"WIDTH": "2560", "HEIGHT": "1440"})
+        reload = plan_reload(skipper.config, new, skipper._probe_table, Random(0))
+        applied = []
+        apply = skipper._apply_reload
+        skipper._apply_reload = lambda: (applied.append(self.runtime._loop.time()), apply())
+
+        # handed over from the watcher's thread while the paused loop sleeps
+        def request():
+            t = threading.Thread(target=skipper.request_reload, args=(reload,))
+            t.start()
+            t.join()
+
+        self._drive([(5.2, request)], until=10.0)
+        # at once, not at the paused loop's next 0.5 s poll
+        self.assertEqual(applied, [5.2])
+        self.assertEqual(skipper.config.WIDTH, 2560)
+        self.assertEqual(skipper.wake, skipper.wake_event.set)
+
+
+class TestAsyncSimulation(unittest.TestCase):
+    def test_matches_thread_runtime(self):
+        timeline = Timeline.random(Random(3), 300)
+        threaded = Simulation(timeline, seed=3)
+        threaded.run()
+        asyncio_sim = Simulation(timeline, seed=3)
+        report = asyncio_sim.run_async()
+        self.assertEqual(asyncio_sim.sender.presses, threaded.sender.presses)
+        self.assertEqual(report.missed_dialogues, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,72 +1,34 @@
+import logging
+import os
+import sys
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
-from pynput.mouse import Button
-import ctypes
+
 from src.autoskip_dialogue import ScreenConfig, LoggerManager, PixelSampler, InputRemapper, AutoSkipper
+from src.backends import set_backend
 
-class TestScreenConfig(unittest.TestCase):
-    @patch('src.autoskip_dialogue.GetSystemMetrics')
-    @patch('src.autoskip_dialogue.os.getenv')
-    def test_load_with_env(self, mock_getenv, mock_get_system_metrics):
-        mock_get_system_metrics.side_effect = [1920, 1080]
-        # Mock env vars: WIDTH, HEIGHT, WINDOW_TITLE
-        def getenv_side_effect(key, default=None):
-            if key == "WIDTH": return "1920"
-            if key == "HEIGHT": return "1080"
-            if key == "WINDOW_TITLE": return "Genshin Impact"
-            return default
-        mock_getenv.side_effect = getenv_side_effect
-        
-        config = ScreenConfig.load(interactive=False)
-        self.assertEqual(config.WIDTH, 1920)
-        self.assertEqual(config.HEIGHT, 1080)
-        self.assertEqual(config.WINDOW_TITLE, "Genshin Impact")
+# tests that patch src.backends.win32 need pywin32 and pynput; the rest run headless
+needs_win32 = unittest.skipUnless(sys.platform == "win32", "patches src.backends.win32 (Windows only)")
+_env = patch.dict("os.environ", {} if sys.platform == "win32" else {"GDA_BACKEND": "headless"})
 
-    @patch('src.autoskip_dialogue.GetSystemMetrics')
-    def test_load_interactive(self, mock_get_system_metrics):
-        mock_get_system_metrics.side_effect = [1920, 1080]
-        with patch('builtins.input', side_effect=['y']):
-            config = ScreenConfig.load(interactive=True)
-        self.assertEqual(config.WIDTH, 1920)
-        self.assertEqual(config.HEIGHT, 1080)
 
+def setUpModule():
+    _env.start()
+    set_backend(None)
 
-class TestLoggerManager(unittest.TestCase):
-    @patch('src.autoskip_dialogue.logging')
-    def test_toggle_file_logging(self, mock_logging):
-        logger_mgr = LoggerManager()
-        logger_mgr.toggle_file_logging()
-        self.assertIsNotNone(logger_mgr.file_handler)
 
-        logger_mgr.toggle_file_logging()
-        self.assertIsNone(logger_mgr.file_handler)
+def tearDownModule():
+    _env.stop()
+    set_backend(None)
 
 
-class TestPixelSampler(unittest.TestCase):
-    def setUp(self):
-        # Patch ctypes.windll.gdi32 and user32
-        self.gdi32_patcher = patch('ctypes.windll.gdi32')
-        self.user32_patcher = patch('ctypes.windll.user32')
-        self.mock_gdi32 = self.gdi32_patcher.start()
-        self.mock_user32 = self.user32_patcher.start()
-        
-    def tearDown(self):
-        self.gdi32_patcher.stop()
-        self.user32_patcher.stop()
-
-    def test_get_pixel(self):
-        sampler = PixelSampler()
-        # Mock GetPixel to return white (0x00FFFFFF)
-        # COLORREF is 0x00bbggrr. White is 0x00FFFFFF.
-        self.mock_gdi32.GetPixel.return_value = 0x00FFFFFF
-        
-        color = sampler.get(100, 100)
-        self.assertEqual(color, (255, 255, 255))
-        self.mock_gdi32.GetPixel.assert_called()
-
-    def test_colors_match(self):
-        c1 = (255, 255, 255)
-        c2 = (250, 255, 255)
+class TestScreenConfig(unittest.TestCase):
+    @needs_win32
+    @patch('src.backends.win32.GetSystemMetrics')
+    @patch('src.autoskip_dialogue.os.getenv')
+    def test_load_with_env(self, mock_getenv, mock_get_system_metrics):
+        mock_get_system_metrics.side_effect = [1920, 1080]
         # Mock env vars: WIDTH, HEIGHT, WINDOW_TITLE
         def getenv_side_effect(key, default=None):
             if key == "WIDTH": return "1920"
@@ -80,7 +42,8 @@ class TestPixelSampler(unittest.TestCase):
         self.assertEqual(config.HEIGHT, 1080)
         self.assertEqual(config.WINDOW_TITLE, "Genshin Impact")
 
-    @patch('src.autoskip_dialogue.GetSystemMetrics')
+    @needs_win32
+    @patch('src.backends.win32.GetSystemMetrics')
     def test_load_interactive(self, mock_get_system_metrics):
         mock_get_system_metrics.side_effect = [1920, 1080]
         with patch('builtins.input', side_effect=['y']):
@@ -90,16 +53,31 @@ class TestPixelSampler(unittest.TestCase):
 
 
 class TestLoggerManager(unittest.TestCase):
-    @patch('src.autoskip_dialogue.logging')
-    def test_toggle_file_logging(self, mock_logging):
+    def test_toggle_file_logging(self):
+        # the log file goes to the working directory, and LoggerManager replaces the root handlers
+        root = logging.getLogger()
+        saved = root.handlers[:], root.level
+        cwd = os.getcwd()
+        tmp = tempfile.TemporaryDirectory()
+        os.chdir(tmp.name)
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, cwd)
         logger_mgr = LoggerManager()
-        logger_mgr.toggle_file_logging()
-        self.assertIsNotNone(logger_mgr.file_handler)
+        try:
+            logger_mgr.toggle_file_logging()
+            self.assertIsNotNone(logger_mgr.file_handler)
+            self.assertTrue(os.path.exists("autoskip_dialogue.log"))
 
-        logger_mgr.toggle_file_logging()
-        self.assertIsNone(logger_mgr.file_handler)
+            logger_mgr.toggle_file_logging()
+            self.assertIsNone(logger_mgr.file_handler)
+        finally:
+            logger_mgr.close()
+            handlers, level = saved
+            root.handlers[:] = handlers
+            root.setLevel(level)
 
 
+@needs_win32
 class TestPixelSampler(unittest.TestCase):
     def setUp(self):
         # Patch ctypes.windll.gdi32 and user32
@@ -122,6 +100,8 @@ class TestPixelSampler(unittest.TestCase):
         self.assertEqual(color, (255, 255, 255))
         self.mock_gdi32.GetPixel.assert_called()
 
+
+class TestColorsMatch(unittest.TestCase):
     def test_colors_match(self):
         c1 = (255, 255, 255)
         c2 = (250, 255, 255)
@@ -132,12 +112,14 @@ class TestPixelSampler(unittest.TestCase):
 
 
 class TestInputRemapper(unittest.TestCase):
-    @patch('src.autoskip_dialogue.KeyboardController')
-    def test_on_click(self, mock_keyboard_controller):
+    @needs_win32
+    @patch('src.backends.win32.SendInputSender')
+    def test_on_click(self, mock_sender):
+        from pynput.mouse import Button
         mock_is_genshin_active = MagicMock(return_value=True)
         remapper = InputRemapper(mock_is_genshin_active, MagicMock())
         remapper.on_click(0, 0, Button.x1, True)
-        mock_keyboard_controller().press.assert_called_with('t')
+        mock_sender().tap.assert_called_with('t')
 
 
 class TestAutoSkipper(unittest.TestCase):
@@ -156,15 +138,17 @@ class TestAutoSkipper(unittest.TestCase):
         
         self.skipper = AutoSkipper(self.mock_config, self.mock_logger, self.mock_rand)
 
-    @patch('src.autoskip_dialogue.GetForegroundWindow')
-    @patch('src.autoskip_dialogue.GetWindowText')
+    @needs_win32
+    @patch('src.backends.win32.GetForegroundWindow')
+    @patch('src.backends.win32.GetWindowText')
     def test_is_genshin_active(self, mock_get_window_text, mock_get_foreground):
         mock_get_foreground.return_value = 123
         mock_get_window_text.return_value = "Genshin Impact"
         self.assertTrue(self.skipper.is_genshin_active())
 
-    @patch('src.autoskip_dialogue.GetForegroundWindow')
-    @patch('src.autoskip_dialogue.GetWindowText')
+    @needs_win32
+    @patch('src.backends.win32.GetForegroundWindow')
+    @patch('src.backends.win32.GetWindowText')
     def test_is_not_genshin_active(self, mock_get_window_text, mock_get_foreground):
         mock_get_foreground.return_value = 123
         mock_get_window_text.return_value = "Other Game"
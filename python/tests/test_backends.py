@@ -0,0 +1,66 @@
+import sys
+import unittest
+from random import Random
+from unittest.mock import patch
+
+from src import backends
+from src.autoskip_dialogue import AutoSkipper, InputRemapper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend, Button, Key
+from src.capture import MemoryFrameSource
+from src.input_sender import RecordingSender
+
+
+class TestBackendSelection(unittest.TestCase):
+    def setUp(self):
+        backends.set_backend(None)
+        self.addCleanup(backends.set_backend, None)
+
+    def test_falls_back_to_headless_without_windows_apis(self):
+        with patch.dict(sys.modules, {"win32api": None}), patch.dict("os.environ", {"GDA_BACKEND": ""}):
+            backend = backends.get_backend()
+        self.assertEqual(backend.name, "headless")
+        self.assertIs(backends.get_backend(), backend)
+
+    def test_env_forces_backend(self):
+        with patch.dict("os.environ", {"GDA_BACKEND": "headless"}):
+            self.assertEqual(backends.get_backend().name, "headless")
+
+    def test_unknown_backend(self):
+        with patch.dict("os.environ", {"GDA_BACKEND": "x11"}):
+            with self.assertRaises(ValueError):
+                backends.get_backend()
+
+
+class TestHeadlessBackend(unittest.TestCase):
+    def setUp(self):
+        self.backend = HeadlessBackend(1280, 720)
+        backends.set_backend(self.backend)
+        self.addCleanup(backends.set_backend, None)
+
+    def test_components(self):
+        self.assertEqual(self.backend.screen_size(), (1280, 720))
+        self.assertIsInstance(self.backend.capture_backend(), MemoryFrameSource)
+        self.assertEqual(self.backend.focus_source().foreground(), 0)
+        listener = self.backend.keyboard_listener(lambda key: None)
+        listener.start()
+        listener.stop()
+        listener.join()
+
+    def test_autoskipper_uses_backend(self):
+        skipper = AutoSkipper(ScreenConfig(1280, 720), None, Random(0))
+        self.assertIsInstance(skipper.pixel_sampler.backend, MemoryFrameSource)
+        self.assertFalse(skipper.is_genshin_active())
+        skipper.on_key(Key.f8)
+        self.assertEqual(skipper.status, "run")
+        skipper._perform_press(0.0)
+        self.assertIn(skipper.sender.batches[0][1], (("f",), ("f", "f"), ("space",)))
+
+    def test_remapper_buttons(self):
+        remapper = InputRemapper(lambda: True, Random(0))
+        self.assertIsInstance(remapper.sender, RecordingSender)
+        remapper.on_click(0, 0, Button.x1, True)
+        self.assertEqual([keys for _, keys in remapper.sender.batches], [("t",)])
+
+
+if __name__ == '__main__':
+    unittest.main()
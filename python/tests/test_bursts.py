@@ -0,0 +1,104 @@
+import contextlib
+import io
+import time
+import unittest
+from random import Random
+
+from src.autoskip_dialogue import SPAM_DURATION, AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend, Key
+from src.bursts import BurstWorker
+from src.clock import VirtualClock
+from src.focus import FakeFocusSource
+
+
+class TestBurstWorker(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.times = []
+        self.active = True
+        self.worker = BurstWorker(lambda: self.times.append(self.clock.now()), lambda: self.active,
+                                  Random(1), self.clock)
+
+    def _burst(self, duration):
+        self.assertTrue(self.worker.extend(duration))
+        self.worker.run_burst()
+
+    def test_presses_for_duration(self):
+        self._burst(2.0)
+        self.assertEqual(self.times[0], 0.0)
+        self.assertLess(self.times[-1], 2.0)
+        gaps = [b - a for a, b in zip(self.times, self.times[1:])]
+        self.assertTrue(all(0.08 <= g <= 0.18 for g in gaps))
+        self.assertEqual(self.worker.presses, len(self.times))
+
+    def test_deterministic_for_seed(self):
+        self._burst(2.0)
+        again = []
+        worker = BurstWorker(lambda: again.append(1), lambda: True, Random(1), VirtualClock())
+        worker.extend(2.0)
+        worker.run_burst()
+        self.assertEqual(len(again), len(self.times))
+
+    def test_request_during_burst_extends_it(self):
+        self.clock.call_at(1.5, lambda: self.assertFalse(self.worker.request(2.0)))
+        self._burst(2.0)
+        self.assertGreater(self.times[-1], 3.0)
+        self.assertLess(self.times[-1], 3.5)
+        self.assertEqual((self.worker.bursts, self.worker.coalesced), (1, 1))
+
+    def test_cancel(self):
+        self.clock.call_at(1.0, self.worker.cancel)
+        self._burst(4.0)
+        self.assertLess(self.times[-1], 1.0)
+        self.assertEqual(self.clock.now(), 1.0)
+        self.assertFalse(self.worker.running)
+        self.assertEqual(self.worker.cancelled, 1)
+
+    def test_no_presses_while_inactive(self):
+        self.active = False
+        self._burst(1.0)
+        self.assertEqual(self.times, [])
+
+    def test_thread_is_reused(self):
+        presses = []
+        worker = BurstWorker(lambda: presses.append(1), lambda: True, Random(0), interval=(0.001, 0.002))
+        self.addCleanup(worker.close)
+        self.assertTrue(worker.request(0.02))
+        thread = worker._thread
+        deadline = time.monotonic() + 2.0
+        while worker.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.01)
+        self.assertTrue(worker.request(0.02))
+        self.assertIs(worker._thread, thread)
+        self.assertTrue(thread.is_alive())
+        self.assertGreater(len(presses), 0)
+
+
+class TestRemapperBursts(unittest.TestCase):
+    def setUp(self):
+        self.focus = FakeFocusSource(1, "Genshin Impact")
+        self.skipper = AutoSkipper(ScreenConfig(1920, 1080), None, Random(0), focus_source=self.focus,
+                                   clock=VirtualClock(), backend=HeadlessBackend())
+        self.skipper.focus.start()
+        self.bursts = self.skipper.input_remapper.bursts
+        self.bursts.extend(4.0)
+
+    def test_pause_cancels_burst(self):
+        self.skipper.on_key(Key.f9)
+        self.assertFalse(self.bursts.running)
+
+    def test_focus_loss_cancels_burst(self):
+        self.focus.switch(2, "Desktop")
+        self.assertFalse(self.bursts.running)
+        self.assertEqual(self.bursts.cancelled, 1)
+
+    def test_instructions_show_burst_length(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.skipper._print_instructions()
+        self.assertIn(f"Mouse5: {SPAM_DURATION:g}s rapid F burst", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from src.autoskip_dialogue import DEFAULT_GEOMETRY, PLAYING_ICON_COLOR, WHITE, ProbeGeometry, ScreenConfig
+from src.calibration import calibrate, candidates, iter_corpus, main
+from src.capture import MemoryFrameSource, read_ppm_pixels
+from src.layouts import LayoutTable
+
+BACKGROUND = (30, 30, 30)
+# the corpus was "captured" with a playing icon 2px right of the shipped constant
+TRUE_GEOMETRY = ProbeGeometry(playing_x=(86, 230))
+# icon colors come out 12 off (needs tolerance >= 12); idle frames show a look-alike 24 off
+ICON = tuple(c - 12 for c in PLAYING_ICON_COLOR)
+LOOKALIKE = tuple(c - 24 for c in PLAYING_ICON_COLOR)
+
+
+def write_corpus(directory, resolutions=((1920, 1080), (2560, 1080))):
+    for w, h in resolutions:
+        cfg = ScreenConfig(w, h, use_layouts=False, geometry=TRUE_GEOMETRY)
+        x, low_y, _ = cfg.DIALOGUE_ICON
+        frames = {
+            "playing": {cfg.PLAYING_ICON: ICON},
+            "choice": {(x, low_y): WHITE},
+            "idle": {cfg.PLAYING_ICON: LOOKALIKE},
+            "loading": {cfg.LOADING_PIXEL: WHITE, (x, low_y): WHITE},
+        }
+        sub = os.path.join(directory, f"{w}x{h}")
+        os.makedirs(sub)
+        for label, pixels in frames.items():
+            src = MemoryFrameSource(w, h, BACKGROUND)
+            src.set_pixels(pixels)
+            src.to_ppm(os.path.join(sub, f"{w}x{h}_{label}_01.ppm"))
+
+
+class TestCalibration(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dir = cls.tmp.name
+        write_corpus(cls.dir)
+        cls.grid = candidates(offsets=(-2, 0, 2), extras=(0.02,), tolerances=(10, 12, 16, 24))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_read_ppm_pixels_matches_full_load(self):
+        path = os.path.join(self.dir, "1920x1080", "1920x1080_playing_01.ppm")
+        src = MemoryFrameSource.from_ppm(path)
+        points = [(88, 46), (0, 0), (1919, 1079), (1920, 0)]
+        self.assertEqual(read_ppm_pixels(path, points), {p: src.get_pixel(*p) for p in points})
+
+    def test_corpus_is_listed_recursively(self):
+        frames = list(iter_corpus(self.dir))
+        self.assertEqual(len(frames), 8)
+        self.assertEqual({(w, h) for w, h, _, _ in frames}, {(1920, 1080), (2560, 1080)})
+
+    def test_finds_the_offsets_and_tolerance(self):
+        result = calibrate(iter_corpus(self.dir), self.grid)
+        self.assertEqual(result.frames, 8)
+        best = result.best
+        self.assertEqual((best.precision, best.recall), (1.0, 1.0))
+        # ties resolve to the smallest change from the shipped constants
+        self.assertEqual(best.geometry, ProbeGeometry(playing_x=(86, 230), tolerance=12))
+        current = next(s for s in result.ranked if s.geometry == DEFAULT_GEOMETRY)
+        self.assertLess(current.f1, best.f1)
+        # a tolerance that also accepts the look-alike loses precision
+        loose = next(s for s in result.ranked if s.geometry == ProbeGeometry(playing_x=(86, 230), tolerance=24))
+        self.assertLess(loose.precision, 1.0)
+        self.assertGreater(result.fps, 0)
+
+    def test_pool_matches_single_process(self):
+        serial = calibrate(iter_corpus(self.dir), self.grid)
+        pooled = calibrate(iter_corpus(self.dir), self.grid, workers=2, batch_size=3)
+        self.assertEqual(pooled.frames, serial.frames)
+        self.assertEqual([(s.geometry, s.f1) for s in pooled.ranked], [(s.geometry, s.f1) for s in serial.ranked])
+
+    def test_pure_python_matches_numpy(self):
+        numpy = calibrate(iter_corpus(self.dir), self.grid)
+        pure = calibrate(iter_corpus(self.dir), self.grid, use_numpy=False)
+        self.assertEqual([(s.geometry, s.precision, s.recall) for s in pure.ranked],
+                         [(s.geometry, s.precision, s.recall) for s in numpy.ranked])
+
+    def test_cli_writes_best(self):
+        out_path = os.path.join(self.dir, "best.json")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main(["--frames", self.dir, "--workers", "1", "--offsets", "-2", "0", "2", "--extras", "0.02",
+                         "--tolerances", "10", "12", "24", "--out", out_path])
+        self.assertEqual(code, 0)
+        self.assertIn("fps", out.getvalue())
+        with open(out_path, encoding="utf-8") as f:
+            best = json.load(f)
+        self.assertEqual((best["playing_x"], best["tolerance"], best["f1"]), ([86, 230], 12, 1.0))
+
+    def test_cli_writes_loadable_layouts(self):
+        path = os.path.join(self.dir, "layouts.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(["--frames", self.dir, "--workers", "1", "--offsets", "-2", "0", "2", "--extras", "0.02",
+                         "--tolerances", "10", "12", "24", "--layouts", path])
+        self.assertEqual(code, 0)
+        table = LayoutTable(path)
+        self.assertEqual(len(table), 2)
+        entry = table.get(1920, 1080)
+        self.assertTrue(entry.verified)
+        self.assertEqual(entry.tolerance, 12)
+        # what ScreenConfig applies from the table at startup or on reload
+        cfg = ScreenConfig(1920, 1080, use_layouts=False)
+        cfg.apply_layout(entry)
+        self.assertEqual(cfg.PLAYING_ICON, ScreenConfig(1920, 1080, use_layouts=False, geometry=TRUE_GEOMETRY).PLAYING_ICON)
+        self.assertEqual({p.tolerance for p in cfg.probe_table().probes}, {12})
+
+    def test_unreadable_frames_are_skipped(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "1920x1080_idle.ppm"), "wb") as f:
+                f.write(b"P3\n1 1\n255\n")
+            with self.assertLogs("src.calibration", "WARNING"):
+                result = calibrate(iter_corpus(d), self.grid)
+            self.assertEqual((result.frames, result.skipped), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
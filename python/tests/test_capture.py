@@ -0,0 +1,161 @@
+import unittest
+
+from src.autoskip_dialogue import ScreenConfig
+from src.capture import FrameSet, MemoryFrameSource, PixelSampler, bounding_box, grab_plan
+
+WHITE = (255, 255, 255)
+PLAYING = (236, 229, 216)
+
+
+class TestBoundingBox(unittest.TestCase):
+    def test_covers_all_points(self):
+        self.assertEqual(bounding_box([(84, 46), (1301, 808), (1200, 700)]), (84, 46, 1218, 763))
+
+    def test_single_point(self):
+        self.assertEqual(bounding_box([(5, 7)]), (5, 7, 1, 1))
+
+
+class TestGrabPlan(unittest.TestCase):
+    def test_default_probes_grab_a_few_pixels(self):
+        for w, h in ((1920, 1080), (3840, 2160)):
+            points = ScreenConfig(w, h, use_layouts=False).probe_table().points
+            plan = grab_plan(points)
+            # choice_low and choice_high share a column and one grab
+            self.assertEqual(len(plan), 3)
+            self.assertLess(sum(rw * rh for _, _, rw, rh in plan), 64)
+            for x, y in points:
+                self.assertTrue(any(l <= x < l + rw and t <= y < t + rh for l, t, rw, rh in plan))
+
+    def test_unbounded_is_the_bounding_box(self):
+        points = [(84, 46), (1301, 808), (1200, 700)]
+        self.assertEqual(grab_plan(points, overhead=float("inf"), max_area=float("inf")), [bounding_box(points)])
+
+    def test_rects_stay_whole(self):
+        rects = [(0, 0, 17, 17), (10, 10, 17, 17), (500, 500, 300, 300)]
+        plan = grab_plan([(5, 5)], rects)
+        self.assertEqual(plan, [(0, 0, 27, 27), (500, 500, 300, 300)])
+
+    def test_merged_grabs_are_capped(self):
+        # a dense row merges into strips no larger than max_area
+        points = [(x, 0) for x in range(0, 1000, 10)]
+        plan = grab_plan(points, max_area=256)
+        self.assertGreater(len(plan), 1)
+        self.assertTrue(all(rw * rh <= 256 for _, _, rw, rh in plan))
+        for x, y in points:
+            self.assertTrue(any(l <= x < l + rw and t <= y < t + rh for l, t, rw, rh in plan))
+
+
+class TestMemoryFrameSource(unittest.TestCase):
+    def test_grab_matches_pixels(self):
+        src = MemoryFrameSource(64, 48)
+        src.set_pixels({(3, 4): WHITE, (40, 30): PLAYING})
+        frame = src.grab(2, 2, 50, 40)
+        self.assertEqual(frame.pixel(3, 4), WHITE)
+        self.assertEqual(frame.pixel(40, 30), PLAYING)
+        self.assertEqual(frame.pixel(10, 10), (0, 0, 0))
+        self.assertIsNone(frame.pixel(1, 1))
+
+    def test_grab_out_of_bounds(self):
+        src = MemoryFrameSource(10, 10)
+        self.assertIsNone(src.grab(5, 5, 10, 10))
+
+    def test_buffer_is_reused(self):
+        src = MemoryFrameSource(32, 32)
+        first = src.grab(0, 0, 16, 16)
+        second = src.grab(0, 0, 8, 8)
+        self.assertIs(first.data.obj, second.data.obj)
+
+
+class TestPixelSamplerSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.src = MemoryFrameSource(200, 100)
+        self.src.set_pixels({(10, 10): PLAYING, (150, 80): WHITE})
+        self.sampler = PixelSampler(self.src)
+
+    def test_snapshot_answers_probes_with_one_grab_per_cluster(self):
+        self.assertTrue(self.sampler.snapshot([(10, 10), (150, 80), (120, 70)]))
+        self.assertIsInstance(self.sampler.frame, FrameSet)
+        self.assertEqual(self.sampler.get(10, 10), PLAYING)
+        self.assertEqual(self.sampler.get(150, 80), WHITE)
+        self.assertEqual(self.sampler.get(120, 70), (0, 0, 0))
+        self.assertEqual(self.src.grabs, 2)
+        self.assertEqual(self.src.pixel_reads, 0)
+
+    def test_nearby_points_share_one_grab(self):
+        self.assertTrue(self.sampler.snapshot([(150, 80), (120, 70)]))
+        self.assertEqual(self.sampler.frame.pixel(150, 80), WHITE)
+        self.assertEqual(self.src.grabs, 1)
+
+    def test_rect_is_grabbed_whole(self):
+        self.assertTrue(self.sampler.snapshot([(10, 10)], [(100, 20, 60, 70)]))
+        self.assertIsNotNone(self.sampler.frame.part((100, 20, 60, 70)))
+        self.assertIsNone(self.sampler.frame.part((5, 5, 10, 10)))
+
+    def test_without_snapshot_reads_per_pixel(self):
+        self.assertEqual(self.sampler.get(10, 10), PLAYING)
+        self.assertEqual(self.src.pixel_reads, 1)
+
+    def test_release_drops_snapshot(self):
+        self.sampler.snapshot([(10, 10), (150, 80)])
+        self.src.set_pixel(10, 10, WHITE)
+        self.assertEqual(self.sampler.get(10, 10), PLAYING)
+        self.sampler.release()
+        self.assertEqual(self.sampler.get(10, 10), WHITE)
+
+    def test_failed_grab_falls_back(self):
+        self.assertFalse(self.sampler.snapshot([(10, 10), (500, 500)]))
+        self.assertEqual(self.sampler.get(10, 10), PLAYING)
+        self.assertEqual(self.src.pixel_reads, 1)
+
+    def test_backend_error_counts_failure(self):
+        def boom(x, y):
+            raise OSError("GetPixel failed")
+        self.src.get_pixel = boom
+        self.assertIsNone(self.sampler.get(1, 2))
+        self.assertEqual(self.sampler.total_failures, 1)
+        self.assertEqual(self.sampler.fail_counts[(1, 2)], 1)
+
+
+
+class TestFrameDiff(unittest.TestCase):
+    def setUp(self):
+        self.src = MemoryFrameSource(200, 100)
+        self.sampler = PixelSampler(self.src)
+        self.points = [(10, 10), (150, 80)]
+
+    def _check(self):
+        self.sampler.snapshot(self.points)
+        return self.sampler.unchanged(self.points)
+
+    def test_unchanged_frames_hit(self):
+        self.assertFalse(self._check())
+        self.assertTrue(self._check())
+        self.assertTrue(self._check())
+        self.assertEqual((self.sampler.diff_checks, self.sampler.diff_hits), (3, 2))
+        self.assertAlmostEqual(self.sampler.diff_hit_rate, 2 / 3)
+
+    def test_probe_change_misses(self):
+        self._check()
+        self.src.set_pixel(150, 80, WHITE)
+        self.assertFalse(self._check())
+        self.assertTrue(self._check())
+
+    def test_change_outside_probes_is_ignored(self):
+        self._check()
+        self.src.set_pixel(11, 10, WHITE)
+        self.assertTrue(self._check())
+
+    def test_failed_snapshot_resets(self):
+        self._check()
+        self.sampler.snapshot([(10, 10), (500, 500)])
+        self.assertFalse(self.sampler.unchanged(self.points))
+        self.assertFalse(self._check())
+
+    def test_invalidate(self):
+        self._check()
+        self.sampler.invalidate()
+        self.assertFalse(self._check())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+from threading import Event
+
+from src.clock import PreciseClock
+from src.simulation import Simulation, Timeline
+
+
+class TestPreciseClock(unittest.TestCase):
+    def test_times_out_close_to_deadline(self):
+        clock = PreciseClock(cpu_budget=1.0)
+        for _ in range(5):
+            start = time.perf_counter()
+            self.assertFalse(clock.wait(Event(), 0.02))
+            self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+        self.assertEqual(clock.overshoot.count, 5)
+        self.assertLess(clock.overshoot.percentile(0.5), 0.005)
+        self.assertGreater(clock.spin_time, 0.0)
+
+    def test_interruptible(self):
+        clock = PreciseClock()
+        ev = Event()
+        threading.Timer(0.01, ev.set).start()
+        start = time.perf_counter()
+        self.assertTrue(clock.wait(ev, 2.0))
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_interruptible_while_spinning(self):
+        clock = PreciseClock(cpu_budget=1.0, margin=0.1, max_spin=0.1)
+        ev = Event()
+        threading.Timer(0.005, ev.set).start()
+        start = time.perf_counter()
+        self.assertTrue(clock.wait(ev, 0.05))
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+    def test_zero_budget_never_spins(self):
+        clock = PreciseClock(cpu_budget=0.0)
+        clock.spin_time = 1e-9  # past the budget from the first wait on
+        for _ in range(3):
+            clock.wait(Event(), 0.005)
+        self.assertEqual(clock.spin_time, 1e-9)
+
+
+class TestIntervalError(unittest.TestCase):
+    def test_virtual_clock_presses_are_on_time(self):
+        sim = Simulation(Timeline().idle(2).dialogue(10), seed=4)
+        sim.run()
+        error = sim.skipper.interval_error
+        self.assertGreater(error.count, 10)
+        self.assertEqual(error.max, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
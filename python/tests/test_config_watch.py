@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+from random import Random
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.capture import MemoryFrameSource
+from src.clock import VirtualClock
+from src.config_watch import ConfigWatcher, plan_reload
+from src.focus import FakeFocusSource
+from src.input_sender import RecordingSender
+from src.instrumentation import Instrumentation
+from src.timing import DEFAULT_TIMING, TimingModel, TimingParams
+
+
+class TestTimingParams(unittest.TestCase):
+    def test_overrides_and_validation(self):
+        params = TimingParams.from_env({"AUTOSKIP_NORMAL_INTERVAL": "0.3, 0.4", "AUTOSKIP_SKIP_P": "0",
+                                        "AUTOSKIP_RAPID_RUN": "1,2", "WIDE_P": "0.9"})
+        self.assertEqual(params.normal_interval, (0.3, 0.4))
+        self.assertEqual(params.rapid_run, (1, 2))
+        self.assertEqual(params.skip_p, 0.0)
+        # unprefixed names are someone else's variables
+        self.assertEqual(params.wide_p, DEFAULT_TIMING.wide_p)
+        with self.assertRaises(ValueError) as cm:
+            TimingParams.from_env({"AUTOSKIP_NORMAL_INTERVAL": "0.4,0.3", "AUTOSKIP_SKIP_P": "2",
+                                   "AUTOSKIP_RAPID_RUN": "1.5,2"})
+        for key in ("AUTOSKIP_NORMAL_INTERVAL", "AUTOSKIP_SKIP_P", "AUTOSKIP_RAPID_RUN"):
+            self.assertIn(key, str(cm.exception))
+
+    def test_model_draws_from_params(self):
+        params = TimingParams(rapid_start_p=0, wide_p=0, normal_interval=(1.0, 2.0))
+        model = TimingModel(Random(0), batch=64, use_numpy=False, params=params)
+        self.assertTrue(all(1.0 <= model.next_interval() <= 2.0 for _ in range(200)))
+
+
+class TestFromEnv(unittest.TestCase):
+    def test_strict(self):
+        cfg = ScreenConfig.from_env({"WIDTH": "1280", "HEIGHT": "720", "WINDOW_TITLE": "Other",
+                                     "POLL_MIN_INTERVAL": "0.2", "POLL_MAX_INTERVAL": "0.4"})
+        self.assertEqual((cfg.WIDTH, cfg.WINDOW_TITLE, cfg.POLL_MIN_INTERVAL), (1280, "Other", 0.2))
+        with self.assertRaises(ValueError):
+            ScreenConfig.from_env({"WIDTH": "wide", "HEIGHT": "720"})
+        with self.assertRaises(ValueError) as cm:
+            ScreenConfig.from_env({"WIDTH": "1280", "HEIGHT": "720", "DETECTORS": "ocr", "POLL_MIN_INTERVAL": "0"})
+        self.assertIn("DETECTORS", str(cm.exception))
+        self.assertIn("POLL_MIN_INTERVAL", str(cm.exception))
+
+
+class TestPlanReload(unittest.TestCase):
+    def setUp(self):
+        self.old = ScreenConfig.from_env({"WIDTH": "1920", "HEIGHT": "1080"})
+        self.table = self.old.probe_table()
+
+    def test_only_changed_pieces_are_rebuilt(self):
+        new = ScreenConfig.from_env({"WIDTH": "1920", "HEIGHT": "1080", "AUTOSKIP_SKIP_P": "0.5"})
+        reload = plan_reload(self.old, new, self.table, Random(0))
+        self.assertEqual(reload.changed, ("timing",))
+        self.assertIsNone(reload.table)
+        self.assertIsNone(reload.cascade)
+        self.assertEqual(reload.timing.params.skip_p, 0.5)
+        # prefilled off the loop thread
+        self.assertTrue(reload.timing._intervals.queue)
+
+    def test_resolution_rebuilds_probes(self):
+        new = ScreenConfig.from_env({"WIDTH": "2560", "HEIGHT": "1440"})
+        reload = plan_reload(self.old, new, self.table, Random(0), pacer=True)
+        self.assertEqual(reload.changed, ("probes", "detectors"))
+        self.assertEqual(reload.table.points, new.probe_table().points)
+        self.assertIsNotNone(reload.pacer)
+        self.assertIsNone(reload.timing)
+
+    def test_no_change(self):
+        reload = plan_reload(self.old, ScreenConfig.from_env({"WIDTH": "1920", "HEIGHT": "1080"}), self.table,
+                             Random(0))
+        self.assertEqual(reload.changed, ())
+
+
+class TestHotReload(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.env_path = os.path.join(self.dir.name, ".env")
+        self.write("WIDTH=1920\nHEIGHT=1080\n")
+        cfg = ScreenConfig.from_env({"WIDTH": "1920", "HEIGHT": "1080"})
+        self.clock = VirtualClock()
+        self.skipper = AutoSkipper(cfg, None, Random(0), capture_backend=MemoryFrameSource(1920, 1080),
+                                   focus_source=FakeFocusSource(1, cfg.WINDOW_TITLE),
+                                   sender=RecordingSender(self.clock.now), clock=self.clock,
+                                   backend=HeadlessBackend(), metrics=Instrumentation(enabled=True))
+        self.watcher = ConfigWatcher(self.skipper, self.env_path, os.path.join(self.dir.name, "layouts.json"),
+                                     base_env={}, rand=Random(1))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, text):
+        with open(self.env_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        # a new stamp even on coarse mtime clocks
+        st = os.stat(self.env_path)
+        os.utime(self.env_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_swap_keeps_loop_state(self):
+        skipper = self.skipper
+        skipper.status = "run"
+        skipper.start_loop()
+        skipper.step(self.clock.now())
+        skipper._in_dialogue = True
+        skipper.metrics.count("presses", 7)
+        deadlines = dict(skipper.timers._deadlines)
+        old_timing = skipper.timing
+        self.assertIsNone(self.watcher.poll())
+
+        self.write("WIDTH=2560\nHEIGHT=1440\nAUTOSKIP_NORMAL_INTERVAL=0.3,0.4\nWINDOW_TITLE=Genshin\n")
+        reload = self.watcher.poll()
+        self.assertEqual(reload.changed, ("probes", "detectors", "timing", "window title"))
+        # built by the watcher, not applied until the loop's next step
+        self.assertIs(skipper.timing, old_timing)
+        skipper._apply_reload()
+        self.assertEqual(skipper.config.WIDTH, 2560)
+        self.assertEqual(skipper._probe_table.points, ScreenConfig(2560, 1440).probe_table().points)
+        self.assertEqual(skipper.timing.params.normal_interval, (0.3, 0.4))
+        self.assertTrue(skipper._in_dialogue)
+        self.assertEqual(skipper.metrics.counters["presses"], 7)
+        self.assertEqual(skipper.timers._deadlines, deadlines)
+        self.assertTrue(skipper.is_genshin_active())
+        self.assertEqual(skipper.reload_pause.count, 1)
+        self.assertEqual(self.watcher.build_time.count, 1)
+        self.assertIn("reload_pause", skipper.metrics.snapshot()["stages"])
+
+    def test_invalid_change_is_rejected(self):
+        self.write("WIDTH=1920\nHEIGHT=1080\nAUTOSKIP_SKIP_P=lots\n")
+        with self.assertLogs("src.config_watch", "WARNING"):
+            self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.watcher.rejected, 1)
+        self.assertIsNone(self.skipper._pending_reload)
+        # fixing the file applies it
+        self.write("WIDTH=1920\nHEIGHT=1080\nAUTOSKIP_SKIP_P=0.5\n")
+        self.assertEqual(self.watcher.poll().changed, ("timing",))
+
+    def test_base_env_wins_over_the_file(self):
+        self.watcher.base_env = {"AUTOSKIP_SKIP_P": "0.25"}
+        self.write("WIDTH=1920\nHEIGHT=1080\nAUTOSKIP_SKIP_P=0.5\n")
+        self.assertEqual(self.watcher.poll().timing.params.skip_p, 0.25)
+
+    def test_swap_pause_is_small(self):
+        self.write("WIDTH=2560\nHEIGHT=1440\nAUTOSKIP_SKIP_P=0.5\n")
+        reload = self.watcher.poll()
+        self.skipper.step(self.clock.now())
+        self.assertIsNone(self.skipper._pending_reload)
+        # the loop only swaps references: far below one press interval
+        self.assertLess(self.skipper.reload_pause.max, 0.005)
+        self.assertGreater(reload.build_seconds, self.skipper.reload_pause.max)
+
+
+if __name__ == "__main__":
+    unittest.main()
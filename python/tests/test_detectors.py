@@ -0,0 +1,215 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+from random import Random
+
+from src.autoskip_dialogue import PLAYING_ICON_COLOR, WHITE, AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.capture import MemoryFrameSource, PixelSampler
+from src.detectors import (Detection, DetectorCascade, HistogramDetector, ProbeDetector, TemplateDetector, bench,
+                           build_cascade, load_references, main, save_references)
+from src.focus import FakeFocusSource
+from src.instrumentation import Instrumentation
+from src.layouts import Layout
+from src.trace import CHECK_ESCALATED, TraceRecorder
+
+W, H = 320, 180
+GRASS = (40, 120, 50)
+BOX = (30, 30, 40)
+
+
+def screen(playing_color=None, dialogue_box=False):
+    cfg = ScreenConfig(W, H, use_layouts=False)
+    src = MemoryFrameSource(W, H, GRASS)
+    if playing_color is not None:
+        x, y = cfg.PLAYING_ICON
+        for dx in range(-3, 4):
+            for dy in range(-3, 4):
+                src.set_pixel(x + dx, y + dy, playing_color)
+    if dialogue_box:
+        for y in range(int(0.78 * H), int(0.96 * H)):
+            for x in range(int(0.2 * W), int(0.8 * W)):
+                src.set_pixel(x, y, WHITE if (x // 3 + y) % 7 == 0 else BOX)
+    return src
+
+
+def full_frame(src):
+    return src.grab(0, 0, W, H)
+
+
+class TestStrategies(unittest.TestCase):
+    def setUp(self):
+        self.cfg = ScreenConfig(W, H, use_layouts=False)
+        self.table = self.cfg.probe_table()
+
+    def test_probe_detector_is_unsure_near_tolerance(self):
+        probe = ProbeDetector(self.table)
+        self.assertEqual(probe.detect(full_frame(screen(PLAYING_ICON_COLOR))), Detection(True, True, 1))
+        self.assertEqual(probe.detect(full_frame(screen())), Detection(False, True, 0))
+        # 15 off: outside the tolerance of 10, inside the loose one
+        near = tuple(c - 15 for c in PLAYING_ICON_COLOR)
+        self.assertEqual(probe.detect(full_frame(screen(near))), Detection(False, False, 0))
+
+    def test_template_averages_over_the_patch(self):
+        template = TemplateDetector(self.table, (W, H))
+        self.assertTrue(template.detect(full_frame(screen(PLAYING_ICON_COLOR))).dialogue)
+        # a single matching pixel lights the probe but not the patch
+        src = screen()
+        src.set_pixel(*self.cfg.PLAYING_ICON, PLAYING_ICON_COLOR)
+        self.assertTrue(ProbeDetector(self.table).detect(full_frame(src)).dialogue)
+        self.assertEqual(template.detect(full_frame(src)), Detection(False, True, 0))
+
+    def test_template_fit_learns_patches(self):
+        icon = tuple(c - 5 for c in PLAYING_ICON_COLOR)
+        src = screen(icon)
+        x, y = self.cfg.PLAYING_ICON
+        # a dark outline the solid template would not accept
+        for d in range(-3, 4):
+            src.set_pixel(x + d, y - 3, (0, 0, 0))
+        template = TemplateDetector(self.table, (W, H))
+        self.assertFalse(template.detect(full_frame(src)).dialogue)
+        template.fit([(full_frame(src), "playing"), (full_frame(screen()), "idle")])
+        self.assertTrue(template.detect(full_frame(src)).dialogue)
+        restored = TemplateDetector(self.table, (W, H), template.references())
+        self.assertEqual(restored.templates, template.templates)
+
+    def test_histogram_needs_both_classes(self):
+        hist = HistogramDetector(self.table, (W, H))
+        dialogue, world = full_frame(screen(dialogue_box=True)), full_frame(screen())
+        self.assertFalse(hist.detect(dialogue).confident)
+        hist.fit([(dialogue, "choice")])
+        self.assertFalse(hist.detect(dialogue).confident)
+        hist.fit([(world, "idle"), (dialogue, "playing")])
+        self.assertEqual(len(hist.refs["dialogue"]), 1)
+        self.assertEqual(hist.detect(dialogue), Detection(True, True))
+        self.assertEqual(hist.detect(world), Detection(False, True))
+        self.assertEqual(HistogramDetector(self.table, (W, H), hist.references()).refs, hist.refs)
+
+
+class TestCascade(unittest.TestCase):
+    def setUp(self):
+        self.cfg = ScreenConfig(W, H, use_layouts=False)
+        self.table = self.cfg.probe_table()
+        hist = HistogramDetector(self.table, (W, H))
+        hist.fit([(full_frame(screen(dialogue_box=True)), "playing"), (full_frame(screen()), "idle")])
+        self.refs = {"histogram": hist.references()}
+
+    def test_probe_stage_always_first(self):
+        cascade = build_cascade(["histogram", "template"], self.table, (W, H))
+        self.assertEqual(cascade.names, ("probe", "template", "histogram"))
+        self.assertFalse(cascade.stages[0].decides)
+        self.assertTrue(build_cascade([], self.table, (W, H)).stages[0].decides)
+        with self.assertRaises(ValueError):
+            build_cascade(["pixels"], self.table, (W, H))
+        with self.assertRaises(ValueError):
+            DetectorCascade([])
+
+    def test_escalates_only_when_unsure(self):
+        cascade = build_cascade(["probe", "histogram"], self.table, (W, H), self.refs)
+        sure = PixelSampler(screen(PLAYING_ICON_COLOR))
+        self.assertEqual(cascade.run(sure), (Detection(True, True, 1), 0))
+        # near-miss probe, dialogue box showing: the histogram decides
+        near = tuple(c - 15 for c in PLAYING_ICON_COLOR)
+        det, stage = cascade.run(PixelSampler(screen(near, dialogue_box=True)))
+        self.assertEqual((det.dialogue, stage), (True, 1))
+
+    def test_probe_left_out_never_decides(self):
+        cascade = build_cascade(["histogram"], self.table, (W, H), self.refs)
+        # the probe hits, but the histogram sees no dialogue box
+        det, stage = cascade.run(PixelSampler(screen(PLAYING_ICON_COLOR)))
+        self.assertEqual((det.dialogue, stage), (False, 1))
+
+    def test_bench_scores_labelled_frames(self):
+        cascade = build_cascade(["probe", "template", "histogram"], self.table, (W, H), self.refs)
+        near = tuple(c - 15 for c in PLAYING_ICON_COLOR)
+        sources = [("playing", screen(PLAYING_ICON_COLOR, dialogue_box=True)), ("idle", screen()),
+                   ("playing", screen(near, dialogue_box=True))]
+        rows = {row.name: row for row in bench(cascade, sources, repeat=1)}
+        self.assertEqual(rows["probe"].agree, 2)
+        self.assertEqual(rows["probe"].unsure, 1)
+        self.assertEqual(rows["cascade"].agree, 3)
+        self.assertEqual(rows["cascade"].escalated, 1)
+        self.assertTrue(all(row.frames == 3 for row in rows.values()))
+
+
+class TestSkipperIntegration(unittest.TestCase):
+    def _skipper(self, src, detectors, refs):
+        cfg = ScreenConfig(W, H, use_layouts=False)
+        cfg.DETECTORS = detectors
+        skipper = AutoSkipper(cfg, None, Random(0), capture_backend=src,
+                              focus_source=FakeFocusSource(1, cfg.WINDOW_TITLE), backend=HeadlessBackend(W, H),
+                              metrics=Instrumentation(enabled=True), trace=TraceRecorder(64, enabled=True))
+        # stored references are per machine; use the test's own
+        skipper.detectors = build_cascade(detectors, skipper._probe_table, (W, H), refs)
+        skipper._escalate = len(skipper.detectors.stages) > 1
+        return skipper
+
+    def test_unsure_probe_check_escalates(self):
+        hist = HistogramDetector(ScreenConfig(W, H, use_layouts=False).probe_table(), (W, H))
+        hist.fit([(full_frame(screen(dialogue_box=True)), "playing"), (full_frame(screen()), "idle")])
+        near = tuple(c - 15 for c in PLAYING_ICON_COLOR)
+        skipper = self._skipper(screen(near, dialogue_box=True), ("probe", "histogram"),
+                                {"histogram": hist.references()})
+        self.assertTrue(skipper._detect_dialogue())
+        self.assertTrue(skipper._check_flags & CHECK_ESCALATED)
+        self.assertEqual(skipper.metrics.counters["escalations"], 1)
+        # unchanged probe pixels keep escalating: the dialogue box may have changed
+        self.assertTrue(skipper._detect_dialogue())
+        self.assertEqual(skipper.metrics.counters["escalations"], 2)
+
+    def test_probe_only_never_escalates(self):
+        near = tuple(c - 15 for c in PLAYING_ICON_COLOR)
+        skipper = self._skipper(screen(near, dialogue_box=True), ("probe",), {})
+        self.assertFalse(skipper._detect_dialogue())
+        self.assertEqual(skipper.metrics.counters["escalations"], 0)
+
+
+class TestSelection(unittest.TestCase):
+    def test_layout_carries_detectors(self):
+        layout = Layout(1920, 1080, (84, 46), (1301, 808, 790), (1200, 700))
+        self.assertNotIn("detectors", layout.to_dict())
+        layout.detectors = ("probe", "template")
+        self.assertEqual(Layout.from_dict(layout.to_dict()).detectors, ("probe", "template"))
+        d = layout.to_dict()
+        d["detectors"] = ["probe", "ocr"]
+        with self.assertRaises(ValueError):
+            Layout.from_dict(d)
+        cfg = ScreenConfig(1920, 1080, use_layouts=False)
+        cfg.apply_layout(layout)
+        self.assertEqual(cfg.DETECTORS, ("probe", "template"))
+
+    def test_env_override(self):
+        cfg = ScreenConfig(W, H, use_layouts=False)
+        with unittest.mock.patch.dict(os.environ, {"DETECTORS": "probe, histogram"}):
+            cfg._load_detectors()
+        self.assertEqual(cfg.DETECTORS, ("probe", "histogram"))
+        with unittest.mock.patch.dict(os.environ, {"DETECTORS": "nope"}):
+            with self.assertLogs("src.autoskip_dialogue", "WARNING"):
+                cfg._load_detectors()
+        self.assertEqual(cfg.DETECTORS, ("probe", "histogram"))
+
+
+class TestCli(unittest.TestCase):
+    def test_fit_then_bench(self):
+        with tempfile.TemporaryDirectory() as d:
+            screen(PLAYING_ICON_COLOR, dialogue_box=True).to_ppm(os.path.join(d, f"{W}x{H}_playing.ppm"))
+            screen().to_ppm(os.path.join(d, f"{W}x{H}_idle.ppm"))
+            refs = os.path.join(d, "refs.json")
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(["--refs", refs, "fit", "--frames", d]), 0)
+                self.assertEqual(main(["--refs", refs, "bench", "--frames", d, "--repeat", "1"]), 0)
+            stored = load_references(W, H, refs)
+            self.assertEqual(sorted(stored), ["histogram", "roi", "template"])
+            save_references(1, 1, {}, refs)
+            self.assertEqual(load_references(W, H, refs), stored)
+        lines = out.getvalue().splitlines()
+        cascade = next(line.split() for line in lines if line.strip().startswith("cascade"))
+        self.assertEqual(cascade[5], "100.0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import time
+import unittest
+from threading import Thread
+
+from src.focus import FakeFocusSource, FocusSource, FocusTracker, PollingFocusSource
+
+
+class TestFocusTracker(unittest.TestCase):
+    def setUp(self):
+        self.source = FakeFocusSource(1, "Desktop")
+        self.tracker = FocusTracker("Genshin Impact", self.source)
+
+    def test_refresh_without_events(self):
+        self.assertFalse(self.tracker.refresh())
+        self.source.hwnd = 2
+        self.source.titles[2] = "GENSHIN IMPACT"
+        self.assertTrue(self.tracker.refresh())
+
+    def test_events_update_flag_and_generation(self):
+        changes = []
+        self.tracker.add_listener(changes.append)
+        self.tracker.start()
+        self.assertFalse(self.tracker.is_active)
+        self.source.switch(7, "Genshin Impact")
+        self.assertTrue(self.tracker.is_active)
+        self.assertEqual(self.tracker.generation, 1)
+        self.source.switch(1)
+        self.assertFalse(self.tracker.is_active)
+        self.assertEqual(self.tracker.generation, 2)
+        self.assertEqual(changes, [True, False])
+
+    def test_title_fetched_only_on_hwnd_change(self):
+        self.tracker.start()
+        self.source.switch(7, "Genshin Impact")
+        calls = self.source.title_calls
+        for _ in range(10):
+            self.tracker.refresh()
+        self.assertEqual(self.source.title_calls, calls)
+
+    def test_title_change_rechecks_same_hwnd(self):
+        self.tracker.start()
+        self.source.switch(7, "Loading")
+        self.assertFalse(self.tracker.is_active)
+        self.source.switch(7, "Genshin Impact")
+        self.assertTrue(self.tracker.is_active)
+
+    def test_wait_active_unblocks_on_focus(self):
+        self.tracker.start()
+        Thread(target=lambda: (time.sleep(0.05), self.source.switch(9, "Genshin Impact"))).start()
+        self.assertTrue(self.tracker.wait_active(2.0))
+
+    def test_writers_on_other_threads_wait_for_a_transition(self):
+        changes = []
+        retitle = Thread(target=self.tracker.set_title, args=("Paimon",))
+
+        def listener(active):
+            if not changes and not retitle.is_alive():
+                # the config watcher retitles while the source thread is mid-notification
+                retitle.start()
+                retitle.join(0.2)
+            changes.append(active)
+
+        self.tracker.add_listener(listener)
+        self.tracker.start()
+        self.source.switch(7, "Genshin Impact")
+        retitle.join(5)
+        self.assertEqual(changes, [True, False])
+        self.assertEqual((self.tracker.is_active, self.tracker.generation), (False, 2))
+
+    def test_source_error_reports_inactive(self):
+        self.tracker.start()
+        self.source.switch(7, "Genshin Impact")
+
+        def boom():
+            raise OSError("no desktop")
+        self.source.foreground = boom
+        self.assertFalse(self.tracker.refresh())
+
+    def test_falls_back_to_polling(self):
+        class NoEvents(FocusSource):
+            def foreground(self):
+                return 3
+
+            def title(self, hwnd):
+                return "Genshin Impact"
+
+        tracker = FocusTracker("Genshin Impact", NoEvents())
+        tracker.start()
+        try:
+            self.assertIsInstance(tracker.source, PollingFocusSource)
+            self.assertTrue(tracker.is_active)
+        finally:
+            tracker.stop()
+
+
+class TestPollingFocusSource(unittest.TestCase):
+    def test_polling_detects_switch(self):
+        state = {"hwnd": 1}
+        source = PollingFocusSource(lambda: state["hwnd"], lambda h: "Genshin Impact" if h == 2 else "Other",
+                                    interval=0.01)
+        tracker = FocusTracker("Genshin Impact", source)
+        tracker.start()
+        try:
+            self.assertFalse(tracker.is_active)
+            state["hwnd"] = 2
+            self.assertTrue(tracker.wait_active(2.0))
+        finally:
+            tracker.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
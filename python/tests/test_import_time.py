@@ -0,0 +1,41 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# cumulative `python -X importtime` budget for the app module, in milliseconds
+IMPORT_BUDGET_MS = float(os.getenv("GDA_IMPORT_BUDGET_MS", "120"))
+# platform and optional modules that must only load on first use
+LAZY_MODULES = ("win32api", "win32gui", "pynput", "numpy", "dotenv")
+LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in microseconds per module, for a fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            times[m.group(3)] = int(m.group(1))
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    def test_platform_modules_are_lazy(self):
+        times = import_times("src.autoskip_dialogue")
+        self.assertIn("src.autoskip_dialogue", times)
+        loaded = [name for name in times if name.split(".")[0] in LAZY_MODULES]
+        self.assertEqual(loaded, [])
+
+    def test_import_budget(self):
+        # best of three to ride out a cold disk cache
+        best = min(import_times("src.autoskip_dialogue")["src.autoskip_dialogue"] for _ in range(3))
+        self.assertLess(best / 1000, IMPORT_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
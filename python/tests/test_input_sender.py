@@ -0,0 +1,80 @@
+import ctypes
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.histogram import Histogram
+from src.input_sender import RecordingSender, SendInputSender, _INPUT, vk_code
+
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        h = Histogram()
+        for us in range(1, 1001):
+            h.add(us / 1e6)
+        self.assertEqual(h.count, 1000)
+        self.assertAlmostEqual(h.mean, 500.5e-6)
+        self.assertEqual((h.min, h.max), (1e-6, 1e-3))
+        # log buckets: within 25% of the exact quantile, never below it
+        for q, exact in ((0.5, 500e-6), (0.9, 900e-6), (0.99, 990e-6)):
+            self.assertGreaterEqual(h.percentile(q), exact)
+            self.assertLessEqual(h.percentile(q), exact * 1.25)
+        self.assertEqual(sum(h.buckets().values()), 1000)
+
+    def test_empty(self):
+        h = Histogram()
+        self.assertEqual(h.percentile(0.5), 0.0)
+        self.assertEqual(h.to_dict()["min"], 0.0)
+        self.assertEqual(h.summary(), "n=0")
+
+
+class TestRecordingSender(unittest.TestCase):
+    def test_batches_and_latency(self):
+        sender = RecordingSender(now=lambda: 1.5)
+        sender.tap("f")
+        sender.tap("f", "f")
+        self.assertEqual(sender.batches, [(1.5, ("f",)), (1.5, ("f", "f"))])
+        self.assertEqual(sender.presses, [(1.5, "f")] * 3)
+        self.assertEqual((sender.injections, sender.taps, sender.latency.count), (2, 3, 2))
+
+
+class TestSendInputSender(unittest.TestCase):
+    def setUp(self):
+        self.send_input = MagicMock(side_effect=lambda n, arr, size: n)
+        windll = MagicMock()
+        windll.user32.SendInput = self.send_input
+        patcher = patch("ctypes.windll", windll, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sender = SendInputSender()
+
+    def test_input_struct_size(self):
+        self.assertEqual(ctypes.sizeof(_INPUT), 40 if ctypes.sizeof(ctypes.c_void_p) == 8 else 28)
+
+    def test_double_press_is_one_call(self):
+        self.sender.tap("f", "space")
+        self.send_input.assert_called_once()
+        n, arr, size = self.send_input.call_args.args
+        self.assertEqual((n, size), (4, ctypes.sizeof(_INPUT)))
+        events = [(arr[i].u.ki.wVk, arr[i].u.ki.dwFlags) for i in range(n)]
+        self.assertEqual(events, [(0x46, 0), (0x46, 2), (0x20, 0), (0x20, 2)])
+
+    def test_arrays_are_pooled(self):
+        self.sender.tap("f")
+        first = self.send_input.call_args.args[1]
+        self.sender.tap("t")
+        self.assertIs(self.send_input.call_args.args[1], first)
+        self.assertEqual(first[0].u.ki.wVk, vk_code("t"))
+
+    def test_partial_injection_counts_failure(self):
+        self.send_input.side_effect = lambda n, arr, size: 0
+        with self.assertLogs("src.input_sender", "WARNING"):
+            self.sender.tap("f")
+        self.assertEqual(self.sender.failures, 1)
+
+    def test_unknown_key(self):
+        with self.assertRaises(ValueError):
+            vk_code("f13")
+
+
+if __name__ == '__main__':
+    unittest.main()
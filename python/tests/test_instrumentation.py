@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.instrumentation import Instrumentation
+from src.simulation import Simulation, Timeline
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "metrics.json")
+
+    def test_disabled_records_nothing(self):
+        m = Instrumentation(path=self.path)
+        t0 = m.start()
+        self.assertEqual(t0, 0.0)
+        m.record("step", t0)
+        m.observe("sleep_overshoot", 0.01)
+        m.count("steps")
+        self.assertEqual(m.histograms["step"].count, 0)
+        self.assertEqual(m.counters["steps"], 0)
+        self.assertIsNone(m.dump())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_toggle_off_writes_snapshot(self):
+        m = Instrumentation(path=self.path)
+        m.toggle()
+        m.record("window", m.start())
+        m.count("steps", 2)
+        m.toggle()
+        self.assertFalse(m.enabled)
+        with open(self.path, encoding="utf-8") as f:
+            snap = json.load(f)
+        self.assertEqual(snap["counters"]["steps"], 2)
+        self.assertEqual(snap["stages"]["window"]["count"], 1)
+        self.assertNotIn("press", snap["stages"])
+
+    def test_reset(self):
+        m = Instrumentation(enabled=True, path=self.path)
+        m.observe("press", 0.001)
+        m.reset()
+        self.assertEqual(m.histograms["press"].count, 0)
+
+
+class TestLoopInstrumentation(unittest.TestCase):
+    def test_simulated_stage_counts(self):
+        sim = Simulation(Timeline().idle(5).dialogue(10).idle(5), seed=1, instrument=True)
+        report = sim.run()
+        m = sim.skipper.metrics
+        self.assertEqual(m.histograms["capture"].count, m.counters["checks"])
+        self.assertEqual(m.histograms["step"].count, m.counters["steps"])
+        self.assertEqual(m.counters["presses"], report.presses - sum(
+            1 for _, keys in sim.sender.batches if len(keys) == 2))
+        self.assertEqual(m.attached["inject"].count, len(sim.sender.batches))
+        self.assertGreater(m.counters["unchanged"], 0)
+
+    def test_simulation_writes_no_snapshot(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                sim = Simulation(Timeline().idle(1).dialogue(2), seed=1, instrument=True)
+                sim.run()
+                sim.skipper.on_key(sim.skipper._keys.f6)
+                self.assertEqual(os.listdir(tmp), [])
+            finally:
+                os.chdir(cwd)
+        self.assertGreater(sim.skipper.metrics.snapshot()["counters"]["steps"], 0)
+
+    def test_hotkey_toggles(self):
+        sim = Simulation(Timeline().idle(1), seed=1)
+        skipper = sim.skipper
+        with tempfile.TemporaryDirectory() as tmp:
+            skipper.metrics.path = os.path.join(tmp, "metrics.json")
+            skipper.on_key(skipper._keys.f6)
+            self.assertTrue(skipper.metrics.enabled)
+            skipper.on_key(skipper._keys.f6)
+            self.assertFalse(skipper.metrics.enabled)
+            self.assertTrue(os.path.exists(skipper.metrics.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
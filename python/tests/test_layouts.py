@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.capture import MemoryFrameSource
+from src.layouts import Layout, LayoutTable, aspect_ratio, reference_frames, verify_layout
+from src.probes import Probe, ProbeTable
+
+WHITE = (255, 255, 255)
+PLAYING = (236, 229, 216)
+HD = Layout(1920, 1080, (84, 46), (1301, 808, 790), (1200, 700))
+
+
+def table_for(layout):
+    x, low_y, hi_y = layout.dialogue_icon
+    probe_list = [
+        Probe("playing", layout.playing_icon, PLAYING),
+        Probe("loading", layout.loading_pixel, WHITE),
+        Probe("choice_low", (x, low_y), WHITE),
+        Probe("choice_high", (x, hi_y), WHITE),
+    ]
+    choice = ("and", ("not", "loading"), ("or", "choice_low", "choice_high"))
+    return ProbeTable(probe_list, {"playing": "playing", "choice": choice, "dialogue": ("or", "playing", choice)})
+
+
+class TestLayout(unittest.TestCase):
+    def test_aspect(self):
+        self.assertEqual(aspect_ratio(3440, 1440), "43:18")
+        self.assertEqual(HD.key, (1920, 1080, "16:9"))
+
+    def test_round_trip(self):
+        self.assertEqual(Layout.from_dict(json.loads(json.dumps(HD.to_dict()))), HD)
+
+    def test_round_trip_with_tolerance(self):
+        tuned = Layout(1920, 1080, (86, 46), (1301, 808, 790), (1200, 700), verified=True, tolerance=12)
+        self.assertEqual(Layout.from_dict(json.loads(json.dumps(tuned.to_dict()))), tuned)
+        self.assertNotIn("tolerance", HD.to_dict())
+
+    def test_rejects_bad_aspect(self):
+        d = HD.to_dict()
+        d["aspect"] = "21:9"
+        with self.assertRaises(ValueError):
+            Layout.from_dict(d)
+
+    def test_rejects_probe_out_of_bounds(self):
+        d = HD.to_dict()
+        d["loading_pixel"] = [1920, 700]
+        with self.assertRaises(ValueError):
+            Layout.from_dict(d)
+
+
+class TestLayoutTable(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "layouts.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_reload(self):
+        table = LayoutTable(self.path)
+        table.put(HD)
+        table.save()
+        reloaded = LayoutTable(self.path)
+        self.assertEqual(reloaded.get(1920, 1080), HD)
+        self.assertIsNone(reloaded.get(2560, 1440))
+
+    def test_file_read_lazily(self):
+        table = LayoutTable(self.path)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump([HD.to_dict()], f)
+        self.assertEqual(len(table), 1)
+
+    def test_missing_file_is_empty(self):
+        self.assertIsNone(LayoutTable(self.path).get(1920, 1080))
+
+    def test_invalid_entries_skipped(self):
+        bad = HD.to_dict()
+        bad["width"] = 10
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump([bad, Layout(2560, 1440, (112, 61), (1734, 1077, 1053), (1600, 933)).to_dict()], f)
+        with self.assertLogs("src.layouts", level="WARNING"):
+            table = LayoutTable(self.path)
+            self.assertEqual(len(table), 1)
+
+    def test_shipped_table_is_valid(self):
+        table = LayoutTable()
+        with open(table.path, encoding="utf-8") as f:
+            self.assertEqual(len(table), len(json.load(f)))
+        # only entries checked against reference frames ship; the heuristics cover the rest
+        self.assertEqual([l.key for l in table if not l.verified], [])
+
+
+class TestVerify(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        # small canvas is enough: probes only need to be inside the frame
+        x, low_y, _hi_y = HD.dialogue_icon
+        frames = {
+            "playing": {HD.playing_icon: PLAYING},
+            "choice": {(x, low_y): WHITE},
+            "idle": {},
+            "loading": {HD.loading_pixel: WHITE, (x, low_y): WHITE},
+        }
+        for label, pixels in frames.items():
+            src = MemoryFrameSource(1920, 1080, fill=(30, 30, 30))
+            src.set_pixels(pixels)
+            src.to_ppm(os.path.join(self.dir, f"1920x1080_{label}.ppm"))
+        open(os.path.join(self.dir, "notes.txt"), "w").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reference_frames_grouped(self):
+        frames = reference_frames(self.dir)
+        self.assertEqual(list(frames), [(1920, 1080)])
+        self.assertEqual(sorted(label for label, _ in frames[(1920, 1080)]), ["choice", "idle", "loading", "playing"])
+
+    def test_correct_layout_verifies(self):
+        self.assertEqual(verify_layout(table_for(HD), reference_frames(self.dir)[(1920, 1080)]), [])
+
+    def test_shifted_layout_fails(self):
+        shifted = Layout(1920, 1080, (90, 46), (1301, 808, 790), (1200, 700))
+        errors = verify_layout(table_for(shifted), reference_frames(self.dir)[(1920, 1080)])
+        self.assertEqual(len(errors), 1)
+        self.assertIn("1920x1080_playing.ppm", errors[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
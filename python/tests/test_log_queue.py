@@ -0,0 +1,117 @@
+import io
+import logging
+import queue
+import threading
+import unittest
+
+from src.autoskip_dialogue import LoggerManager
+from src.log_queue import DroppingQueueHandler, LogPipeline
+
+
+class _Arg:
+    """Records which thread turned it into a string."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "arg"
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestDroppingQueueHandler(unittest.TestCase):
+    def test_full_queue_drops_and_reports(self):
+        q = queue.Queue(1)
+        handler = DroppingQueueHandler(q)
+        log = logging.getLogger("test_log_queue.drop")
+        log.propagate = False
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+
+        log.warning("first")
+        log.warning("second")
+        log.warning("third")
+        self.assertEqual(handler.dropped, 2)
+
+        self.assertEqual(q.get_nowait().getMessage(), "first")
+        log.warning("fourth")
+        # the drop report went in first, and "fourth" had no room left
+        self.assertEqual(q.get_nowait().getMessage(), "Log queue full, dropped 2 records")
+        self.assertEqual(handler.dropped, 3)
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.sink = _Collect()
+        self.pipeline = LogPipeline(self.sink, maxsize=100)
+        # unregistered logger: no parent, so pytest's capture handlers never see it
+        self.log = logging.Logger("test_log_queue.pipeline", logging.INFO)
+        self.log.addHandler(self.pipeline.handler)
+        self.addCleanup(self.log.removeHandler, self.pipeline.handler)
+        self.pipeline.start()
+        self.addCleanup(self.pipeline.stop)
+
+    def test_formats_on_writer_thread(self):
+        arg = _Arg()
+        self.log.info("value %s", arg)
+        self.pipeline.flush()
+        self.assertEqual(self.sink.messages, ["value arg"])
+        self.assertEqual(len(arg.threads), 1)
+        self.assertIsNot(arg.threads[0], threading.current_thread())
+
+    def test_disabled_level_never_formats(self):
+        arg = _Arg()
+        self.log.debug("value %s", arg)
+        self.pipeline.flush()
+        self.assertEqual(arg.threads, [])
+        self.assertEqual(self.sink.messages, [])
+
+    def test_add_and_remove_handler(self):
+        extra = _Collect()
+        self.pipeline.add_handler(extra)
+        self.log.info("both")
+        self.pipeline.flush()
+        self.pipeline.remove_handler(extra)
+        self.log.info("one")
+        self.pipeline.flush()
+        self.assertEqual(self.sink.messages, ["both", "one"])
+        self.assertEqual(extra.messages, ["both"])
+
+    def test_stop_drains_queue(self):
+        for i in range(50):
+            self.log.info("line %d", i)
+        self.pipeline.stop()
+        self.assertEqual(len(self.sink.messages), 50)
+
+
+class TestLoggerManagerPipeline(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+
+        def restore():
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        self.addCleanup(restore)
+
+    def test_console_output_keeps_format(self):
+        stream = io.StringIO()
+        mgr = LoggerManager(stream=stream)
+        logging.getLogger("src.autoskip_dialogue").info("Pressed %s (%s)", "space", "Dialogue")
+        mgr.close()
+        line = stream.getvalue().strip()
+        self.assertRegex(line, r"^\d\d:\d\d:\d\d\.\d{3} \| INFO     \| Pressed space \(Dialogue\)$")
+        self.assertEqual(mgr.dropped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
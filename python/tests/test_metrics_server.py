@@ -0,0 +1,169 @@
+import contextlib
+import io
+import re
+import time
+import unittest
+import urllib.error
+import urllib.request
+from random import Random
+from threading import Event, Thread
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.capture import MemoryFrameSource
+from src.clock import VirtualClock
+from src.focus import FakeFocusSource
+from src.histogram import Histogram
+from src.input_sender import RecordingSender
+from src.instrumentation import Instrumentation
+from src.metrics_server import METRICS_HOST, SCRAPE_CPU_BUDGET, MetricsServer, render
+
+W, H = 1920, 1080
+# name{labels} value, as in the Prometheus text format
+SAMPLE = re.compile(r'^[a-z_]+(\{[a-z]+="[^"]*"(,[a-z]+="[^"]*")*\})? -?[0-9.e+-]+$')
+
+
+class FlakyCapture(MemoryFrameSource):
+    """Every `fail_every`-th grab raises, as a lost desktop duplication would."""
+
+    def __init__(self, *args, fail_every=4):
+        super().__init__(*args)
+        self.fail_every = fail_every
+
+    def grab(self, left, top, width, height):
+        if (self.grabs + 1) % self.fail_every == 0:
+            self.grabs += 1
+            raise OSError("capture lost")
+        return super().grab(left, top, width, height)
+
+
+def make_skipper(instrument=False):
+    cfg = ScreenConfig(W, H, use_layouts=False)
+    screen = FlakyCapture(W, H)
+    probe = next(p for p in cfg.probe_table().probes if p.name == "playing")
+    screen.set_pixel(*probe.pos, probe.color)
+    clock = VirtualClock()
+    skipper = AutoSkipper(cfg, None, Random(0), capture_backend=screen,
+                          focus_source=FakeFocusSource(1, cfg.WINDOW_TITLE), sender=RecordingSender(clock.now),
+                          clock=clock, backend=HeadlessBackend(W, H), metrics=Instrumentation(enabled=instrument))
+    skipper.status = "run"
+    with contextlib.redirect_stdout(io.StringIO()):
+        skipper.start_loop()
+    return skipper, clock
+
+
+def run_steps(skipper, clock, steps):
+    for _ in range(steps):
+        clock.advance(max(0.0, skipper.step(clock.now()) - clock.now()))
+
+
+def parse(text):
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        values[name] = float(value)
+    return values
+
+
+class TestRender(unittest.TestCase):
+    def test_exports_loop_totals(self):
+        skipper, clock = make_skipper()
+        run_steps(skipper, clock, 400)
+        self.assertGreater(skipper.press_count, 0)
+        values = parse(render(skipper))
+        self.assertEqual(values["autoskip_presses_total"], skipper.press_count)
+        self.assertEqual(values["autoskip_in_dialogue"], 1)
+        self.assertEqual(values["autoskip_dialogue_flips_total"], skipper.flip_count)
+        self.assertEqual(values["autoskip_breaks_total"], skipper.break_count)
+        self.assertAlmostEqual(values["autoskip_break_seconds_total"], skipper.break_time)
+        sampler = skipper.pixel_sampler
+        self.assertGreater(sampler.total_failures, 0)
+        self.assertEqual(values["autoskip_pixel_failures_total"], sampler.total_failures)
+        (x, y), n = next(iter(sampler.fail_counts.items()))
+        self.assertEqual(values[f'autoskip_pixel_failures_by_point_total{{x="{x}",y="{y}"}}'], n)
+        # injections are timed with instrumentation off, too
+        self.assertEqual(values['autoskip_stage_seconds_count{stage="inject"}'], skipper.sender.latency.count)
+
+    def test_text_format(self):
+        skipper, clock = make_skipper(instrument=True)
+        run_steps(skipper, clock, 200)
+        text = render(skipper)
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                self.assertRegex(line, SAMPLE)
+        values = parse(text)
+        self.assertEqual(values['autoskip_loop_events_total{event="presses"}'], skipper.press_count)
+        # cumulative buckets end at the count
+        buckets = [v for k, v in values.items() if k.startswith('autoskip_stage_seconds_bucket{stage="match"')]
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual(buckets[-1], values['autoskip_stage_seconds_count{stage="match"}'])
+
+    def test_histogram_cumulative_and_copy(self):
+        h = Histogram()
+        for v in (0.00005, 0.0003, 0.002, 0.002, 0.4):
+            h.add(v)
+        self.assertEqual(h.cumulative((0.0001, 0.001, 0.01, 1.0)), [1, 2, 4, 5])
+        snap = h.copy()
+        h.add(0.1)
+        self.assertEqual((snap.count, h.count), (5, 6))
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.skipper, self.clock = make_skipper()
+        self.server = MetricsServer(self.skipper, port=0)
+        self.server.start()
+        self.url = f"http://{METRICS_HOST}:{self.server.port}"
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_serves_metrics_on_localhost(self):
+        run_steps(self.skipper, self.clock, 100)
+        with urllib.request.urlopen(self.url + "/metrics", timeout=5) as resp:
+            self.assertEqual(resp.status, 200)
+            self.assertTrue(resp.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            values = parse(resp.read().decode("utf-8"))
+        self.assertEqual(values["autoskip_presses_total"], self.skipper.press_count)
+        self.assertEqual(self.server._server.server_address[0], "127.0.0.1")
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(self.url + "/", timeout=5)
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_scraping_stays_within_budget(self):
+        run_steps(self.skipper, self.clock, 300)
+        for _ in range(20):
+            urllib.request.urlopen(self.url + "/metrics", timeout=5).read()
+        # render CPU per scrape, as the module docstring promises
+        self.assertEqual(self.server.scrape_time.count, 20)
+        self.assertLess(self.server.scrape_time.mean, SCRAPE_CPU_BUDGET)
+
+        # the loop runs as fast while being scraped at 20x the 1 Hz rate
+        def timed(steps=10000):
+            t0 = time.perf_counter()
+            run_steps(self.skipper, self.clock, steps)
+            return time.perf_counter() - t0
+
+        stop = Event()
+
+        def scrape():
+            while not stop.wait(0.05):
+                urllib.request.urlopen(self.url + "/metrics", timeout=5).read()
+
+        quiet = min(timed() for _ in range(3))
+        scraper = Thread(target=scrape, daemon=True)
+        scraper.start()
+        try:
+            scraped = min(timed() for _ in range(3))
+        finally:
+            stop.set()
+            scraper.join(5)
+        # scraped all along
+        self.assertGreaterEqual(self.server.scrapes - 20, 5)
+        self.assertLess(scraped, quiet * 1.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
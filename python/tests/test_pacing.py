@@ -0,0 +1,118 @@
+import unittest
+
+from src.capture import MemoryFrameSource
+from src.pacing import FEEDBACK_TIMEOUT, HOLD_RECHECK, INTERVAL_BOUNDS, PressPacer
+from src.simulation import Simulation, Timeline
+from src.trace import EV_SKIP, SKIP_HELD
+
+W, H = 320, 180
+
+
+class TestPressPacer(unittest.TestCase):
+    def setUp(self):
+        self.pacer = PressPacer((10, 10, 20, 10))
+
+    def test_checksum_sees_the_text_box_only(self):
+        src = MemoryFrameSource(W, H)
+        grab = lambda: self.pacer.checksum(src.grab(0, 0, W, H))
+        blank = grab()
+        src.set_pixel(100, 100, (255, 255, 255))
+        self.assertEqual(grab(), blank)
+        src.set_pixel(15, 13, (255, 255, 255))
+        self.assertNotEqual(grab(), blank)
+
+    def test_holds_after_an_advance_until_the_next_line_types(self):
+        p = self.pacer
+        p.observe(0.0, 1)
+        self.assertTrue(p.should_press(0.0))
+        # first press assumed to land on typing text: no hold
+        p.pressed(0.0, 0.1)
+        p.observe(0.1, 1)
+        self.assertTrue(p.should_press(0.1))
+        # nothing changed since: the line was finished, this press advances it
+        p.pressed(0.1, 0.1)
+        p.observe(0.2, 2)
+        self.assertFalse(p.should_press(0.2))
+        self.assertEqual(p.advances, 1)
+        p.observe(0.3, 2)
+        self.assertFalse(p.should_press(0.3))
+        p.observe(0.5, 3)
+        self.assertTrue(p.should_press(0.5))
+        self.assertAlmostEqual(p.fade, 0.4)
+        self.assertEqual(p.held, 2)
+
+    def test_hold_gives_up_after_timeout(self):
+        p = self.pacer
+        p.observe(0.0, 1)
+        p.pressed(0.0, 0.1)
+        p.observe(0.1, 1)
+        p.pressed(0.1, 0.1)
+        p.observe(0.2, 1)
+        self.assertFalse(p.should_press(0.2))
+        self.assertTrue(p.should_press(0.1 + FEEDBACK_TIMEOUT))
+        # the box does not react: no more holds until it changes
+        p.pressed(2.0, 0.1)
+        p.observe(2.1, 1)
+        p.pressed(2.1, 0.1)
+        p.observe(2.2, 1)
+        self.assertTrue(p.should_press(2.2))
+        p.observe(2.3, 2)
+        p.pressed(2.3, 0.1)
+        p.pressed(2.4, 0.1)
+        p.observe(2.5, 2)
+        self.assertFalse(p.should_press(2.5))
+
+    def test_interval_after_advance_follows_fade(self):
+        p = self.pacer
+        p.fade = 1.0
+        p.observe(0.0, 1)
+        p.pressed(0.0, 0.1)
+        p.observe(0.1, 1)
+        self.assertEqual(p.pressed(0.1, 0.1), INTERVAL_BOUNDS[1])
+        self.assertEqual(p.recheck(0.2), HOLD_RECHECK)
+
+    def test_failed_grab_stops_holding(self):
+        p = self.pacer
+        p.observe(0.0, 1)
+        p.pressed(0.0, 0.1)
+        p.observe(0.1, 1)
+        p.pressed(0.1, 0.1)
+        p.observe(0.2, None)
+        self.assertTrue(p.should_press(0.2))
+
+
+class TestFeedbackPacing(unittest.TestCase):
+    def _run(self, pacing, **kw):
+        timeline = Timeline().idle(2).dialogue(90, lines=True).idle(2)
+        sim = Simulation(timeline, seed=3, pacing=pacing, **kw)
+        return sim, sim.run()
+
+    def test_feedback_wastes_fewer_presses_per_line(self):
+        _, timer = self._run("timer")
+        _, feedback = self._run("feedback")
+        self.assertGreater(timer.lines_advanced, 100)
+        # no slower through the conversation ...
+        self.assertGreaterEqual(feedback.lines_advanced, timer.lines_advanced)
+        # ... with far fewer presses, nearly none of them into a fade
+        self.assertLess(feedback.presses / feedback.lines_advanced, 0.75 * timer.presses / timer.lines_advanced)
+        self.assertLess(feedback.ignored_presses, timer.ignored_presses / 5)
+        self.assertGreater(feedback.held_presses, 0)
+        self.assertEqual(timer.held_presses, 0)
+
+    def test_held_presses_are_traced(self):
+        sim, report = self._run("feedback", trace_capacity=1 << 16)
+        held = [r for r in sim.skipper.trace.records() if r.event == EV_SKIP and r.flags & SKIP_HELD]
+        self.assertEqual(len(held), report.held_presses)
+
+    def test_static_dialogues_are_unaffected(self):
+        timeline = Timeline().idle(5).dialogue(10).choice(3).dialogue(5).idle(5)
+        timer = Simulation(timeline, seed=1).run()
+        feedback = Simulation(timeline, seed=1, pacing="feedback").run()
+        self.assertEqual(feedback.missed_dialogues, 0)
+        # the text box never changes, so holds time out rather than stall
+        self.assertGreater(feedback.presses, timer.presses / 3)
+        self.assertLess(feedback.detection_latency_max, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
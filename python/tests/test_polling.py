@@ -0,0 +1,46 @@
+import unittest
+
+from src.polling import AdaptivePoller
+
+
+class TestAdaptivePoller(unittest.TestCase):
+    def setUp(self):
+        self.poller = AdaptivePoller(min_interval=0.1, max_interval=0.5, dialogue_interval=0.15,
+                                     idle_interval=0.25, backoff=1.5, hot_window=3.0)
+
+    def test_dialogue_rate(self):
+        self.assertEqual(self.poller.next_interval(0.0, 0b1, True), 0.15)
+
+    def test_fast_after_dialogue_then_backoff(self):
+        self.poller.next_interval(0.0, 0b1, True)
+        self.assertEqual(self.poller.next_interval(1.0, 0, False), 0.1)
+        self.assertEqual(self.poller.next_interval(2.9, 0, False), 0.1)
+        intervals = [self.poller.next_interval(3.0 + i, 0, False) for i in range(6)]
+        self.assertEqual(intervals[0], 0.25)
+        self.assertEqual(intervals, sorted(intervals))
+        self.assertEqual(intervals[-1], 0.5)
+
+    def test_flicker_returns_to_fast_polling(self):
+        for i in range(10):
+            self.poller.next_interval(float(i), 0, False)
+        self.assertEqual(self.poller.next_interval(10.0, 0b10, False), 0.1)
+        self.assertEqual(self.poller.flickers, 1)
+
+    def test_quiet_start_uses_idle_rate(self):
+        self.assertEqual(self.poller.next_interval(0.0, 0, False), 0.25)
+
+    def test_reset_restarts_backoff(self):
+        for i in range(10):
+            self.poller.next_interval(float(i), 0, False)
+        self.poller.reset()
+        self.assertEqual(self.poller.next_interval(20.0, 0b10, False), 0.25)
+
+    def test_intervals_clamped_to_config(self):
+        poller = AdaptivePoller(min_interval=0.2, max_interval=0.3, dialogue_interval=0.15, idle_interval=0.25)
+        self.assertEqual(poller.next_interval(0.0, 1, True), 0.2)
+        for i in range(20):
+            self.assertLessEqual(poller.next_interval(10.0 + i, 0, False), 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
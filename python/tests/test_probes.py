@@ -0,0 +1,101 @@
+import unittest
+from itertools import product
+from unittest.mock import patch
+
+from src._compat import load_numpy
+from src.autoskip_dialogue import ScreenConfig
+from src.capture import FrameSet, MemoryFrameSource, PixelSampler
+from src.probes import Probe, ProbeTable
+
+WHITE = (255, 255, 255)
+PLAYING = (236, 229, 216)
+GREY = (120, 120, 120)
+
+
+def dialogue_table():
+    probe_list = [
+        Probe("playing", (84, 46), PLAYING),
+        Probe("loading", (1200, 700), WHITE),
+        Probe("choice_low", (1301, 808), WHITE),
+        Probe("choice_high", (1301, 790), WHITE),
+    ]
+    choice = ("and", ("not", "loading"), ("or", "choice_low", "choice_high"))
+    return ProbeTable(probe_list, {"playing": "playing", "choice": choice, "dialogue": ("or", "playing", choice)})
+
+
+def legacy_dialogue(get):
+    # the per-probe detection ProbeTable replaces
+    match = PixelSampler.colors_match
+    if match(get(84, 46), PLAYING):
+        return True
+    if match(get(1200, 700), WHITE):
+        return False
+    return match(get(1301, 808), WHITE) or match(get(1301, 790), WHITE)
+
+
+class TestProbeTable(unittest.TestCase):
+    def setUp(self):
+        self.table = dialogue_table()
+        self.src = MemoryFrameSource(1920, 1080)
+        self.sampler = PixelSampler(self.src)
+
+    def _paint(self, states):
+        for probe, on in zip(self.table.probes, states):
+            self.src.set_pixel(*probe.pos, probe.color if on else GREY)
+
+    def _check_all_states(self):
+        for states in product((False, True), repeat=4):
+            self._paint(states)
+            self.assertTrue(self.sampler.snapshot(self.table.points))
+            mask = self.table.match_mask(self.sampler.frame)
+            self.assertEqual(self.table.test("dialogue", mask), legacy_dialogue(self.src.get_pixel), states)
+            self.assertEqual(mask, self.table.match_mask_from(self.src.get_pixel))
+
+    def test_matches_legacy_detection(self):
+        self._check_all_states()
+
+    def test_matches_legacy_without_numpy(self):
+        with patch.object(self.table, "_np", None):
+            self._check_all_states()
+
+    def test_tolerance_boundary(self):
+        self.src.set_pixel(84, 46, (246, 219, 216))
+        self.sampler.snapshot(self.table.points)
+        self.assertTrue(self.table.evaluate(self.sampler.frame, "playing"))
+        self.src.set_pixel(84, 46, (247, 229, 216))
+        self.sampler.snapshot(self.table.points)
+        self.assertFalse(self.table.evaluate(self.sampler.frame, "playing"))
+
+    def test_frame_missing_probe_falls_back(self):
+        self.src.set_pixel(84, 46, PLAYING)
+        frame = self.src.grab(0, 0, 100, 100)
+        self.assertEqual(self.table.match_mask(frame), self.table.bit("playing"))
+
+    def test_numpy_gathers_across_clustered_grabs(self):
+        if load_numpy() is None:
+            self.skipTest("numpy not installed")
+        table = ScreenConfig(1920, 1080, use_layouts=False).probe_table()
+        sampler = PixelSampler(self.src)
+        for i, probe in enumerate(table.probes):
+            self.src.set_pixel(*probe.pos, probe.color if i % 2 else GREY)
+        self.assertTrue(sampler.snapshot(table.points))
+        frame = sampler.frame
+        # the default plan grabs several clusters, not one bounding box
+        self.assertIsInstance(frame, FrameSet)
+        with patch.object(table, "match_mask_from", side_effect=AssertionError("fell back to per-pixel reads")):
+            mask = table.match_mask(frame)
+        self.assertEqual(len(table._gathers), len(frame.parts))
+        self.assertEqual(mask, table.match_mask_from(self.src.get_pixel))
+        self.assertNotIn(mask, (0, (1 << len(table.probes)) - 1))
+
+    def test_unknown_probe_in_rule(self):
+        with self.assertRaises(ValueError):
+            ProbeTable([Probe("a", (0, 0), WHITE)], {"r": ("or", "a", "b")})
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            ProbeTable([Probe("a", (0, 0), WHITE)], {"r": ("xor", "a", "a")})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from src.capture import MemoryFrameSource
+from src.clock import VirtualClock
+from src.recording import Recording, RecordingCaptureBackend, ReplayCaptureBackend, patch_rects
+from src.replay import Replay, compare
+from src.simulation import Simulation, Timeline
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "frames.rec")
+
+    def test_patch_rects_clip_to_screen(self):
+        self.assertEqual(patch_rects([(1, 50), (99, 99)], 4, 100, 100), [(0, 46, 6, 9), (95, 95, 5, 5)])
+
+    def _record(self, screen, clock, points):
+        return RecordingCaptureBackend(screen, self.path, points, (screen.width, screen.height), clock, radius=2)
+
+    def test_round_trip_and_repeats(self):
+        clock = VirtualClock()
+        screen = MemoryFrameSource(40, 30)
+        points = ((5, 5), (30, 20))
+        rec = self._record(screen, clock, points)
+        screen.set_pixel(5, 5, (1, 2, 3))
+        frame = rec.grab(5, 5, 26, 16)
+        # the grab is widened to whole patches
+        self.assertEqual((frame.left, frame.top, frame.width, frame.height), (3, 3, 30, 20))
+        clock.advance(1.0)
+        rec.grab(5, 5, 26, 16)
+        clock.advance(1.0)
+        screen.set_pixel(30, 20, (9, 9, 9))
+        rec.grab(5, 5, 26, 16)
+        rec.record_focus(False)
+        rec.close()
+        self.assertEqual((rec.frames, rec.skipped), (2, 1))
+
+        recording = Recording(self.path)
+        self.assertEqual([t for t, _ in recording.frames], [0.0, 2.0])
+        self.assertEqual(recording.focus, [(0.0, True), (2.0, False)])
+
+        replay_clock = VirtualClock()
+        replay = ReplayCaptureBackend(recording, replay_clock)
+        self.assertEqual(replay.get_pixel(5, 5), (1, 2, 3))
+        self.assertEqual(replay.get_pixel(30, 20), (0, 0, 0))
+        replay_clock.advance(2.5)
+        self.assertEqual(replay.grab(5, 5, 26, 16).pixel(30, 20), (9, 9, 9))
+
+    def test_truncated_file_keeps_complete_frames(self):
+        clock = VirtualClock()
+        screen = MemoryFrameSource(40, 30)
+        rec = self._record(screen, clock, ((5, 5),))
+        for i in range(50):
+            screen.set_pixel(5, 5, (i, i, i))
+            rec.grab(5, 5, 1, 1)
+            clock.advance(0.1)
+        rec.close()
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:-40])
+        frames = Recording(self.path).frames
+        self.assertLess(len(frames), 50)
+        self.assertGreater(len(frames), 0)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"GIF89a and then some")
+        with self.assertRaises(ValueError):
+            Recording(self.path)
+
+
+class TestReplay(unittest.TestCase):
+    def test_replay_matches_live_session(self):
+        timeline = Timeline().idle(3).dialogue(8).unfocused(5, screen="playing").idle(2).choice(3).idle(2)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "frames.rec")
+            sim = Simulation(timeline, seed=4, record_frames=path)
+            live = sim.run()
+            recording = Recording(path)
+        self.assertEqual(recording.meta["seed"], 4)
+        report = Replay(recording).run()
+        self.assertEqual(report.presses, live.presses)
+        self.assertEqual(len(report.sessions), 2)
+        self.assertAlmostEqual(report.sessions[0][0], 3.0, delta=0.5)
+        self.assertTrue(all(d is not None and d < 0.5 for d in report.first_press))
+        # a second replay is identical
+        again = Replay(recording).run().to_dict()
+        self.assertEqual(compare(again, report.to_dict()), [])
+
+    def test_compare_flags_late_detection(self):
+        base = {"sessions": [[1.0, 5.0]], "first_press": [0.1]}
+        late = {"sessions": [[1.6, 5.0]], "first_press": [0.1]}
+        missed = {"sessions": [], "first_press": []}
+        self.assertEqual(len(compare(late, base)), 1)
+        self.assertEqual(compare(missed, base), ["dialogue sessions: 0 (baseline 1)"])
+
+
+if __name__ == "__main__":
+    unittest.main()
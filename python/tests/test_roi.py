@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+from time import perf_counter
+
+from src import roi
+from src._compat import load_numpy
+from src.autoskip_dialogue import PLAYING_ICON_COLOR, ScreenConfig
+from src.capture import MemoryFrameSource, PixelSampler
+from src.clock import VirtualClock
+from src.detectors import ProbeDetector, RoiDetector
+from src.recording import Recording, RecordingCaptureBackend, ReplayCaptureBackend
+from src.roi import RoiMatcher, normalize, planar_patch
+
+W, H = 1920, 1080
+BACKGROUND = (70, 80, 95)
+RING = (20, 20, 30)
+
+
+def draw_icon(src, center, solid=False):
+    cx, cy = center
+    for dy in range(-6, 7):
+        for dx in range(-6, 7):
+            r2 = dx * dx + dy * dy
+            if r2 > 36:
+                continue
+            ring = not solid and 9 <= r2 <= 16
+            src.set_pixel(cx + dx, cy + dy, RING if ring else PLAYING_ICON_COLOR)
+
+
+def screen(icon=True, solid=False):
+    src = MemoryFrameSource(W, H, BACKGROUND)
+    if icon:
+        draw_icon(src, ScreenConfig(W, H, use_layouts=False).PLAYING_ICON, solid)
+    return src
+
+
+def transform(src, fn):
+    """Apply `fn(channel, value)` to every pixel, like a display or in-game color change."""
+    canvas = src._canvas
+    for offset, channel in ((0, 2), (1, 1), (2, 0)):
+        lut = bytes(max(0, min(255, int(fn(channel, v)))) for v in range(256))
+        canvas[offset::4] = canvas[offset::4].translate(lut)
+    return src
+
+
+# brighter HDR mapping, dimmed brightness, gamma, and a warm color filter
+SHIFTS = {
+    "hdr": lambda c, v: v * 1.08 + 12,
+    "dim": lambda c, v: v * 0.7,
+    "gamma": lambda c, v: 255 * (v / 255) ** 1.4,
+    "filter": lambda c, v: v * (1.05, 0.9, 0.75)[c],
+}
+
+
+def grab(src, detector):
+    sampler = PixelSampler(src)
+    assert sampler.snapshot(detector.points)
+    return sampler.frame
+
+
+class TestRoiDetector(unittest.TestCase):
+    def setUp(self):
+        self.table = ScreenConfig(W, H, use_layouts=False).probe_table()
+        self.roi = RoiDetector(self.table, (W, H))
+        self.roi.fit([(grab(screen(), self.roi), "playing"), (grab(screen(icon=False), self.roi), "idle")])
+
+    def test_unfitted_is_unsure(self):
+        det = RoiDetector(self.table, (W, H)).detect(grab(screen(), self.roi))
+        self.assertFalse(det.confident)
+
+    def test_color_shifts_keep_matching(self):
+        probe = ProbeDetector(self.table)
+        for name, fn in SHIFTS.items():
+            with self.subTest(name):
+                frame = grab(transform(screen(), fn), self.roi)
+                det = self.roi.detect(frame)
+                self.assertTrue(det.dialogue and det.confident)
+                self.assertEqual(det.mask, self.table.bit("playing"))
+                # the pixel probe misses: the shift is beyond its tolerance
+                self.assertFalse(probe.detect(frame).dialogue)
+                idle = grab(transform(screen(icon=False), fn), self.roi)
+                self.assertFalse(self.roi.detect(idle).dialogue)
+
+    def test_flat_patches_are_not_learned(self):
+        roi_ = RoiDetector(self.table, (W, H))
+        big = screen(icon=False)
+        x, y = ScreenConfig(W, H, use_layouts=False).PLAYING_ICON
+        for dy in range(-10, 11):
+            for dx in range(-10, 11):
+                big.set_pixel(x + dx, y + dy, PLAYING_ICON_COLOR)
+        roi_.fit([(grab(big, roi_), "playing")])
+        self.assertEqual(roi_.learned, {})
+        self.assertIsNone(roi_.references())
+
+    def test_references_round_trip(self):
+        restored = RoiDetector(self.table, (W, H), self.roi.references())
+        frame = grab(transform(screen(), SHIFTS["dim"]), self.roi)
+        self.assertEqual(restored.scores(frame), self.roi.scores(frame))
+
+    def test_recorded_frames(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "frames.rec")
+            clock = VirtualClock()
+            live = screen(icon=False)
+            rec = RecordingCaptureBackend(live, path, self.table.points, (W, H), clock)
+            rec.grab(*self.table.points[0], 1, 1)
+            clock.advance(1.0)
+            draw_icon(live, self.table.points[0])
+            transform(live, SHIFTS["gamma"])
+            rec.grab(*self.table.points[0], 1, 1)
+            rec.close()
+            recording = Recording(path)
+        replay_clock = VirtualClock()
+        replay = ReplayCaptureBackend(recording, replay_clock)
+        self.assertFalse(self.roi.detect(grab(replay, self.roi)).dialogue)
+        replay_clock.advance(1.5)
+        self.assertTrue(self.roi.detect(grab(replay, self.roi)).dialogue)
+
+
+class TestRoiMatcher(unittest.TestCase):
+    def setUp(self):
+        self.table = ScreenConfig(W, H, use_layouts=False).probe_table()
+        self.roi = RoiDetector(self.table, (W, H))
+        self.roi.fit([(grab(screen(), self.roi), "playing")])
+
+    def test_normalize_removes_gain_and_offset(self):
+        frame = grab(screen(), self.roi)
+        rect = self.roi.rects[0]
+        base = normalize(planar_patch(frame, rect), rect[2])
+        shifted = normalize(planar_patch(grab(transform(screen(), lambda c, v: v * 0.5 + 40), self.roi), rect),
+                            rect[2])
+        self.assertLessEqual(roi.distance(base, shifted), 2)
+        self.assertIsNone(normalize(bytes(3 * 17 * 17), 17))
+
+    def test_numpy_and_python_scores_agree(self):
+        if load_numpy() is None:
+            self.skipTest("numpy not installed")
+        fast = RoiMatcher(self.roi.rects, self.roi.templates, use_numpy=True)
+        slow = RoiMatcher(self.roi.rects, self.roi.templates, use_numpy=False)
+        for fn in list(SHIFTS.values()) + [lambda c, v: v]:
+            for icon in (True, False):
+                frame = grab(transform(screen(icon), fn), self.roi)
+                self.assertEqual(fast.scores(frame), slow.scores(frame))
+
+    def test_frame_budget(self):
+        if load_numpy() is None:
+            self.skipTest("numpy not installed")
+        frame = grab(transform(screen(), SHIFTS["hdr"]), self.roi)
+        self.roi.detect(frame)
+        n = 200
+        t0 = perf_counter()
+        for _ in range(n):
+            self.roi.detect(frame)
+        self.assertLess((perf_counter() - t0) / n, 0.001)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from src.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.timers = Scheduler()
+
+    def test_next_deadline_is_earliest(self):
+        self.timers.set("press", 2.0)
+        self.timers.set("state_check", 1.5)
+        self.timers.set("break_check", 30.0)
+        self.assertEqual(self.timers.next_deadline(0.0), (1.5, "state_check"))
+
+    def test_reset_supersedes_old_deadline(self):
+        self.timers.set("press", 1.0)
+        self.timers.set("press", 3.0)
+        self.timers.set("state_check", 2.0)
+        self.assertEqual(self.timers.next_deadline(0.0), (2.0, "state_check"))
+        self.assertEqual(self.timers.deadline("press"), 3.0)
+
+    def test_cancel(self):
+        self.timers.set("break_end", 1.0)
+        self.timers.set("press", 5.0)
+        self.timers.cancel("break_end")
+        self.assertFalse(self.timers.pending("break_end", 0.0))
+        self.assertEqual(self.timers.next_deadline(0.0), (5.0, "press"))
+
+    def test_due_and_pending(self):
+        self.timers.set("post_burst", 1.0)
+        self.assertTrue(self.timers.pending("post_burst", 0.5))
+        self.assertFalse(self.timers.due("post_burst", 0.5))
+        self.assertTrue(self.timers.due("post_burst", 1.0))
+        self.assertFalse(self.timers.pending("post_burst", 1.0))
+        self.assertFalse(self.timers.due("missing", 1.0))
+
+    def test_fired_deadlines_are_dropped(self):
+        self.timers.set("break_end", 1.0)
+        self.timers.set("press", 2.0)
+        self.assertEqual(self.timers.next_deadline(1.0), (2.0, "press"))
+        self.assertIsNone(self.timers.deadline("break_end"))
+        self.assertIsNone(self.timers.next_deadline(2.0))
+        self.assertEqual(len(self.timers), 0)
+
+    def test_heap_stays_bounded_under_rescheduling(self):
+        now = 0.0
+        for _ in range(10000):
+            self.timers.set("press", now + 0.1)
+            self.timers.set("state_check", now + 0.15)
+            now, _name = self.timers.next_deadline(now)
+        self.assertLess(len(self.timers._heap), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
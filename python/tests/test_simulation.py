@@ -0,0 +1,73 @@
+import unittest
+from random import Random
+from threading import Event
+
+from src.clock import VirtualClock
+from src.simulation import Simulation, Timeline, run_simulation
+
+
+class TestVirtualClock(unittest.TestCase):
+    def test_wait_jumps_to_deadline(self):
+        clock = VirtualClock()
+        self.assertFalse(clock.wait(Event(), 2.5))
+        self.assertEqual(clock.now(), 2.5)
+
+    def test_callback_wakes_waiter(self):
+        clock = VirtualClock()
+        ev = Event()
+        clock.call_at(1.0, ev.set)
+        self.assertTrue(clock.wait(ev, 5.0))
+        self.assertEqual(clock.now(), 1.0)
+
+
+class TestSimulation(unittest.TestCase):
+    def test_dialogue_is_skipped_promptly(self):
+        report = run_simulation(Timeline().idle(5).dialogue(10).idle(5), seed=1)
+        self.assertEqual(report.dialogues, 1)
+        self.assertEqual(report.missed_dialogues, 0)
+        self.assertLess(report.detection_latency_max, 0.5)
+        self.assertGreater(report.presses, 20)
+
+    def test_choice_is_skipped_but_loading_is_not(self):
+        report = run_simulation(Timeline().idle(2).choice(3).idle(2).loading(5).idle(2), seed=2)
+        self.assertEqual(report.missed_dialogues, 0)
+        self.assertLessEqual(report.wasted_presses, 2)
+
+    def test_no_presses_while_unfocused(self):
+        sim = Simulation(Timeline().idle(2).unfocused(20, screen="playing").idle(2), seed=3)
+        report = sim.run()
+        self.assertEqual(report.presses, 0)
+        self.assertLess(report.wakeups_per_sec, 5)
+
+    def test_long_unfocused_stretch_is_cheap(self):
+        report = run_simulation(Timeline().unfocused(24 * 3600), seed=5)
+        self.assertEqual(report.presses, 0)
+        self.assertLessEqual(report.wakeups_per_sec, 1.01)
+        self.assertGreater(report.speedup, 1000)
+
+    def test_deterministic_for_seed(self):
+        timeline = Timeline.random(Random(7), 300)
+        a = Simulation(timeline, seed=7)
+        b = Simulation(timeline, seed=7)
+        a.run()
+        b.run()
+        self.assertEqual(a.sender.presses, b.sender.presses)
+
+    def test_pixel_reads_count_probes_per_check(self):
+        timeline = Timeline().idle(5).dialogue(10).idle(5)
+        sim = Simulation(timeline, seed=4, instrument=True)
+        report = sim.run()
+        probes = len(sim.config.probe_table().points)
+        # several grabs per check must not multiply the reads
+        self.assertGreater(sim.screen.grabs, sim.skipper.metrics.counters["checks"])
+        self.assertAlmostEqual(report.pixel_reads_per_sec * timeline.duration,
+                               sim.skipper.metrics.counters["checks"] * probes)
+
+    def test_runs_faster_than_real_time(self):
+        report = run_simulation(Timeline.random(Random(11), 600), seed=11)
+        self.assertEqual(report.missed_dialogues, 0)
+        self.assertGreater(report.speedup, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,30 @@
 import unittest
-from unittest.mock import patch
 from random import Random
 
 from src.autoskip_dialogue import InputRemapper
+from src.backends.headless import Backend as HeadlessBackend
+from src.clock import VirtualClock
 
 
 class TestSpamIntegration(unittest.TestCase):
-    @patch('src.autoskip_dialogue.press')
-    def test_spam_for_duration_deterministic(self, mock_press):
+    def test_spam_for_duration_deterministic(self):
         # Use deterministic RNG so the intervals are reproducible
         rand = Random(12345)
+        clock = VirtualClock()
 
-        # is_active always True
-        remapper = InputRemapper(lambda: True, rand)
+        # is_active always True; the headless backend records taps instead of sending them
+        remapper = InputRemapper(lambda: True, rand, backend=HeadlessBackend(), clock=clock)
 
-        # Run the spam for 2.0 seconds
+        # Run the spam for 2.0 seconds (of virtual time)
         remapper._spam_for_duration(2.0)
 
-        # Count how many times press('f') was called
-        calls = [c for c in mock_press.call_args_list if c.args and c.args[0] == 'f']
+        # Count how many times 'f' was tapped
+        calls = [key for _, key in remapper.sender.presses if key == 'f']
         # With this seed and interval range, we expect a specific number of presses.
         # If implementation changes, update this expected value.
-        expected_presses = 16
+        expected_presses = 17
         self.assertEqual(len(calls), expected_presses)
+        self.assertLess(clock.now(), 2.0 + 1e-9)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+"""Statistical equivalence of TimingModel with the per-call Random code it replaced.
+
+`_ReferenceSkipper` holds the old AutoSkipper draws, verbatim. Each
+test compares large samples from both with fixed seeds: a two-sample
+Kolmogorov-Smirnov test for continuous values, and z / chi-square tests
+for probabilities and counts. All at significance 0.001.
+"""
+import math
+import unittest
+from bisect import bisect_right
+from random import Random
+
+from src._compat import load_numpy
+from src.timing import TimingModel
+
+N = 50_000
+# consecutive intervals are correlated through rapid runs (at most 6 long),
+# so the KS test compares every 8th value
+THIN = 8
+# two-sample KS critical coefficient and normal quantile, both for alpha = 0.001
+KS_C = 1.949
+Z = 3.29
+# chi-square 0.999 quantiles by degrees of freedom
+CHI2 = {1: 10.83, 2: 13.82, 3: 16.27}
+
+
+class _ReferenceSkipper:
+    def __init__(self, rand):
+        self.rand = rand
+        self._burst_pool = 0
+
+    def _next_key_interval(self):
+        if self._burst_pool > 0:
+            self._burst_pool -= 1
+            return self.rand.uniform(0.05, 0.09)
+        if self.rand.random() < 1/50:
+            self._burst_pool = self.rand.randint(2, 5)
+            return self.rand.uniform(0.05, 0.09)
+        if self.rand.random() < 1/8:
+            return self.rand.uniform(0.09, 0.25)
+        return self.rand.uniform(0.11, 0.21)
+
+    def _maybe_break(self):
+        r = self.rand.random()
+        if r < 1/100:
+            return "long"
+        if r < 1/100 + 1/25:
+            return "short"
+        return None
+
+    def _break_duration(self, kind):
+        return self.rand.uniform(4.0, 10.0) if kind == "long" else self.rand.uniform(2.0, 6.0)
+
+    def press_decision(self):
+        r1, r2, r3 = self.rand.random(), self.rand.random(), self.rand.random()
+        burst = self.rand.randint(3, 5) if r3 < 1/60 else 0
+        space = self.rand.random() < 0.1
+        return r1 < 1/40, r2 < 1/35, burst, space
+
+
+def ks_statistic(a, b):
+    a, b = sorted(a), sorted(b)
+    d = 0.0
+    for x in a + b:
+        d = max(d, abs(bisect_right(a, x) / len(a) - bisect_right(b, x) / len(b)))
+    return d
+
+
+def ks_critical(n, m):
+    return KS_C * math.sqrt((n + m) / (n * m))
+
+
+def proportion_z(k1, n1, k2, n2):
+    p = (k1 + k2) / (n1 + n2)
+    se = math.sqrt(p * (1 - p) * (1 / n1 + 1 / n2))
+    return abs(k1 / n1 - k2 / n2) / se if se else 0.0
+
+
+def chi_square(counts_a, counts_b):
+    """Two-sample chi-square homogeneity statistic over the union of categories."""
+    keys = set(counts_a) | set(counts_b)
+    na, nb = sum(counts_a.values()), sum(counts_b.values())
+    stat = 0.0
+    for k in keys:
+        a, b = counts_a.get(k, 0), counts_b.get(k, 0)
+        total = a + b
+        ea, eb = total * na / (na + nb), total * nb / (na + nb)
+        stat += (a - ea) ** 2 / ea + (b - eb) ** 2 / eb
+    return stat, len(keys) - 1
+
+
+def rapid_runs(intervals):
+    """Lengths of runs of consecutive rapid (< 0.09 s) intervals."""
+    runs, n = {}, 0
+    for v in intervals:
+        if v < 0.09:
+            n += 1
+        elif n:
+            runs[n] = runs.get(n, 0) + 1
+            n = 0
+    return runs
+
+
+class _DistributionTests:
+    use_numpy = False
+
+    def setUp(self):
+        self.model = TimingModel(Random(1), use_numpy=self.use_numpy)
+        self.ref = _ReferenceSkipper(Random(2))
+
+    def test_interval_distribution(self):
+        ours = [self.model.next_interval() for _ in range(N * THIN)][::THIN]
+        theirs = [self.ref._next_key_interval() for _ in range(N * THIN)][::THIN]
+        self.assertLess(ks_statistic(ours, theirs), ks_critical(N, N))
+        self.assertGreaterEqual(min(ours), 0.05)
+        self.assertLessEqual(max(ours), 0.25)
+
+    def test_rapid_run_lengths(self):
+        ours = rapid_runs(self.model.next_interval() for _ in range(N))
+        theirs = rapid_runs(self.ref._next_key_interval() for _ in range(N))
+        # a run can start right after another one ends; bucket the merged tail
+        ours = {min(k, 7): v for k, v in ours.items()}
+        theirs = {min(k, 7): v for k, v in theirs.items()}
+        stat, _ = chi_square(ours, theirs)
+        self.assertLess(stat, 24.32)  # 6 degrees of freedom
+
+    def test_break_kinds_and_durations(self):
+        n = 4 * N
+        ours = [self.model.next_break() for _ in range(n)]
+        kinds = [self.ref._maybe_break() for _ in range(n)]
+        theirs = [(k, self.ref._break_duration(k) if k else 0.0) for k in kinds]
+        for kind in ("long", "short"):
+            k1 = sum(1 for b, _ in ours if b == kind)
+            k2 = sum(1 for b, _ in theirs if b == kind)
+            self.assertLess(proportion_z(k1, n, k2, n), Z, kind)
+            d1 = [d for b, d in ours if b == kind]
+            d2 = [d for b, d in theirs if b == kind]
+            self.assertLess(ks_statistic(d1, d2), ks_critical(len(d1), len(d2)), kind)
+
+    def test_press_decision_rates(self):
+        ours = [self.model.next_press() for _ in range(N)]
+        theirs = [self.ref.press_decision() for _ in range(N)]
+        for i, name in enumerate(("skip", "double", "burst", "space")):
+            k1 = sum(1 for d in ours if d[i])
+            k2 = sum(1 for d in theirs if d[i])
+            self.assertLess(proportion_z(k1, N, k2, N), Z, name)
+
+    def test_burst_lengths(self):
+        ours, theirs = {}, {}
+        for _ in range(4 * N):
+            b = self.model.next_press().burst
+            if b:
+                ours[b] = ours.get(b, 0) + 1
+            b = self.ref.press_decision()[2]
+            if b:
+                theirs[b] = theirs.get(b, 0) + 1
+        self.assertEqual(set(ours), {3, 4, 5})
+        stat, dof = chi_square(ours, theirs)
+        self.assertLess(stat, CHI2[dof])
+
+    def test_post_burst_pause(self):
+        ours = [self.model.post_burst_pause() for _ in range(N // 10)]
+        theirs = [self.ref.rand.uniform(0.4, 1.0) for _ in range(N // 10)]
+        self.assertLess(ks_statistic(ours, theirs), ks_critical(len(ours), len(theirs)))
+
+    def test_seed_determinism(self):
+        a = TimingModel(Random(7), use_numpy=self.use_numpy)
+        b = TimingModel(Random(7), use_numpy=self.use_numpy)
+        # refill timing must not change the values
+        b.refill()
+        seq_a = [(a.next_interval(), a.next_press(), a.next_break(), a.post_burst_pause()) for _ in range(2000)]
+        seq_b = []
+        for i in range(2000):
+            if i % 100 == 0:
+                b.refill()
+            seq_b.append((b.next_interval(), b.next_press(), b.next_break(), b.post_burst_pause()))
+        self.assertEqual(seq_a, seq_b)
+        c = TimingModel(Random(8), use_numpy=self.use_numpy)
+        self.assertNotEqual(seq_a[:50], [(c.next_interval(), c.next_press(), c.next_break(),
+                                          c.post_burst_pause()) for _ in range(50)])
+
+
+class TestTimingModelPython(_DistributionTests, unittest.TestCase):
+    use_numpy = False
+
+
+class TestTimingModelNumpy(_DistributionTests, unittest.TestCase):
+    use_numpy = True
+
+    def setUp(self):
+        if load_numpy() is None:
+            self.skipTest("numpy not installed")
+        super().setUp()
+
+
+class TestRefill(unittest.TestCase):
+    def test_refill_tops_up_below_low_water(self):
+        model = TimingModel(Random(0), batch=64, use_numpy=False)
+        model.refill()
+        for _ in range(60):
+            model.next_interval()
+        self.assertLessEqual(len(model._intervals.queue), 16)
+        self.assertEqual(model.refill(), 1)
+        self.assertGreater(len(model._intervals.queue), 16)
+        self.assertEqual(model.refill(), 0)
+
+    def test_dry_queue_fills_on_demand(self):
+        model = TimingModel(Random(0), batch=4, use_numpy=False)
+        values = [model.next_interval() for _ in range(10)]
+        self.assertEqual(len(values), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from src.capture import MemoryFrameSource
+from src.simulation import Simulation, Timeline
+from src.trace import (CHECK_DIALOGUE, EV_CHECK, EV_PRESS, PRESS_F, PRESS_SCHEDULED, RECORD_SIZE, TraceFile,
+                       TraceRecorder)
+from src.trace_analyzer import analyze, analyze_file
+
+
+class TestTraceRecorder(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "trace.bin")
+
+    def test_record_size(self):
+        self.assertEqual(RECORD_SIZE, 64)
+
+    def test_disabled_records_nothing(self):
+        trace = TraceRecorder(capacity=8, path=self.path)
+        trace.record(1.0, EV_PRESS)
+        self.assertEqual(len(trace), 0)
+        self.assertIsNone(trace.dump())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_ring_keeps_newest_in_order(self):
+        trace = TraceRecorder(capacity=4, path=self.path, enabled=True)
+        for i in range(6):
+            trace.record(float(i), EV_PRESS, PRESS_F, value=i / 10)
+        self.assertEqual([r.time for r in trace.records()], [2.0, 3.0, 4.0, 5.0])
+        trace.meta["probes"] = ["playing"]
+        self.assertEqual(trace.dump(), self.path)
+        with TraceFile(self.path) as f:
+            self.assertEqual(len(f), 4)
+            self.assertEqual([r.time for r in f], [2.0, 3.0, 4.0, 5.0])
+            self.assertAlmostEqual(f[0].value, 0.2, places=6)
+            self.assertEqual(f.probes, ["playing"])
+            self.assertEqual(f.meta["dropped"], 2)
+
+    def test_check_records_carry_probe_colors(self):
+        screen = MemoryFrameSource(10, 10)
+        screen.set_pixel(2, 3, (10, 20, 30))
+        screen.set_pixel(5, 5, (200, 100, 50))
+        points = ((2, 3), (5, 5))
+        trace = TraceRecorder(capacity=4, enabled=True)
+        trace.sample_colors(screen.grab(0, 0, 10, 10), points)
+        trace.record(1.0, EV_CHECK, CHECK_DIALOGUE, 0b11)
+        trace.clear_colors()
+        trace.record(2.0, EV_CHECK, 0, 0)
+        first, second = trace.records()
+        self.assertEqual(first.probe_colors(2), [(10, 20, 30), (200, 100, 50)])
+        self.assertEqual(second.probe_colors(2), [(0, 0, 0), (0, 0, 0)])
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a trace at all, definitely not")
+        with self.assertRaises(ValueError):
+            TraceFile(self.path)
+
+
+class TestTraceAnalyzer(unittest.TestCase):
+    def _check(self, trace, t, dialogue, mask):
+        trace.record(t, EV_CHECK, CHECK_DIALOGUE if dialogue else 0, mask)
+
+    def test_sessions_flips_and_flicker(self):
+        trace = TraceRecorder(capacity=64, enabled=True)
+        self._check(trace, 0.0, False, 0)
+        self._check(trace, 1.0, True, 1)
+        trace.record(1.1, EV_PRESS, PRESS_F | PRESS_SCHEDULED, value=0.002)
+        trace.record(1.3, EV_PRESS, PRESS_F | PRESS_SCHEDULED, value=0.004)
+        self._check(trace, 2.0, False, 0)
+        # one-check blip: flicker
+        self._check(trace, 3.0, True, 1)
+        self._check(trace, 3.2, False, 0)
+        self._check(trace, 4.0, True, 1)
+        report = analyze(trace.records(), ["playing"])
+        self.assertEqual(len(report.sessions), 3)
+        self.assertEqual([s.presses for s in report.sessions], [2, 0, 0])
+        self.assertTrue(report.sessions[-1].open)
+        self.assertEqual(len(report.flickers), 1)
+        self.assertEqual(len(report.flips), 5)
+        self.assertIn("playing", report.flips[0].changed)
+        self.assertEqual(report.probe_flips["playing"], 5)
+        self.assertAlmostEqual(report.press_interval.mean, 0.2, places=6)
+        self.assertEqual(report.press_lateness.count, 2)
+        self.assertAlmostEqual(report.first_press_delay.mean, 0.1, places=6)
+
+    def test_simulated_session(self):
+        sim = Simulation(Timeline().idle(5).dialogue(10).idle(5), seed=1, trace_capacity=4096)
+        report = sim.run()
+        with tempfile.TemporaryDirectory() as d:
+            path = sim.skipper.trace.dump(os.path.join(d, "trace.bin"))
+            trace = analyze_file(path)
+        self.assertEqual(len(trace.sessions), 1)
+        session = trace.sessions[0]
+        self.assertAlmostEqual(session.start, 5.0, delta=0.5)
+        self.assertEqual(trace.events["press"], len(sim.sender.batches))
+        self.assertEqual(sum(trace.press_keys.values()), len(sim.sender.batches))
+        self.assertEqual(report.missed_dialogues, 0)
+        self.assertEqual(trace.flickers, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
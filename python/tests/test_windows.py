@@ -0,0 +1,141 @@
+import contextlib
+import io
+import unittest
+from random import Random
+
+from src.autoskip_dialogue import AutoSkipper, ScreenConfig
+from src.backends.headless import Backend as HeadlessBackend
+from src.capture import MemoryFrameSource, PixelSampler, grab_plan
+from src.clock import VirtualClock
+from src.focus import FakeFocusSource
+from src.input_sender import RecordingSender
+from src.windows import FakeWindowProvider, WindowRegistry, bench, main
+
+TITLE = "Genshin Impact"
+CLIENT = (640, 360)
+BACKGROUND = (40, 40, 40)
+
+
+def desktop(count):
+    screen = MemoryFrameSource(CLIENT[0] * count, CLIENT[1], BACKGROUND)
+    provider = FakeWindowProvider()
+    for i in range(count):
+        provider.add(i + 1, TITLE, (i * CLIENT[0], 0, *CLIENT))
+    provider.add(99, "Notepad", (0, 0, 300, 200))
+    return screen, provider
+
+
+def show_dialogue(screen, registry, hwnd, on=True):
+    probe = next(p for p in registry.get(hwnd).table.probes if p.name == "playing")
+    screen.set_pixel(*probe.pos, probe.color if on else BACKGROUND)
+
+
+class TestRegistry(unittest.TestCase):
+    def test_tables_follow_client_rects(self):
+        screen, provider = desktop(2)
+        registry = WindowRegistry(TITLE, provider)
+        registry.refresh(0.0)
+        self.assertEqual(sorted(registry.states), [1, 2])
+        x, y = ScreenConfig(*CLIENT).PLAYING_ICON
+        self.assertEqual(registry.get(2).table.probes[0].pos, (CLIENT[0] + x, y))
+        provider.move(2, (100, 50, *CLIENT))
+        provider.remove(1)
+        registry.refresh(1.0)
+        self.assertEqual(list(registry.states), [2])
+        self.assertEqual(registry.get(2).table.probes[0].pos, (100 + x, 50 + y))
+
+    def test_round_robin_checks_each_window(self):
+        screen, provider = desktop(3)
+        registry = WindowRegistry(TITLE, provider)
+        registry.refresh(0.0)
+        show_dialogue(screen, registry, 2)
+        sampler = PixelSampler(screen)
+        seen = [registry.check(sampler, 0.0, foreground=1) for _ in range(6)]
+        self.assertEqual(sorted(s.hwnd for s in seen), [1, 1, 2, 2, 3, 3])
+        self.assertEqual([s.hwnd for s in registry.states.values() if s.in_dialogue], [2])
+        # every check grabbed one window's probes, not the whole desktop
+        self.assertEqual(screen.grabs, 6 * len(grab_plan(registry.get(1).table.points)))
+
+    def test_priority_favours_the_foreground(self):
+        _, provider = desktop(4)
+        registry = WindowRegistry(TITLE, provider, "priority")
+        registry.refresh(0.0)
+        picks = [registry.next_window(foreground=3).hwnd for _ in range(12)]
+        self.assertEqual(picks.count(3), 6)
+        self.assertEqual(sorted(set(picks) - {3}), [1, 2, 4])
+        with self.assertRaises(ValueError):
+            WindowRegistry(TITLE, provider, "fifo")
+
+    def test_latency_scaling(self):
+        rr1, rr4 = bench(1, "round_robin", 300), bench(4, "round_robin", 300)
+        pr4 = bench(4, "priority", 300)
+        self.assertGreater(rr4.foreground_mean, 1.5 * rr1.foreground_mean)
+        # priority keeps the foreground window near its single-window latency
+        self.assertLess(pr4.foreground_mean, rr4.foreground_mean)
+        self.assertLess(pr4.foreground_mean, 2.5 * rr1.foreground_mean)
+
+    def test_bench_cli(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertEqual(main(["bench", "--windows", "1", "2", "--seconds", "30"]), 0)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+
+
+class TestSkipperWindows(unittest.TestCase):
+    def _skipper(self):
+        self.screen, provider = desktop(2)
+        self.focus = FakeFocusSource(1, TITLE)
+        self.focus.titles[2] = TITLE
+        self.registry = WindowRegistry(TITLE, provider)
+        clock = VirtualClock()
+        self.sender = RecordingSender(clock.now)
+        cfg = ScreenConfig(*CLIENT, use_layouts=False)
+        skipper = AutoSkipper(cfg, None, Random(0), capture_backend=self.screen, focus_source=self.focus,
+                              sender=self.sender, clock=clock, backend=HeadlessBackend(self.screen.width, self.screen.height),
+                              windows=self.registry)
+        skipper.status = "run"
+        return skipper, clock
+
+    def _run(self, skipper, clock, seconds):
+        end = clock.now() + seconds
+        with contextlib.redirect_stdout(io.StringIO()):
+            while clock.now() < end:
+                # like run_loop: sleep until the returned deadline
+                clock.advance(max(0.0, skipper.step(clock.now()) - clock.now()))
+
+    def test_presses_follow_the_foreground_window(self):
+        skipper, clock = self._skipper()
+        skipper.start_loop()
+        self._run(skipper, clock, 0.5)
+        # dialogue in the background window only: watched, but nothing pressed
+        show_dialogue(self.screen, self.registry, 2)
+        self._run(skipper, clock, 3.0)
+        self.assertTrue(self.registry.get(2).in_dialogue)
+        self.assertEqual(self.sender.presses, [])
+        # switching to it starts pressing at once: its state is already known
+        self.focus.switch(2)
+        switched = clock.now()
+        self._run(skipper, clock, 3.0)
+        self.assertTrue(self.sender.presses)
+        self.assertLess(self.sender.presses[0][0] - switched, 0.5)
+
+    def test_unlisted_focus_refreshes_once(self):
+        skipper, clock = self._skipper()
+        skipper.start_loop()
+        self._run(skipper, clock, 0.5)
+        refreshes = []
+        refresh = self.registry.refresh
+        self.registry.refresh = lambda now: (refreshes.append(now), refresh(now))
+        # a window with the game's title but no client the registry tracks
+        self.focus.switch(9, TITLE)
+        self._run(skipper, clock, 1.0)
+        self.assertEqual(len(refreshes), 1)
+        # a newly focused window is looked up again at once
+        self.focus.switch(1)
+        self.focus.switch(8, TITLE)
+        self._run(skipper, clock, 1.0)
+        self.assertEqual(len(refreshes), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()